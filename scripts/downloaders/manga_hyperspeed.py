@@ -12,24 +12,85 @@ Usage:
     python manga_hyperspeed.py -j x.json -w 16      # 16 téléchargements simultanés
     python manga_hyperspeed.py --no-cbr             # téléchargement seul
     python manga_hyperspeed.py --rebuild-cbr        # reconstruit tous les CBR
+    python manga_hyperspeed.py --engine async -w 200  # moteur asyncio (aiohttp)
+    python manga_hyperspeed.py --adaptive -w 64     # concurrence ajustée par hôte (AIMD)
+    python manga_hyperspeed.py --revalidate         # revérifie les pages (304 si inchangées)
+    python manga_hyperspeed.py --dedupe             # pages identiques stockées une seule fois
+    python manga_hyperspeed.py --stream-to-cbr      # pages écrites directement dans les CBR
+    python manga_hyperspeed.py --chapter-window 2   # chapitres terminés l'un après l'autre
+    python manga_hyperspeed.py --pack-workers 4     # CBR empaquetés pendant le téléchargement
+    python manga_hyperspeed.py --metrics-port 9108  # métriques Prometheus sur /metrics
+    python manga_hyperspeed.py a.json b.json        # plusieurs projets dans un même run
+    python manga_hyperspeed.py --all -w 32          # tous les JSON du répertoire
+    python manga_hyperspeed.py --cpu-workers 4      # empaquetage CBR dans 4 processus
+    python manga_hyperspeed.py --verify-images      # pages tronquées ou non-images refusées
+    python manga_hyperspeed.py --max-rate 5M -w 64  # débit plafonné à 5 Mo/s
+    python manga_hyperspeed.py --retry-failures     # rejoue seulement le journal des échecs
+    python manga_hyperspeed.py --http2 -w 64        # requêtes multiplexées en HTTP/2 (httpx)
 """
 
 import argparse
+import asyncio
+import contextlib
+import email.utils
+import hashlib
+import importlib.util
+import io
 import json
+import math
+import multiprocessing
 import os
-import queue
 import re
+import shutil
+import socket
+import sqlite3
 import sys
 import threading
 import time
+import uuid
 import zipfile
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass
+from array import array
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait as wait_futures
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import requests
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.response import HTTPResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de reflink, on retombe sur lien dur / copie
+    fcntl = None
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+    # URL inutilisable: aiohttp >= 3.10 distingue les schémas autres que http(s)
+    AIOHTTP_INVALID_URL_ERRORS = tuple(
+        error for error in (aiohttp.InvalidURL, getattr(aiohttp, 'NonHttpUrlClientError', None))
+        if error is not None)
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+# httpx ne parle HTTP/2 qu'avec le paquet h2 (extra « httpx[http2] »)
+HTTP2_AVAILABLE = HTTPX_AVAILABLE and importlib.util.find_spec('h2') is not None
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
 
 IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.avif', '.jxl']
 
@@ -41,17 +102,229 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 DEFAULT_DATA_DIR = PROJECT_ROOT / 'data'
 DEFAULT_OUTPUT_DIR = PROJECT_ROOT / 'manga_downloads'
 
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+# Politique de relance commune aux deux moteurs (threads et asyncio)
+REQUEST_TIMEOUT = 30
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.3
+RETRY_STATUSES = [500, 502, 503, 504]
+# Comme urllib3: relance aussi sur ces codes lorsque le serveur envoie un Retry-After
+RETRY_AFTER_STATUSES = [413, 429, 503]
+
+# Classement des échecs: une erreur 4xx est permanente (404, 410...: inutile de
+# réessayer) sauf ces codes, qui signalent un refus passager; tout le reste
+# (timeouts, connexions coupées, 5xx, corps invalides) est transitoire
+TRANSIENT_CLIENT_STATUSES = {403, 408, 425, 429}
+FAILURE_PERMANENT = 'permanent'
+FAILURE_TRANSIENT = 'transitoire'
+FAILURE_LOG_FILENAME = 'echecs_telechargement.json'
+
+# Relances différées des échecs transitoires, en fin de run: nombre de tours,
+# délai avant le premier (doublé à chaque tour, ou le Retry-After du serveur
+# s'il est plus long, dans la limite du plafond) et fraction de -w utilisée
+DEFERRED_RETRY_ROUNDS = 2
+DEFERRED_RETRY_DELAY = 5.0
+DEFERRED_RETRY_MAX_DELAY = 120.0
+DEFERRED_RETRY_CONCURRENCY = 0.25
+
+# Vérification des pages: octets examinés en tête (signature du format) et en fin
+# (marqueur de fin d'image), et nouveaux essais quand le serveur renvoie autre
+# chose qu'une image (page de challenge anti-bot, erreur JSON...) avec un 200
+SNIFF_BYTES = 64
+TRAILER_BYTES = 32
+VERIFY_RETRIES = 2
+
+# Mode lot: attente maximale avant de réessayer les projets dont la fenêtre de
+# chapitres est pleine (réveil immédiat dès qu'un chapitre se termine)
+SCHEDULER_IDLE_WAIT = 0.5
+
+# Tâches en attente par worker: la lecture du JSON n'avance pas plus vite que les
+# téléchargements, la mémoire reste donc constante quelle que soit la taille du projet.
+PENDING_PER_WORKER = 2
+
+# Affichage: fréquence de rafraîchissement du bloc d'état, taille du tampon de
+# messages (échecs, chapitres terminés...), intervalle des lignes d'état hors terminal
+PROGRESS_FPS = 4
+PROGRESS_EVENT_BUFFER = 500
+PROGRESS_CHAPTER_LINES = 5
+PROGRESS_LOG_INTERVAL = 10.0
+
+# Métriques (--metrics-port / --metrics-file): adresse d'écoute et période de
+# réécriture du fichier JSON
+METRICS_HOST = '127.0.0.1'
+METRICS_FILE_INTERVAL = 5.0
+
+# Histogrammes de latence/taille: seaux géométriques (4 par puissance de 2,
+# soit ±9 % de précision sur les percentiles), sans conserver les mesures
+HISTOGRAM_BUCKETS_PER_OCTAVE = 4
+# Préchauffage (--no-prewarm pour s'en passer): validité des résolutions DNS mises
+# en cache, plafond de connexions ouvertes d'avance (réparti entre les hôtes) et
+# threads consacrés à ces ouvertures
+DNS_CACHE_TTL = 300.0
+PREWARM_MAX_CONNECTIONS = 64
+PREWARM_THREADS = 16
+SETUP_PHASES = [('dns', 'Résolution DNS'), ('connect', 'Connexion préouverte')]
+
+HISTOGRAM_PHASES = [
+    ('connect', 'Connexion (TCP+TLS)'),
+    ('ttfb', '1er octet'),
+    ('transfer', 'Transfert'),
+    ('disk', 'Écriture disque'),
+    ('size', 'Taille'),
+]
+
+LEDGER_FILENAME = '.manga_ledger.sqlite3'
+
+# Magasin partagé entre séries (--dedupe), à côté des dossiers de projets par défaut
+STORE_DIRNAME = '.store'
+FICLONE = 0x40049409  # ioctl Linux de reflink (btrfs, XFS)
+
+# --stream-to-cbr: pages arrivées dans le désordre gardées en mémoire jusqu'à ce
+# plafond (tous chapitres confondus), puis déversées dans CBR/.spill/
+STREAM_BUFFER_BYTES = 64 * 1024 * 1024
+# Clé du commentaire JSON d'un CBR publié sans ses pages en échec permanent
+MISSING_PAGES_KEY = 'pages_introuvables'
+LEDGER_FLUSH_EVERY = 200
+
+# Contrôleur AIMD (--adaptive): limite de départ par hôte, réduction multiplicative
+# sur 429/5xx/erreur réseau, et seuil d'inflation de latence vis-à-vis du minimum observé.
+AIMD_INITIAL_LIMIT = 4
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_LATENCY_FACTOR = 2.5
+AIMD_LATENCY_DECREASE = 0.9
+AIMD_COOLDOWN = 1.0
+
+# Plafond de débit (--max-rate / --host-rate): volume d'une rafale, en secondes
+# de débit, avec un plancher pour qu'un plafond bas laisse passer un bloc entier
+BANDWIDTH_BURST_SECONDS = 0.25
+BANDWIDTH_MIN_BURST = 64 * 1024
+
+# Lecture des corps (moteur threads): en deçà de READ_ONE_SHOT_BYTES (Content-Length),
+# une seule lecture et une seule écriture; au-delà, readinto() par tranches de
+# READ_BUFFER_BYTES dans des tampons réutilisés, READ_BUFFER_POOL au plus gardés
+READ_ONE_SHOT_BYTES = 1024 * 1024
+READ_BUFFER_BYTES = 256 * 1024
+READ_BUFFER_POOL = 64
+
 
 # --------------------------------------------------------------------------- #
 # Modèles
 # --------------------------------------------------------------------------- #
 
 @dataclass
+class ChapterRef:
+    """Chapitre partagé par toutes ses tâches: nom et dossier stockés une seule fois"""
+    index: int
+    name: str
+    folder: Path
+
+
 class DownloadTask:
-    url: str
-    filepath: Path
-    page_number: int
-    chapter_name: str
+    """
+    Une page à télécharger. Un run sur une bibliothèque entière en garde
+    beaucoup en vie (files, relances différées, coordinateur du cluster): la
+    tâche ne tient donc que des références partagées — chapitre, préfixe d'URL
+    interné (jusqu'au dernier '/'), extension internée — plus le numéro de
+    page et la fin de l'URL. `url` et `filepath` sont reconstruits à la demande.
+    """
+    __slots__ = ('chapter', 'page_number', 'url_prefix', 'url_suffix', 'extension')
+
+    def __init__(self, chapter: ChapterRef, page_number: int, url_prefix: str,
+                 url_suffix: str, extension: str):
+        self.chapter = chapter
+        self.page_number = page_number
+        self.url_prefix = url_prefix
+        self.url_suffix = url_suffix
+        self.extension = extension
+
+    @classmethod
+    def from_url(cls, chapter: ChapterRef, page_number: int, url: str,
+                 extension: str) -> 'DownloadTask':
+        cut = url.rfind('/') + 1
+        return cls(chapter, page_number, sys.intern(url[:cut]), url[cut:], sys.intern(extension))
+
+    @property
+    def url(self) -> str:
+        return self.url_prefix + self.url_suffix
+
+    @property
+    def chapter_name(self) -> str:
+        return self.chapter.name
+
+    @property
+    def folder(self) -> Path:
+        return self.chapter.folder
+
+    @property
+    def filepath(self) -> Path:
+        return self.chapter.folder / page_filename(self.page_number, self.extension)
+
+    def __repr__(self) -> str:
+        return f"DownloadTask({self.chapter.name!r}, page={self.page_number}, url={self.url!r})"
+
+
+class Histogram:
+    """
+    Histogramme à seaux géométriques: enregistrement en O(1), mémoire bornée
+    par l'étendue des valeurs (quelques dizaines de seaux), percentiles à
+    ±9 % près. `minimum` fixe la résolution (0,1 ms pour des durées, 1 octet
+    pour des tailles).
+    """
+
+    def __init__(self, minimum: float):
+        self.minimum = minimum
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        index = (int(math.log2(value / self.minimum) * HISTOGRAM_BUCKETS_PER_OCTAVE) + 1
+                 if value > self.minimum else 0)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Borne haute du seau contenant le q-ième percentile (plafonnée au maximum)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self.max, self.minimum * 2 ** (index / HISTOGRAM_BUCKETS_PER_OCTAVE))
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+@dataclass
+class RequestTiming:
+    """Découpage d'une requête réussie; None quand la phase n'a pas eu lieu"""
+    connect: Optional[float] = None  # nouvelle connexion uniquement (keep-alive: None)
+    ttfb: Optional[float] = None     # envoi -> en-têtes reçus, connexion comprise
+    transfer: Optional[float] = None  # en-têtes -> corps reçu et page validée
+    disk: Optional[float] = None     # part du transfert passée à écrire
+    size: Optional[int] = None
+
+
+def new_histogram(phase: str) -> Histogram:
+    return Histogram(1.0 if phase == 'size' else 0.0001)
 
 
 class DownloadStats:
@@ -61,20 +334,175 @@ class DownloadStats:
         self.downloaded_images = 0
         self.failed_images = 0
         self.skipped_images = 0
-        self.failures: List[Tuple[str, int, str, str]] = []
+        self.resumed_images = 0
+        self.unchanged_images = 0
+        self.deduplicated_images = 0
+        self.deduplicated_bytes = 0
+        self.bytes_downloaded = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.retries = 0
+        self.rejected = 0
+        self.host_errors: Dict[str, int] = {}
+        self.host_throttle: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {phase: new_histogram(phase)
+                                                 for phase, _ in HISTOGRAM_PHASES}
+        self.host_histograms: Dict[str, Dict[str, Histogram]] = {}
+        # Préchauffage: mesuré à part, ces durées ne pèsent sur aucune requête
+        self.setup_histograms: Dict[str, Histogram] = {phase: new_histogram(phase)
+                                                       for phase, _ in SETUP_PHASES}
+        self.failure_durations: Dict[Tuple[str, str, int], float] = {}
+        # (chapitre, page, URL, erreur, type d'échec: FAILURE_PERMANENT / FAILURE_TRANSIENT)
+        self.failures: List[Tuple[str, int, str, str, str]] = []
+        # Mode lot: compteurs et échecs de chaque projet (clé: DownloadContext.project)
+        self.projects: Dict[str, Dict[str, int]] = {}
+        self.project_failures: Dict[str, List[Tuple[str, int, str, str, str]]] = {}
+        # Messages à afficher (échecs, chapitres terminés...), tampon borné:
+        # les workers n'y déposent que l'exceptionnel, jamais une ligne par image.
+        self.events: deque = deque(maxlen=PROGRESS_EVENT_BUFFER)
+        self.events_total = 0
+
+    def _count_project(self, project: str, key: str, delta: int = 1):
+        """À appeler sous self.lock"""
+        counts = self.projects.get(project)
+        if counts is None:
+            counts = self.projects[project] = {'downloaded': 0, 'failed': 0, 'skipped': 0,
+                                               'bytes': 0}
+        counts[key] += delta
 
-    def add_success(self):
+    def add_success(self, size: int = 0, project: str = ''):
         with self.lock:
             self.downloaded_images += 1
+            self.bytes_downloaded += size
+            self._count_project(project, 'downloaded')
+            self._count_project(project, 'bytes', size)
+
+    def add_event(self, message: str):
+        with self.lock:
+            self.events.append(message)
+            self.events_total += 1
 
-    def add_failure(self, chapter_name: str, page_number: int, url: str, error: str):
+    def drain_events(self) -> Tuple[List[str], int]:
+        """Vide le tampon; renvoie (messages, total cumulé de messages émis)"""
+        with self.lock:
+            events = list(self.events)
+            self.events.clear()
+            return events, self.events_total
+
+    def add_failure(self, chapter_name: str, page_number: int, url: str, error: str,
+                    elapsed: Optional[float] = None, project: str = '',
+                    kind: str = FAILURE_TRANSIENT):
+        host = urlparse(url).netloc
+        failure = (chapter_name, page_number, url, error, kind)
         with self.lock:
             self.failed_images += 1
-            self.failures.append((chapter_name, page_number, url, error))
+            self.failures.append(failure)
+            self.project_failures.setdefault(project, []).append(failure)
+            self._count_project(project, 'failed')
+            self.host_errors[host] = self.host_errors.get(host, 0) + 1
+            if elapsed is not None:
+                self.failure_durations[(project, chapter_name, page_number)] = elapsed
+
+    def withdraw_failure(self, project: str, chapter_name: str, page_number: int):
+        """Échec repris par une relance différée: il sort des compteurs avant l'essai"""
+        with self.lock:
+            failures = self.project_failures.get(project, [])
+            for failure in failures:
+                if failure[0] == chapter_name and failure[1] == page_number:
+                    break
+            else:
+                return
+            failures.remove(failure)
+            self.failures.remove(failure)
+            self.failed_images -= 1
+            self._count_project(project, 'failed', -1)
+            host = urlparse(failure[2]).netloc
+            self.host_errors[host] -= 1
+            if not self.host_errors[host]:
+                del self.host_errors[host]
+            self.failure_durations.pop((project, chapter_name, page_number), None)
+
+    def add_timing(self, host: str, timing: RequestTiming):
+        with self.lock:
+            per_host = self.host_histograms.get(host)
+            if per_host is None:
+                per_host = {phase: new_histogram(phase) for phase, _ in HISTOGRAM_PHASES}
+                self.host_histograms[host] = per_host
+            for phase, _ in HISTOGRAM_PHASES:
+                value = getattr(timing, phase)
+                if value is not None:
+                    self.histograms[phase].record(value)
+                    per_host[phase].record(value)
+
+    def add_setup(self, phase: str, seconds: float):
+        with self.lock:
+            self.setup_histograms[phase].record(seconds)
+
+    def timing_summary(self) -> Dict:
+        """Percentiles par phase, globaux et par hôte, et ceux du préchauffage"""
+        with self.lock:
+            return {
+                'global': {phase: h.summary() for phase, h in self.histograms.items()},
+                'hosts': {host: {phase: h.summary() for phase, h in histograms.items()}
+                          for host, histograms in sorted(self.host_histograms.items())},
+                'setup': {phase: h.summary() for phase, h in self.setup_histograms.items()},
+            }
+
+    def task_queued(self):
+        with self.lock:
+            self.queued += 1
+
+    def task_started(self):
+        with self.lock:
+            self.queued -= 1
 
-    def add_skip(self):
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def add_retry(self):
+        with self.lock:
+            self.retries += 1
+
+    def add_throttle(self, host: str, seconds: float):
+        """Temps passé par un lecteur à attendre le seau à jetons"""
+        with self.lock:
+            self.host_throttle[host] = self.host_throttle.get(host, 0.0) + seconds
+
+    def add_rejected(self):
+        """Corps reçu puis refusé par la vérification (non-image, image tronquée)"""
+        with self.lock:
+            self.rejected += 1
+
+    def add_resume(self):
+        with self.lock:
+            self.resumed_images += 1
+
+    def add_deduplicated(self, size: int):
+        with self.lock:
+            self.deduplicated_images += 1
+            self.deduplicated_bytes += size
+
+    def add_skip(self, count: int = 1, project: str = ''):
+        with self.lock:
+            self.skipped_images += count
+            self._count_project(project, 'skipped', count)
+
+    def add_unchanged(self, project: str = ''):
+        """Page revalidée (304): comptée comme déjà présente"""
         with self.lock:
             self.skipped_images += 1
+            self.unchanged_images += 1
+            self._count_project(project, 'skipped')
+
+    def project_stats(self, project: str) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.projects.get(project)
+                        or {'downloaded': 0, 'failed': 0, 'skipped': 0, 'bytes': 0})
 
     def get_stats(self):
         with self.lock:
@@ -83,9 +511,341 @@ class DownloadStats:
                 'downloaded': self.downloaded_images,
                 'failed': self.failed_images,
                 'skipped': self.skipped_images,
+                'resumed': self.resumed_images,
+                'unchanged': self.unchanged_images,
+                'deduplicated': self.deduplicated_images,
+                'deduplicated_bytes': self.deduplicated_bytes,
+                'bytes': self.bytes_downloaded,
+                'queued': self.queued,
+                'in_flight': self.in_flight,
+                'retries': self.retries,
+                'rejected': self.rejected,
+                'host_errors': dict(self.host_errors),
+                'throttled_seconds': sum(self.host_throttle.values()),
+                'host_throttle': dict(self.host_throttle),
             }
 
 
+@dataclass
+class DownloadContext:
+    """État partagé par toutes les tâches d'un run, transmis aux deux moteurs"""
+    stats: DownloadStats
+    limiter: Optional['AdaptiveHostLimiter'] = None
+    ledger: Optional['DownloadLedger'] = None
+    revalidate: bool = False
+    store: Optional['ContentStore'] = None
+    archives: Optional['ArchiveRouter'] = None
+    tracker: Optional['ChapterTracker'] = None
+    project: str = ''
+    verifier: Optional['ImageVerifier'] = None
+    bandwidth: Optional['BandwidthLimiter'] = None
+    retries: Optional['DeferredRetries'] = None
+
+
+@dataclass
+class HostState:
+    limit: float
+    in_flight: int = 0
+    min_latency: Optional[float] = None
+    ewma_latency: Optional[float] = None
+    last_decrease: float = 0.0
+    peak_limit: float = 0.0
+    throttled: int = 0
+    server_errors: int = 0
+    network_errors: int = 0
+    async_waiters: List = field(default_factory=list)
+
+
+class AdaptiveHostLimiter:
+    """
+    Limite la concurrence par hôte selon un schéma AIMD (additive increase,
+    multiplicative decrease), comme le contrôle de congestion TCP.
+
+    Chaque succès ajoute 1/limite (soit +1 par « fenêtre » complète); un 429,
+    un 5xx ou une erreur réseau divise la limite par deux, au plus une fois
+    par AIMD_COOLDOWN secondes pour qu'une rafale d'erreurs ne la fasse pas
+    s'effondrer à 1. Une latence qui dérive au-delà de AIMD_LATENCY_FACTOR fois
+    le minimum observé freine plus doucement. `ceiling` (le -w) reste le plafond.
+
+    Utilisable depuis des threads (acquire/release) comme depuis une boucle
+    asyncio (acquire_async/release, appelés dans le thread de la boucle).
+    HostQueues passe par try_acquire: un hôte saturé n'immobilise pas un worker.
+    """
+
+    def __init__(self, ceiling: int, initial: int = AIMD_INITIAL_LIMIT):
+        self.ceiling = max(1, ceiling)
+        self.initial = max(1, min(initial, self.ceiling))
+        self.lock = threading.Lock()
+        self.condition = threading.Condition(self.lock)
+        self.hosts: Dict[str, HostState] = {}
+
+    def _state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = HostState(limit=float(self.initial), peak_limit=float(self.initial))
+            self.hosts[host] = state
+        return state
+
+    def acquire(self, host: str):
+        with self.condition:
+            state = self._state(host)
+            while state.in_flight >= int(state.limit):
+                self.condition.wait()
+            state.in_flight += 1
+
+    def try_acquire(self, host: str) -> bool:
+        """Prend une place sans attendre; False si l'hôte est à sa limite"""
+        with self.lock:
+            state = self._state(host)
+            if state.in_flight >= int(state.limit):
+                return False
+            state.in_flight += 1
+            return True
+
+    def cancel(self, host: str):
+        """Rend une place prise pour une page finalement sans requête (déjà présente)"""
+        with self.condition:
+            state = self._state(host)
+            state.in_flight -= 1
+            self.condition.notify_all()
+            waiters, state.async_waiters = state.async_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def acquire_async(self, host: str):
+        while True:
+            with self.lock:
+                state = self._state(host)
+                if state.in_flight < int(state.limit):
+                    state.in_flight += 1
+                    return
+                waiter = asyncio.get_running_loop().create_future()
+                state.async_waiters.append(waiter)
+            await waiter
+
+    def release(self, host: str, status: Optional[int], latency: Optional[float]):
+        """
+        Libère une place et ajuste la limite. `status` vaut None pour une erreur
+        réseau (timeout, connexion refusée...), `latency` est le délai jusqu'aux en-têtes.
+        """
+        with self.condition:
+            state = self._state(host)
+            state.in_flight -= 1
+            now = time.monotonic()
+
+            if status is None or status == 429 or status >= 500:
+                if status is None:
+                    state.network_errors += 1
+                elif status == 429:
+                    state.throttled += 1
+                else:
+                    state.server_errors += 1
+                self._decrease(state, AIMD_DECREASE_FACTOR, now)
+            elif status < 400 and latency is not None:
+                if state.min_latency is None or latency < state.min_latency:
+                    state.min_latency = latency
+                state.ewma_latency = (latency if state.ewma_latency is None
+                                      else 0.8 * state.ewma_latency + 0.2 * latency)
+                if state.ewma_latency > AIMD_LATENCY_FACTOR * max(state.min_latency, 0.01):
+                    self._decrease(state, AIMD_LATENCY_DECREASE, now)
+                else:
+                    state.limit = min(float(self.ceiling), state.limit + 1.0 / state.limit)
+                    state.peak_limit = max(state.peak_limit, state.limit)
+
+            self.condition.notify_all()
+            waiters, state.async_waiters = state.async_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @staticmethod
+    def _decrease(state: HostState, factor: float, now: float):
+        if now - state.last_decrease < AIMD_COOLDOWN:
+            return
+        state.limit = max(1.0, state.limit * factor)
+        state.last_decrease = now
+
+    def summary(self) -> List[Tuple[str, HostState]]:
+        with self.lock:
+            return sorted(self.hosts.items())
+
+
+class TokenBucket:
+    """
+    Seau à jetons en octets/s. Un prélèvement peut rendre le solde négatif:
+    le lecteur dort alors le temps de rembourser sa dette. Chacun réserve ainsi
+    sa part dans l'ordre d'arrivée, sans boucle d'attente active.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = float(rate)
+        self.capacity = max(self.rate * BANDWIDTH_BURST_SECONDS, BANDWIDTH_MIN_BURST)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount: int) -> float:
+        """Prélève `amount` octets; renvoie l'attente à respecter (s)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+class BandwidthLimiter:
+    """
+    Plafonne le débit, globalement et/ou par hôte, pendant la lecture du corps:
+    chaque bloc reçu est décompté des seaux concernés et le lecteur dort si
+    l'un d'eux est à découvert. TCP répercute ce ralentissement au serveur par
+    la fenêtre de réception. La concurrence peut donc rester élevée (les petites
+    pages ne paient plus la latence) sans que le débit total dépasse le plafond.
+    """
+
+    def __init__(self, stats: DownloadStats, global_rate: Optional[float] = None,
+                 host_rate: Optional[float] = None):
+        self.stats = stats
+        self.global_bucket = TokenBucket(global_rate) if global_rate else None
+        self.host_rate = host_rate
+        self.hosts: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def _reserve(self, host: str, amount: int) -> float:
+        wait = self.global_bucket.reserve(amount) if self.global_bucket else 0.0
+        if self.host_rate:
+            with self.lock:
+                bucket = self.hosts.get(host)
+                if bucket is None:
+                    bucket = self.hosts[host] = TokenBucket(self.host_rate)
+            wait = max(wait, bucket.reserve(amount))
+        if wait > 0:
+            self.stats.add_throttle(host, wait)
+        return wait
+
+    def throttle(self, host: str, amount: int):
+        wait = self._reserve(host, amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def throttle_async(self, host: str, amount: int):
+        wait = self._reserve(host, amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def read_size(self) -> int:
+        """Plus grande lecture qui tient dans une rafale: le bridage reste régulier"""
+        capacities = [self.global_bucket.capacity] if self.global_bucket else []
+        if self.host_rate:
+            capacities.append(max(self.host_rate * BANDWIDTH_BURST_SECONDS, BANDWIDTH_MIN_BURST))
+        return int(min(capacities))
+
+
+# --------------------------------------------------------------------------- #
+# Ordonnancement par chapitre
+# --------------------------------------------------------------------------- #
+
+@dataclass
+class ChapterProgress:
+    folder: Path
+    admitted: int = 0
+    pending: int = 0
+    failed: int = 0
+    skipped: int = 0
+    sealed: bool = False
+
+
+class ChapterTracker:
+    """
+    Suit l'avancement de chaque chapitre et signale ceux qui se terminent.
+
+    Les tâches arrivent chapitre par chapitre (TaskTable.tasks): un
+    chapitre est « scellé » dès que le générateur passe au suivant, et terminé
+    quand il est scellé et que toutes ses tâches ont abouti (succès, échec ou
+    saut). Avec `window` > 0, un nouveau chapitre n'est admis que si moins de
+    `window` chapitres sont encore ouverts: tous les workers se concentrent
+    sur les chapitres les plus bas, qui se terminent l'un après l'autre.
+
+    `admit` ne bloque jamais: c'est JobScheduler qui met en attente un projet
+    dont la fenêtre est pleine, et les listeners qui le réveillent.
+    """
+
+    def __init__(self, window: int = 0):
+        self.window = max(0, window)
+        self.condition = threading.Condition()
+        self.chapters: Dict[str, ChapterProgress] = {}
+        self.current: Optional[str] = None
+        self.listeners: List[Callable[[str, ChapterProgress], None]] = []
+
+    def add_listener(self, callback: Callable[[str, ChapterProgress], None]):
+        """`callback(nom_du_chapitre, progression)` à chaque chapitre terminé"""
+        self.listeners.append(callback)
+
+    def admit(self, task: DownloadTask) -> bool:
+        """Enregistre la tâche; False si elle ouvre un chapitre hors fenêtre"""
+        completed = None
+        with self.condition:
+            name = task.chapter_name
+            if name != self.current:
+                if self.current is not None:
+                    completed = self._seal(self.current)
+                if self.window and len(self.chapters) >= self.window:
+                    admitted = False
+                else:
+                    self.current = name
+                    self.chapters[name] = ChapterProgress(folder=task.folder)
+                    admitted = True
+            else:
+                admitted = True
+            if admitted:
+                self.chapters[name].admitted += 1
+                self.chapters[name].pending += 1
+        self._notify(completed)
+        return admitted
+
+    def snapshot(self) -> List[Tuple[str, int, int, bool]]:
+        """Chapitres ouverts: (nom, pages terminées, pages admises, scellé)"""
+        with self.condition:
+            return [(name, p.admitted - p.pending, p.admitted, p.sealed)
+                    for name, p in self.chapters.items()]
+
+    def finish(self):
+        """Fin du générateur: le dernier chapitre est scellé"""
+        with self.condition:
+            completed = self._seal(self.current) if self.current is not None else None
+            self.current = None
+        self._notify(completed)
+
+    def task_done(self, task: DownloadTask, failed: bool = False, skipped: bool = False):
+        completed = None
+        with self.condition:
+            progress = self.chapters.get(task.chapter_name)
+            if progress is None:
+                return
+            progress.pending -= 1
+            progress.failed += int(failed)
+            progress.skipped += int(skipped)
+            if progress.sealed and progress.pending <= 0:
+                completed = (task.chapter_name, self.chapters.pop(task.chapter_name))
+        self._notify(completed)
+
+    def _seal(self, name: str) -> Optional[Tuple[str, ChapterProgress]]:
+        progress = self.chapters.get(name)
+        if progress is None or progress.sealed:
+            return None
+        progress.sealed = True
+        if progress.pending <= 0:
+            return name, self.chapters.pop(name)
+        return None
+
+    def _notify(self, completed: Optional[Tuple[str, ChapterProgress]]):
+        if completed is None:
+            return
+        for callback in self.listeners:
+            callback(*completed)
+
+
 # --------------------------------------------------------------------------- #
 # Utilitaires
 # --------------------------------------------------------------------------- #
@@ -97,6 +857,18 @@ def sanitize_filename(filename: str) -> str:
     return filename.rstrip('. ')[:150]
 
 
+def parse_rate(text: str) -> float:
+    """Débit en octets/s: '500K', '2M', '1.5G' (puissances de 1024) ou un nombre"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?[bo])?(?:/s)?', text.strip().lower())
+    if not match or float(match.group(1)) <= 0:
+        raise argparse.ArgumentTypeError(f"débit invalide: {text} (exemples: 500K, 2M)")
+    return float(match.group(1)) * {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}[match.group(2)]
+
+
+def format_rate(rate: float) -> str:
+    return f"{rate / (1024 * 1024):.2f} Mo/s" if rate >= 1024 * 1024 else f"{rate / 1024:.0f} Ko/s"
+
+
 def extract_chapter_number(chapter_name: str) -> float:
     """
     Extrait le numéro de chapitre pour le tri.
@@ -126,6 +898,10 @@ def format_chapter_number(number: float) -> str:
     return f"{integer_part:03d}.{decimal_part}"
 
 
+def page_filename(page_number: int, extension: str) -> str:
+    return f"page_{page_number:03d}.{extension}"
+
+
 def guess_extension(image_url: str, fallback_index: int) -> str:
     """Détermine l'extension de l'image à partir de l'URL"""
     parsed_url = urlparse(image_url)
@@ -143,197 +919,2364 @@ def guess_extension(image_url: str, fallback_index: int) -> str:
     return 'jpg'
 
 
-def create_session() -> requests.Session:
-    """Crée une session réutilisable avec des optimisations"""
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
-                       '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-    })
-    adapter = requests.adapters.HTTPAdapter(
-        pool_connections=20,
-        pool_maxsize=20,
-        max_retries=requests.adapters.Retry(
-            total=3,
-            backoff_factor=0.3,
-            status_forcelist=[500, 502, 503, 504],
-        ),
-    )
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-    return session
+class CountingRetry(requests.adapters.Retry):
+    """Retry urllib3 qui signale chaque nouvelle tentative (compteur des métriques)"""
+
+    def __init__(self, *args, on_retry: Optional[Callable[[], None]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_retry = on_retry
+
+    def new(self, **kwargs) -> 'CountingRetry':
+        kwargs.setdefault('on_retry', self.on_retry)
+        return super().new(**kwargs)
+
+    def increment(self, *args, **kwargs) -> 'CountingRetry':
+        # Lève MaxRetryError quand le budget est épuisé: seule une vraie relance est comptée
+        retry = super().increment(*args, **kwargs)
+        if self.on_retry:
+            self.on_retry()
+        return retry
+
+
+# Durée de la dernière connexion ouverte par le thread courant: le moteur
+# threads est synchrone, la connexion éventuelle a donc eu lieu pendant sa requête
+_connect_timing = threading.local()
+
+
+class DnsCache:
+    """
+    Résolutions DNS du run: une par hôte (getaddrinfo), servie ensuite depuis
+    la mémoire pendant DNS_CACHE_TTL secondes. Utilisée par les connexions
+    urllib3 du moteur threads et par le resolver aiohttp du moteur asyncio.
+    """
+
+    def __init__(self, ttl: float = DNS_CACHE_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Tuple[float, List]] = {}
+
+    def lookup(self, host: str) -> List:
+        """Résultats getaddrinfo (port 0) de l'hôte; lève OSError s'il est introuvable"""
+        with self.lock:
+            entry = self.entries.get(host)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        infos = socket.getaddrinfo(host, 0, type=socket.SOCK_STREAM)
+        with self.lock:
+            self.entries[host] = (time.monotonic(), infos)
+        return infos
+
+    def address(self, host: str) -> Optional[str]:
+        """Première adresse connue de l'hôte; None laisse urllib3 résoudre (et signaler l'erreur)"""
+        try:
+            return self.lookup(host)[0][4][0]
+        except (OSError, IndexError):
+            return None
+
+    def forget(self, host: str):
+        with self.lock:
+            self.entries.pop(host, None)
+
+    def prefetch(self, hosts: Iterable[str], stats: 'DownloadStats') -> List[str]:
+        """Résout tous les hôtes en parallèle; retourne ceux qui sont introuvables"""
+        def resolve(host: str) -> Optional[str]:
+            started = time.monotonic()
+            try:
+                self.lookup(host)
+            except OSError:
+                return host
+            stats.add_setup('dns', time.monotonic() - started)
+            return None
+
+        hosts = list(hosts)
+        with ThreadPoolExecutor(max_workers=max(1, min(PREWARM_THREADS, len(hosts)))) as pool:
+            return [host for host in pool.map(resolve, hosts) if host]
+
+
+class _TimedConnectionMixin:
+    # Renseigné par le préchauffage: les connexions s'ouvrent alors sans requête DNS
+    dns_cache: Optional[DnsCache] = None
+
+    def _new_conn(self):
+        address = self.dns_cache.address(self._dns_host) if self.dns_cache else None
+        if address is None:
+            return super()._new_conn()
+        # Seul le socket vise l'adresse: SNI, certificat et en-tête Host gardent le nom
+        host, self._dns_host = self._dns_host, address
+        try:
+            return super()._new_conn()
+        except Exception:
+            self.dns_cache.forget(host)
+            raise
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        started = time.monotonic()
+        super().connect()
+        _connect_timing.elapsed = time.monotonic() - started
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter dont les connexions mesurent leur établissement (TCP + TLS)"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class ConnectionWarmer:
+    """
+    Préchauffage avant le premier téléchargement. Toutes les URL sont connues
+    d'avance, donc tous les hôtes: leurs DNS sont résolus en parallèle (DnsCache)
+    et des connexions keep-alive sont ouvertes dans les pools des moteurs, si
+    bien que la première page de chaque hôte ne paie plus DNS + TCP + TLS dans
+    un créneau de worker. Au plus PREWARM_MAX_CONNECTIONS connexions, réparties
+    entre les hôtes; les durées vont dans DownloadStats.setup_histograms.
+    """
+
+    def __init__(self, origins: Dict[str, str], stats: 'DownloadStats'):
+        self.origins = origins  # schéma://hôte[:port] -> première URL de cet hôte
+        self.stats = stats
+        self.dns = DnsCache()
+        self.warmed = False
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def per_origin(self, available: int) -> int:
+        return max(1, min(available, PREWARM_MAX_CONNECTIONS // max(1, len(self.origins))))
+
+    def resolve(self) -> List[str]:
+        return self.dns.prefetch({urlparse(origin).hostname for origin in self.origins},
+                                 self.stats)
+
+    def _pool(self, session: requests.Session, origin: str) -> HTTPConnectionPool:
+        # Même pool que celui que choisira requests: la clé inclut la config TLS,
+        # complétée par l'environnement (REQUESTS_CA_BUNDLE, proxies...)
+        settings = session.merge_environment_settings(origin, {}, None, None, None)
+        return session.get_adapter(origin).get_connection_with_tls_context(
+            requests.Request('GET', origin).prepare(), verify=settings['verify'],
+            proxies=settings['proxies'], cert=settings['cert'])
+
+    def _connect(self, connection: HTTPConnection):
+        try:
+            started = time.monotonic()
+            connection.connect()
+            self.stats.add_setup('connect', time.monotonic() - started)
+            with self.lock:
+                self.opened += 1
+        except Exception:
+            connection.close()
+
+    def warm_sessions(self, sessions: Dict[str, requests.Session], workers: int):
+        """
+        Moteur threads: chaque hôte a sa session (voir HostQueues), on y ouvre
+        une connexion par worker susceptible de la servir. Toutes sont sorties
+        du pool avant d'être ouvertes puis rendues ensemble: la file du pool est
+        LIFO, une connexion rendue trop tôt serait reprise et rouverte.
+        """
+        if self.warmed:
+            return
+        self.warmed = True
+        count = self.per_origin(workers)
+        checked_out = []
+        try:
+            for origin in self.origins:
+                try:
+                    pool = self._pool(sessions[origin], origin)
+                except requests.exceptions.RequestException:
+                    continue  # schéma non HTTP: la page échouera, en permanent, au téléchargement
+                checked_out.extend((pool, pool._get_conn()) for _ in range(count))
+            with ThreadPoolExecutor(max_workers=max(1, min(PREWARM_THREADS,
+                                                           len(checked_out)))) as executor:
+                list(executor.map(lambda item: self._connect(item[1]), checked_out))
+        finally:
+            for pool, connection in checked_out:
+                pool._put_conn(connection)
+
+    def warm_http2(self, session: 'Http2Session'):
+        """
+        --http2: les flux d'un hôte se partagent une connexion, une par hôte
+        suffit. Un HEAD sur la première URL de chaque hôte l'ouvre dans le pool
+        du client httpx (qui fait sa propre résolution DNS).
+        """
+        if self.warmed:
+            return
+        self.warmed = True
+
+        def head(url: str):
+            _connect_timing.elapsed = None
+            try:
+                session.client.head(url, extensions={'trace': _trace_connect})
+            except (httpx.HTTPError, httpx.InvalidURL):
+                return
+            if _connect_timing.elapsed is not None:
+                self.stats.add_setup('connect', _connect_timing.elapsed)
+                with self.lock:
+                    self.opened += 1
+
+        with ThreadPoolExecutor(max_workers=max(1, min(PREWARM_THREADS,
+                                                       len(self.origins)))) as executor:
+            list(executor.map(head, self.origins.values()))
+
+    async def warm_async(self, session: 'aiohttp.ClientSession', connections: int):
+        """
+        Moteur asyncio: aiohttp n'offre pas d'ouverture de connexion nue, on
+        envoie des HEAD sur la première URL de chaque hôte; la connexion reste
+        ensuite dans le pool keep-alive de la session.
+        """
+        if self.warmed:
+            return
+        self.warmed = True
+
+        async def head(url: str):
+            timing = RequestTiming()
+            try:
+                async with session.head(url, allow_redirects=False, trace_request_ctx=timing):
+                    pass
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return
+            if timing.connect is not None:
+                self.stats.add_setup('connect', timing.connect)
+                self.opened += 1
+
+        count = self.per_origin(connections)
+        await asyncio.gather(*(head(url) for url in self.origins.values() for _ in range(count)))
+
+
+def collect_origins(task_streams: Iterable[Iterable[DownloadTask]]) -> Dict[str, str]:
+    """Origines (schéma://hôte[:port]) des tâches, avec la première URL de chacune"""
+    origins: Dict[str, str] = {}
+    for tasks in task_streams:
+        for task in tasks:
+            parsed = urlparse(task.url)
+            origins.setdefault(f"{parsed.scheme}://{parsed.netloc}", task.url)
+    return origins
+
+
+def create_session(on_retry: Optional[Callable[[], None]] = None,
+                   pool_size: int = 20) -> requests.Session:
+    """
+    Crée une session réutilisable avec des optimisations. `pool_size` borne les
+    connexions gardées ouvertes par hôte: au-delà, urllib3 ferme la connexion
+    après usage au lieu de la rendre au pool.
+    """
+    session = requests.Session()
+    session.headers.update({'User-Agent': USER_AGENT})
+    adapter = TimedHTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=pool_size,
+        max_retries=CountingRetry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            on_retry=on_retry,
+        ),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _trace_connect(event_name: str, info: Dict):
+    """Extension « trace » de httpcore: durée d'ouverture des connexions (TCP + TLS)"""
+    if event_name == 'connection.connect_tcp.started':
+        _connect_timing.started = time.monotonic()
+    elif event_name in ('connection.connect_tcp.complete', 'connection.start_tls.complete'):
+        _connect_timing.elapsed = time.monotonic() - _connect_timing.started
+
+
+class Http2Response:
+    """Réponse httpx présentée avec l'interface requests qu'utilise download_image"""
+
+    def __init__(self, response: 'httpx.Response'):
+        self.raw = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.reason = response.reason_phrase
+        self.url = str(response.url)
+
+    def iter_content(self, chunk_size: int = 8192) -> Iterator[bytes]:
+        # Le flux est refermé par httpx une fois lu jusqu'au bout
+        return self.raw.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            self.close()
+            kind = 'Client' if self.status_code < 500 else 'Server'
+            # Même message et même type que requests: classify_failure s'applique tel quel
+            raise requests.HTTPError(f"{self.status_code} {kind} Error: {self.reason} "
+                                     f"for url: {self.url}", response=self)
+
+    def close(self):
+        self.raw.close()
+
+
+class Http2Session:
+    """
+    --http2: un seul client httpx, partagé par tous les workers du moteur threads.
+    Les requêtes vers un même hôte deviennent des flux multiplexés sur quelques
+    connexions, au lieu d'une connexion TLS par worker: moins de poignées de
+    main, et plus de rafales de connexions qui déclenchent les protections du
+    CDN. Un serveur sans HTTP/2 (ALPN) est servi en HTTP/1.1 par le même client.
+
+    N'expose que get(), avec la politique de relance de create_session
+    (RETRY_TOTAL, RETRY_BACKOFF, RETRY_STATUSES et Retry-After). Comme urllib3,
+    une URL invalide ou d'un schéma non HTTP échoue sans relance.
+    """
+
+    def __init__(self, connections: int, on_retry: Optional[Callable[[], None]] = None):
+        self.client = httpx.Client(
+            http2=True,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(max_connections=connections,
+                                max_keepalive_connections=connections),
+            timeout=REQUEST_TIMEOUT,
+            follow_redirects=True,
+        )
+        self.on_retry = on_retry
+        self.lock = threading.Lock()
+        self.protocols: Dict[str, int] = {}
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: float = REQUEST_TIMEOUT, stream: bool = True) -> Http2Response:
+        for attempt in range(RETRY_TOTAL + 1):
+            delay = RETRY_BACKOFF * (2 ** attempt)
+            request = self.client.build_request('GET', url, headers=headers, timeout=timeout,
+                                                extensions={'trace': _trace_connect})
+            try:
+                response = self.client.send(request, stream=True)
+            except httpx.UnsupportedProtocol:
+                # Schéma autre que http(s): échec permanent, aucune relance (classify_failure)
+                raise
+            except httpx.TransportError:
+                if attempt == RETRY_TOTAL:
+                    raise
+            else:
+                with self.lock:
+                    self.protocols[response.http_version] = \
+                        self.protocols.get(response.http_version, 0) + 1
+                retry_after = (parse_retry_after(response.headers.get('Retry-After'))
+                               if response.status_code in RETRY_AFTER_STATUSES else None)
+                if attempt == RETRY_TOTAL or (response.status_code not in RETRY_STATUSES
+                                              and retry_after is None):
+                    return Http2Response(response)
+                response.close()
+                delay = max(delay, retry_after or 0.0)
+            if self.on_retry:
+                self.on_retry()
+            time.sleep(delay)
+
+    def close(self):
+        self.client.close()
+
+
+# --------------------------------------------------------------------------- #
+# Registre de téléchargement (SQLite)
+# --------------------------------------------------------------------------- #
+
+class DownloadLedger:
+    """
+    Registre persistant d'un projet: chemin -> URL, taille, SHA-256,
+    validateurs HTTP et statut ('done', 'failed', ou 'pending' pour une page
+    terminée dont le fichier a disparu depuis).
+
+    Un re-run sans changement répond à « qu'est-ce qui reste ? » par une seule
+    requête indexée et une lecture de chaque dossier de chapitre au lieu d'un
+    stat() par page, et build_all_cbr y lit la liste des images au lieu de
+    parcourir chaque dossier. Les écritures des workers sont regroupées et
+    validées par lots de LEDGER_FLUSH_EVERY.
+
+    Le journal reste en mode rollback (pas de WAL), qui n'est pas fiable sur
+    un partage réseau (SMB/NFS).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            path TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            chapter TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            size INTEGER,
+            sha256 TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            status TEXT NOT NULL,
+            error TEXT,
+            updated_at REAL NOT NULL,
+            failure_type TEXT,
+            verified INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS pages_status ON pages(status);
+        CREATE INDEX IF NOT EXISTS pages_url ON pages(url);
+    """
+
+    def __init__(self, db_path: Path, root: Path, trust_done: bool = True):
+        self.db_path = db_path
+        self.root = root
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(pages)")}
+        if 'failure_type' not in columns:
+            # Registre d'une version précédente: le type de ses échecs reste à déduire
+            self.conn.execute("ALTER TABLE pages ADD COLUMN failure_type TEXT")
+        if 'verified' not in columns:
+            # Ses pages n'ont jamais été inspectées par --verify-images
+            self.conn.execute("ALTER TABLE pages ADD COLUMN verified INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+        self._pending: List[Tuple] = []
+        self._pending_verified: List[Tuple[str, str]] = []
+        self._done: Dict[str, str] = {}
+        # Pages terminées qui ont passé la vérification complète (--verify-images)
+        self._verified: set = set()
+        if trust_done:
+            self._load_done()
+
+    def _load_done(self):
+        """
+        Charge les pages terminées dont le fichier existe encore: un listdir par
+        dossier de chapitre (lignes triées par chemin), pas de stat() par page.
+        Une page supprimée depuis (dossier nettoyé à la main...) repasse
+        'pending': elle sera retéléchargée et n'est plus proposée à build_all_cbr.
+        """
+        missing: List[Tuple[str]] = []
+        folder, names = None, set()
+        for path, url, verified in self.conn.execute(
+                "SELECT path, url, verified FROM pages WHERE status = 'done' ORDER BY path"):
+            parent, _, name = path.rpartition('/')
+            if parent != folder:
+                folder = parent
+                try:
+                    names = set(os.listdir(self.root / parent))
+                except OSError:
+                    names = set()
+            if name not in names:
+                missing.append((path,))
+                continue
+            self._done[path] = url
+            if verified:
+                self._verified.add(path)
+        if missing:
+            self.conn.executemany(
+                "UPDATE pages SET status = 'pending' WHERE path = ?", missing)
+            self.conn.commit()
+
+    def _key(self, task: DownloadTask) -> str:
+        return task.filepath.relative_to(self.root).as_posix()
+
+    def is_done(self, task: DownloadTask, verified: bool = False) -> bool:
+        """Page terminée d'après le registre; `verified`: et passée par --verify-images"""
+        key = self._key(task)
+        return self._done.get(key) == task.url and (not verified or key in self._verified)
+
+    def conditional_headers(self, task: DownloadTask) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since d'après les validateurs enregistrés"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified FROM pages "
+                "WHERE path = ? AND url = ? AND status = 'done'",
+                (self._key(task), task.url)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row and row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def _record(self, row: Tuple):
+        with self.lock:
+            self._pending.append(row)
+            if len(self._pending) >= LEDGER_FLUSH_EVERY:
+                self._flush_locked()
+
+    def record_done(self, task: DownloadTask, size: int, sha256: Optional[str] = None,
+                    etag: Optional[str] = None, last_modified: Optional[str] = None,
+                    verified: bool = False):
+        self._record((self._key(task), task.url, task.chapter_name, task.page_number,
+                      size, sha256, etag, last_modified, 'done', None, time.time(), None,
+                      int(verified)))
+
+    def record_verified(self, task: DownloadTask):
+        """Page terminée inspectée après coup: ses validateurs sont conservés"""
+        with self.lock:
+            self._pending_verified.append((self._key(task), task.url))
+
+    def record_failure(self, task: DownloadTask, error: str, kind: str):
+        self._record((self._key(task), task.url, task.chapter_name, task.page_number,
+                      None, None, None, None, 'failed', error, time.time(), kind, 0))
+
+    def _flush_locked(self):
+        if not self._pending and not self._pending_verified:
+            return
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO pages (path, url, chapter, page, size, sha256, etag, "
+            "last_modified, status, error, updated_at, failure_type, verified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            self._pending)
+        self.conn.executemany(
+            "UPDATE pages SET verified = 1 WHERE path = ? AND url = ? AND status = 'done'",
+            self._pending_verified)
+        self.conn.commit()
+        self._pending = []
+        self._pending_verified = []
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def failures(self) -> List[Tuple[str, int, str, str, Optional[str]]]:
+        """
+        Échecs encore non résolus, y compris ceux des runs précédents (type
+        None pour ceux d'un registre antérieur au classement)
+        """
+        self.flush()
+        with self.lock:
+            return list(self.conn.execute(
+                "SELECT chapter, page, url, error, failure_type FROM pages "
+                "WHERE status = 'failed' ORDER BY path"))
+
+    def chapter_images(self, folder: Path) -> List[Path]:
+        """Pages terminées d'un seul dossier de chapitre (parcours de l'index par préfixe)"""
+        self.flush()
+        prefix = folder.relative_to(self.root).as_posix() + '/'
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM pages WHERE path >= ? AND path < ? AND status = 'done' "
+                "ORDER BY path", (prefix, prefix[:-1] + '0')).fetchall()
+        return [self.root / relative for (relative,) in rows
+                if '/' not in relative[len(prefix):]]
+
+    def images_by_folder(self) -> Dict[Path, List[Path]]:
+        """Pages terminées, regroupées par dossier de chapitre et triées par nom"""
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path FROM pages WHERE status = 'done' ORDER BY path").fetchall()
+        folders: Dict[Path, List[Path]] = {}
+        for (relative,) in rows:
+            path = self.root / relative
+            folders.setdefault(path.parent, []).append(path)
+        return folders
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+
+# --------------------------------------------------------------------------- #
+# Stockage adressé par contenu (--dedupe)
+# --------------------------------------------------------------------------- #
+
+class ContentStore:
+    """
+    Magasin de pages indexé par SHA-256: <racine>/ab/abcdef....
+
+    Les pages de crédits, bannières de recrutement et cartes de fin reviennent
+    dans presque chaque chapitre. Chaque contenu n'est conservé qu'une fois;
+    les dossiers de chapitre n'en reçoivent que des liens durs (à défaut un
+    reflink, à défaut une copie). Le SHA-256 est celui calculé pendant le
+    streaming par PageWriter: aucune relecture du fichier.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def adopt(self, temp_path: Path, sha256: str) -> bool:
+        """
+        Range `temp_path` dans le magasin. Renvoie True si le contenu y était
+        déjà (le fichier temporaire est alors simplement supprimé).
+        """
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            temp_path.unlink(missing_ok=True)
+            return True
+        blob.parent.mkdir(exist_ok=True)
+        try:
+            os.replace(temp_path, blob)
+        except OSError:
+            # Magasin sur un autre volume que la sortie
+            shutil.move(str(temp_path), str(blob))
+        return False
+
+    def materialize(self, sha256: str, destination: Path):
+        """Place le contenu en `destination` (lien dur > reflink > copie), atomiquement"""
+        blob = self.blob_path(sha256)
+        staging = destination.with_suffix(destination.suffix + '.link')
+        staging.unlink(missing_ok=True)
+        try:
+            os.link(blob, staging)
+        except OSError:
+            # Volume différent, FS sans liens durs, ou plafond de liens (1023 sur NTFS)
+            if not self._reflink(blob, staging):
+                shutil.copyfile(blob, staging)
+        os.replace(staging, destination)
+
+    @staticmethod
+    def _reflink(source: Path, destination: Path) -> bool:
+        if fcntl is None:
+            return False
+        try:
+            with open(source, 'rb') as src, open(destination, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            return True
+        except OSError:
+            destination.unlink(missing_ok=True)
+            return False
+
+
+# --------------------------------------------------------------------------- #
+# Sélection du fichier JSON
+# --------------------------------------------------------------------------- #
+
+def describe_json(path: Path) -> Optional[Dict]:
+    """Lit un JSON candidat et en extrait un résumé, ou None s'il est inexploitable"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception:
+        return None
+
+    if not isinstance(data, dict):
+        return None
+    chapters = data.get('chapters')
+    if not isinstance(chapters, dict) or not chapters:
+        return None
+
+    total_images = sum(
+        len(c.get('images', []))
+        for c in chapters.values()
+        if isinstance(c, dict)
+    )
+    return {
+        'path': path,
+        'project_name': data.get('projectName', path.stem),
+        'chapter_count': len(chapters),
+        'image_count': total_images,
+    }
+
+
+def find_json_candidates(directory: Path) -> List[Dict]:
+    """Retourne les fichiers du répertoire exploitables par ce script"""
+    seen = set()
+    candidates = []
+    for pattern in JSON_GLOBS:
+        for path in sorted(directory.glob(pattern)):
+            if path in seen or not path.is_file():
+                continue
+            seen.add(path)
+            info = describe_json(path)
+            if info:
+                candidates.append(info)
+    return candidates
+
+
+def select_json_files(directory: Path) -> Optional[List[Dict]]:
+    """Affiche les JSON disponibles et demande à l'utilisateur de choisir"""
+    print(f"🔍 Recherche des fichiers JSON dans: {directory}\n")
+    candidates = find_json_candidates(directory)
+
+    if not candidates:
+        print("❌ Aucun fichier JSON exploitable trouvé dans ce répertoire.")
+        print("   Le fichier doit contenir un objet 'chapters' non vide.")
+        return None
+
+    print(f"📚 {len(candidates)} fichier(s) exploitable(s) trouvé(s):\n")
+    width = len(str(len(candidates)))
+    for i, info in enumerate(candidates, 1):
+        already = (DEFAULT_OUTPUT_DIR / info['project_name']).is_dir()
+        marker = ' 📂' if already else ''
+        print(f"  [{i:>{width}}] {info['path'].name}{marker}")
+        print(f"       {'└─'} projet: {info['project_name']}  |  "
+              f"{info['chapter_count']} chapitres  |  {info['image_count']} images")
+    print(f"\n  [{'T':>{width}}] Tous (mode lot)")
+    print(f"  [{'0':>{width}}] Annuler\n")
+
+    while True:
+        try:
+            answer = input(f"👉 Votre choix [1-{len(candidates)}, plusieurs: 1,3 | T]: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\n⏹️  Annulé.")
+            return None
+
+        if answer in ('0', 'q', 'Q'):
+            print("⏹️  Annulé.")
+            return None
+        if answer in ('t', 'T', '*'):
+            return candidates
+        choices = [part.strip() for part in answer.split(',') if part.strip()]
+        if choices and all(c.isdigit() and 1 <= int(c) <= len(candidates) for c in choices):
+            return [candidates[int(c) - 1] for c in dict.fromkeys(choices)]
+        print(f"⚠️  Entrée invalide. Saisissez un nombre entre 1 et {len(candidates)}, "
+              f"une liste (1,3) ou T.")
+
+
+# --------------------------------------------------------------------------- #
+# Vérification des images
+# --------------------------------------------------------------------------- #
+
+class InvalidImageError(ValueError):
+    """Corps reçu en entier mais inexploitable: non-image ou image tronquée"""
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """Format d'après la signature des premiers octets, None si non reconnu"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in (b'avif', b'avis', b'heic', b'heix', b'mif1'):
+        return 'avif'
+    if head.startswith(b'\xff\x0a') or head.startswith(b'\x00\x00\x00\x0cJXL \r\n\x87\n'):
+        return 'jxl'
+    if head.startswith(b'BM'):
+        return 'bmp'
+    return None
+
+
+def describe_non_image(head: bytes) -> Optional[str]:
+    """
+    Nature d'un corps textuel reçu à la place d'une image (typiquement la page
+    « Just a moment... » de Cloudflare enregistrée en .webp), None s'il a l'air binaire.
+    """
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith((b'<!doctype html', b'<html', b'<head', b'<body', b'<script')):
+        return 'page HTML'
+    if text.startswith(b'<'):
+        return 'HTML/XML'
+    if text.startswith((b'{', b'[')):
+        return 'JSON'
+    if text and all(32 <= byte < 127 or byte in (9, 10, 13) for byte in text):
+        return 'texte'
+    return None
+
+
+def obvious_non_image(head: bytes) -> Optional[str]:
+    """Contrôle toujours actif: cause du rejet d'un corps manifestement textuel, ou None"""
+    if sniff_image_format(head) is None:
+        nature = describe_non_image(head)
+        if nature:
+            return f"contenu non image ({nature})"
+    return None
+
+
+def check_image_trailer(image_format: str, head: bytes, tail: bytes, size: int) -> Optional[str]:
+    """Contrôle de fin de fichier, sans décodage: cause de rejet ou None"""
+    if image_format == 'jpeg' and b'\xff\xd9' not in tail:
+        return "JPEG tronqué (marqueur de fin absent)"
+    if image_format == 'png' and b'IEND' not in tail:
+        return "PNG tronqué (bloc IEND absent)"
+    if image_format == 'gif' and not tail.rstrip(b'\x00').endswith(b';'):
+        return "GIF tronqué (terminateur absent)"
+    if image_format == 'webp' and int.from_bytes(head[4:8], 'little') + 8 > size:
+        return f"WebP tronqué ({size}/{int.from_bytes(head[4:8], 'little') + 8} octets)"
+    return None
+
+
+def inspect_image(source, decode: bool = False) -> Optional[str]:
+    """
+    Vérifie qu'un fichier (chemin) ou un contenu (bytes) est une image complète:
+    signature connue, fin de fichier cohérente, puis lecture par Pillow si
+    `decode`. Renvoie la cause du rejet, None si l'image est saine.
+    De niveau module: elle peut être confiée au CpuPool.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        size = len(source)
+        head, tail = bytes(source[:SNIFF_BYTES]), bytes(source[-TRAILER_BYTES:])
+    else:
+        size = os.path.getsize(source)
+        with open(source, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+            f.seek(max(0, size - TRAILER_BYTES))
+            tail = f.read()
+    image_format = sniff_image_format(head)
+    if image_format is None:
+        nature = describe_non_image(head)
+        return f"contenu non image ({nature})" if nature else "format d'image non reconnu"
+    problem = check_image_trailer(image_format, head, tail, size)
+    if problem or not decode or not PIL_AVAILABLE:
+        return problem
+    try:
+        # verify() parcourt la structure (blocs, CRC du PNG...) sans décoder les pixels
+        with Image.open(io.BytesIO(source) if isinstance(source, (bytes, bytearray))
+                        else source) as image:
+            image.verify()
+    except Exception as e:
+        return f"image illisible ({image_format}: {str(e)[:60]})"
+    return None
+
+
+class ImageVerifier:
+    """
+    --verify-images: contrôle complet de chaque page reçue, avant son commit.
+
+    Avec --cpu-workers, l'inspection part dans le CpuPool; sinon elle reste dans
+    le thread de téléchargement (moteur threads) ou passe par un thread annexe
+    (moteur asyncio), pour ne jamais bloquer la boucle d'événements.
+    """
+
+    def __init__(self, decode: bool = True, cpu_pool: Optional['CpuPool'] = None):
+        self.decode = decode and PIL_AVAILABLE
+        self.cpu_pool = cpu_pool
+
+    def check(self, writer: 'PageWriter'):
+        writer.check_complete()
+        if self.cpu_pool:
+            problem = self.cpu_pool.run(inspect_image, writer.body(), self.decode)
+        else:
+            problem = inspect_image(writer.body(), self.decode)
+        self._settle(writer, problem)
+
+    async def check_async(self, writer: 'PageWriter'):
+        writer.check_complete()
+        if self.cpu_pool:
+            problem = await self.cpu_pool.run_async(inspect_image, writer.body(), self.decode)
+        else:
+            problem = await asyncio.to_thread(inspect_image, writer.body(), self.decode)
+        self._settle(writer, problem)
+
+    def inspect_file(self, path: Path) -> Optional[str]:
+        """Même contrôle pour une page déjà sur le disque (appelé hors boucle asyncio)"""
+        if self.cpu_pool:
+            return self.cpu_pool.run(inspect_image, str(path), self.decode)
+        return inspect_image(str(path), self.decode)
+
+    @staticmethod
+    def _settle(writer: 'PageWriter', problem: Optional[str]):
+        if problem:
+            # Le corps est faux et non incomplet: aucune reprise par Range possible
+            writer.discard()
+            raise InvalidImageError(problem)
+
+
+# --------------------------------------------------------------------------- #
+# Téléchargement
+# --------------------------------------------------------------------------- #
+
+class PageWriter:
+    """
+    Écrit le corps d'une page dans <page>.part puis le renomme atomiquement.
+
+    Partagé par les deux moteurs: une interruption ne laisse jamais un fichier
+    partiel qui serait ensuite considéré comme complet. Le .part est conservé
+    avec ses validateurs (ETag / Last-Modified / taille totale) dans un fichier
+    <page>.part.meta, ce qui permet de le compléter par une requête Range au
+    lieu de retélécharger l'image entière.
+
+    Usage:
+        writer = PageWriter(task)
+        response = get(url, headers=writer.resume_headers())
+        with writer.open(status, response_headers):
+            for chunk in body: writer.write(chunk)
+        writer.commit()
+    """
+
+    def __init__(self, task: DownloadTask):
+        self.task = task
+        self.temp_path = task.filepath.with_suffix(task.filepath.suffix + '.part')
+        self.meta_path = task.filepath.with_suffix(task.filepath.suffix + '.part.meta')
+        self.bytes_written = 0
+        self.expected_length: Optional[int] = None
+        self.resumed = False
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.sha256: Optional[str] = None
+        self.deduplicated = False
+        self.disk_time = 0.0
+        self.head = b''
+        self._hash = hashlib.sha256()
+        self._file = None
+
+    def _load_meta(self) -> Optional[Dict]:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except Exception:
+            return None
+        return meta if meta.get('url') == self.task.url else None
+
+    def resume_headers(self) -> Dict[str, str]:
+        """En-têtes Range/If-Range si un .part exploitable est présent, sinon {}"""
+        try:
+            offset = self.temp_path.stat().st_size
+        except OSError:
+            return {}
+        meta = self._load_meta()
+        if not offset or not meta:
+            return {}
+        # If-Range exige un validateur fort: un ETag faible (W/"...") ne convient pas
+        etag = meta.get('etag')
+        validator = etag if etag and not etag.startswith('W/') else meta.get('last_modified')
+        if not validator:
+            return {}
+        return {'Range': f'bytes={offset}-', 'If-Range': validator}
+
+    def discard(self):
+        """Abandonne le .part et ses métadonnées (ressource modifiée, 416...)"""
+        self.temp_path.unlink(missing_ok=True)
+        self.meta_path.unlink(missing_ok=True)
+
+    def _parse_response(self, status: int, headers) -> int:
+        """Relève validateurs et taille attendue; renvoie l'offset de reprise"""
+        offset = 0
+        total = headers.get('Content-Length')
+        content_range = headers.get('Content-Range') or ''
+        match = re.match(r'bytes (\d+)-\d+/(\d+|\*)', content_range)
+        if status == 206 and not match:
+            # Corps partiel impossible à situer: l'accepter tronquerait la page
+            self.discard()
+            raise ValueError(f"réponse 206 sans Content-Range exploitable ({content_range!r})")
+        if status == 206:
+            offset = int(match.group(1))
+            total = match.group(2) if match.group(2) != '*' else None
+            try:
+                current = self.temp_path.stat().st_size
+            except OSError:
+                current = -1
+            if offset != current:
+                raise ValueError(f"Content-Range inattendu ({content_range})")
+        self.expected_length = int(total) if total and str(total).isdigit() else None
+        if headers.get('Content-Encoding', 'identity').lower() != 'identity':
+            # Content-Length compte les octets compressés, bytes_written les décodés
+            self.expected_length = None
+        self.resumed = offset > 0
+        self.bytes_written = offset
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+        return offset
+
+    def open(self, status: int, headers) -> 'PageWriter':
+        """
+        Prépare l'écriture selon la réponse: un 206 dont le Content-Range repart
+        exactement de la fin du .part est ajouté à la suite; toute autre réponse
+        (200 d'un serveur qui ignore Range, ressource modifiée...) repart de zéro.
+        """
+        offset = self._parse_response(status, headers)
+        self.task.filepath.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': self.task.url,
+                'etag': self.etag,
+                'last_modified': self.last_modified,
+                'length': self.expected_length,
+            }, f)
+        self._hash = hashlib.sha256()
+        self.head = b''
+        if offset:
+            # Le hachage couvre toute l'image: on relit le début déjà reçu
+            with open(self.temp_path, 'rb') as f:
+                self.head = f.read(SNIFF_BYTES)
+                self._hash.update(self.head)
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    self._hash.update(block)
+        self._file = open(self.temp_path, 'ab' if offset else 'wb')
+        return self
+
+    def __enter__(self) -> 'PageWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def write(self, chunk: bytes):
+        if chunk:
+            started = time.perf_counter()
+            self._file.write(chunk)
+            self.disk_time += time.perf_counter() - started
+            self._hash.update(chunk)
+            self._keep_head(chunk)
+            self.bytes_written += len(chunk)
+
+    def _keep_head(self, chunk: bytes):
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+
+    def body(self):
+        """Ce que la vérification inspecte: le chemin du .part"""
+        return str(self.temp_path)
+
+    def check_complete(self):
+        """
+        Corps vide, tronqué par rapport au Content-Length, ou de toute évidence
+        pas une image (HTML, JSON...) -> exception; la page ne sera pas validée.
+        """
+        if self.bytes_written == 0:
+            self.discard()
+            raise ValueError("réponse vide (0 octet)")
+        if self.expected_length is not None and self.bytes_written != self.expected_length:
+            # Le .part est conservé: le prochain essai le complétera par Range
+            raise ValueError(f"réponse tronquée ({self.bytes_written}/{self.expected_length} octets)")
+        problem = obvious_non_image(self.head)
+        if problem:
+            self.discard()
+            raise InvalidImageError(problem)
+        self.sha256 = self._hash.hexdigest()
+
+    def commit(self, store: Optional[ContentStore] = None):
+        """
+        À appeler après la fermeture: valide le fichier temporaire. Avec un
+        magasin, le contenu y est rangé et la page n'en est qu'un lien.
+        """
+        self.check_complete()
+        started = time.perf_counter()
+        if store:
+            self.deduplicated = store.adopt(self.temp_path, self.sha256)
+            store.materialize(self.sha256, self.task.filepath)
+        else:
+            os.replace(self.temp_path, self.task.filepath)
+        self.meta_path.unlink(missing_ok=True)
+        self.disk_time += time.perf_counter() - started
+
+
+class ArchivePageWriter(PageWriter):
+    """
+    Variante de --stream-to-cbr: le corps est gardé en mémoire puis confié à
+    l'ArchiveRouter, sans jamais devenir un fichier du dossier de chapitre.
+    Pas de .part, donc pas de reprise par Range.
+    """
+
+    def __init__(self, task: DownloadTask, router: 'ArchiveRouter'):
+        super().__init__(task)
+        self.router = router
+        self._buffer = bytearray()
+
+    def resume_headers(self) -> Dict[str, str]:
+        return {}
+
+    def discard(self):
+        self._buffer = bytearray()
+
+    def open(self, status: int, headers) -> 'ArchivePageWriter':
+        self._parse_response(status, headers)
+        self.bytes_written = 0
+        self.resumed = False
+        self._hash = hashlib.sha256()
+        self.head = b''
+        self._buffer = bytearray()
+        return self
+
+    def close(self):
+        pass
+
+    def write(self, chunk: bytes):
+        if chunk:
+            self._buffer += chunk
+            self._hash.update(chunk)
+            self._keep_head(chunk)
+            self.bytes_written += len(chunk)
+
+    def body(self):
+        return bytes(self._buffer)
+
+    def commit(self, store: Optional[ContentStore] = None):
+        self.check_complete()
+        self.router.add_page(self.task, bytes(self._buffer))
+        self._buffer = bytearray()
+
+
+def new_writer(task: DownloadTask, context: 'DownloadContext') -> PageWriter:
+    if context.archives:
+        return ArchivePageWriter(task, context.archives)
+    return PageWriter(task)
+
+
+def is_already_downloaded(task: DownloadTask) -> bool:
+    """Un fichier déjà présent et non vide est considéré comme acquis"""
+    return task.filepath.exists() and task.filepath.stat().st_size > 0
+
+
+def check_existing(task: DownloadTask, context: DownloadContext) -> bool:
+    """
+    Vrai si la page est déjà acquise. Le registre répond sans toucher au disque;
+    à défaut on retombe sur stat(), et une page trouvée ainsi n'y est inscrite
+    qu'après inspection. Avec --verify-images, le registre ne fait foi que pour
+    les pages qui ont déjà passé la vérification complète.
+    En mode --revalidate, seul le disque fait foi: la page va être redemandée.
+    """
+    if context.archives:
+        # Les chapitres déjà archivés ont été écartés en amont, page par page il n'y a rien à voir
+        return False
+    ledger = context.ledger
+    verifier = context.verifier
+    if ledger and ledger.is_done(task, verified=bool(verifier)) and not context.revalidate:
+        return True
+    if not is_already_downloaded(task):
+        return False
+    # Page non garantie par le registre: une page de challenge enregistrée par un
+    # ancien run est retéléchargée au lieu d'être inscrite comme terminée
+    if verifier:
+        problem = verifier.inspect_file(task.filepath)
+    else:
+        with open(task.filepath, 'rb') as f:
+            problem = obvious_non_image(f.read(SNIFF_BYTES))
+    if problem:
+        context.stats.add_rejected()
+        context.stats.add_event(f"🧪 {task.chapter_name} - Page {task.page_number:03d}: "
+                                f"{problem}, retéléchargement")
+        task.filepath.unlink(missing_ok=True)
+        return False
+    if ledger and ledger.is_done(task):
+        if verifier:
+            ledger.record_verified(task)
+    elif ledger:
+        ledger.record_done(task, task.filepath.stat().st_size, verified=bool(verifier))
+    return True
+
+
+def request_headers(task: DownloadTask, context: DownloadContext, writer: 'PageWriter',
+                    existing: bool) -> Dict[str, str]:
+    """
+    En-têtes de la requête: conditionnels pour une page présente qu'on
+    revalide (un 304 ne coûte aucun octet de corps), Range pour un .part à
+    compléter, aucun sinon.
+    """
+    if existing:
+        return context.ledger.conditional_headers(task) if context.ledger else {}
+    return writer.resume_headers()
+
+
+def failure_status(error: Exception) -> Tuple[Optional[int], Optional[str]]:
+    """(code HTTP, en-tête Retry-After) d'une erreur de l'un ou l'autre moteur"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code, error.response.headers.get('Retry-After')
+    if AIOHTTP_AVAILABLE and isinstance(error, aiohttp.ClientResponseError):
+        return error.status, (error.headers or {}).get('Retry-After')
+    return None, None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After en secondes, qu'il soit donné en secondes ou en date HTTP"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def is_permanent_status(status: Optional[int]) -> bool:
+    return status is not None and 400 <= status < 500 and status not in TRANSIENT_CLIENT_STATUSES
+
+
+def classify_failure(error: Exception) -> Tuple[str, Optional[float]]:
+    """FAILURE_PERMANENT ou FAILURE_TRANSIENT, avec le délai Retry-After éventuel"""
+    if isinstance(error, (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema,
+                          requests.exceptions.InvalidSchema)):
+        return FAILURE_PERMANENT, None
+    if AIOHTTP_AVAILABLE and isinstance(error, AIOHTTP_INVALID_URL_ERRORS):
+        return FAILURE_PERMANENT, None
+    if HTTPX_AVAILABLE and isinstance(error, (httpx.InvalidURL, httpx.UnsupportedProtocol)):
+        return FAILURE_PERMANENT, None
+    status, retry_after = failure_status(error)
+    if is_permanent_status(status):
+        return FAILURE_PERMANENT, None
+    return FAILURE_TRANSIENT, parse_retry_after(retry_after)
+
+
+def classify_failure_message(error: str) -> str:
+    """
+    Classement de repli à partir du seul message, pour les journaux et
+    registres antérieurs au champ `type`: les deux moteurs commencent le
+    message d'une erreur HTTP par son code.
+    """
+    match = re.match(r'(\d{3})\b', error)
+    return (FAILURE_PERMANENT if match and is_permanent_status(int(match.group(1)))
+            else FAILURE_TRANSIENT)
+
+
+@dataclass
+class DeferredRetry:
+    task: DownloadTask
+    context: DownloadContext
+    retry_after: Optional[float] = None
+
+
+class DeferredRetries:
+    """
+    Échecs transitoires mis de côté par report_failure, depuis les workers des
+    deux moteurs, puis rejoués en fin de run par run_deferred_retries. L'échec
+    est compté dès la première tentative (le chapitre se termine et s'empaquette
+    normalement) et retiré des compteurs juste avant d'être rejoué.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: List[DeferredRetry] = []
+
+    def defer(self, task: DownloadTask, context: DownloadContext, retry_after: Optional[float]):
+        with self.lock:
+            self.entries.append(DeferredRetry(task, context, retry_after))
+
+    def take(self) -> List[DeferredRetry]:
+        with self.lock:
+            entries, self.entries = self.entries, []
+        return entries
+
+
+def report_skip(task: DownloadTask, context: DownloadContext):
+    context.stats.add_skip(project=context.project)
+    if context.tracker:
+        context.tracker.task_done(task, skipped=True)
+
+
+def report_unchanged(task: DownloadTask, context: DownloadContext):
+    context.stats.add_unchanged(context.project)
+    if context.tracker:
+        context.tracker.task_done(task, skipped=True)
+
+
+def report_success(task: DownloadTask, context: DownloadContext, writer: 'PageWriter'):
+    if writer.resumed:
+        context.stats.add_resume()
+    if writer.deduplicated:
+        context.stats.add_deduplicated(writer.bytes_written)
+    context.stats.add_success(writer.bytes_written, context.project)
+    if context.ledger:
+        context.ledger.record_done(task, writer.bytes_written, writer.sha256,
+                                   writer.etag, writer.last_modified,
+                                   verified=context.verifier is not None)
+    if context.tracker:
+        context.tracker.task_done(task)
+
+
+def report_failure(task: DownloadTask, context: DownloadContext, error: Exception,
+                   elapsed: Optional[float] = None):
+    kind, retry_after = classify_failure(error)
+    context.stats.add_failure(task.chapter_name, task.page_number, task.url, str(error),
+                              elapsed, context.project, kind)
+    if context.ledger:
+        context.ledger.record_failure(task, str(error), kind)
+    if context.archives:
+        context.archives.page_failed(task, str(error), kind)
+    label = f"[{context.project}] " if context.project else ''
+    context.stats.add_event(
+        f"❌ Erreur {label}{task.chapter_name} - Page {task.page_number:03d}: {str(error)[:50]}...")
+    if context.tracker:
+        context.tracker.task_done(task, failed=True)
+    if context.retries:
+        if kind == FAILURE_TRANSIENT:
+            context.retries.defer(task, context, retry_after)
+
+
+class BufferPool:
+    """
+    Tampons de lecture préalloués, partagés par les workers et réutilisés d'une
+    page à l'autre: un gros corps est lu par readinto() dans l'un d'eux, au lieu
+    de centaines de petits `bytes` alloués puis jetés.
+    """
+
+    def __init__(self, size: int = READ_BUFFER_BYTES, keep: int = READ_BUFFER_POOL):
+        self.size = size
+        self.keep = keep
+        self.free: List[bytearray] = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+        return bytearray(self.size)
+
+    def release(self, buffer: bytearray):
+        with self.lock:
+            if len(self.free) < self.keep:
+                self.free.append(buffer)
+
+
+_read_buffers = BufferPool()
+
+
+def read_size(length: Optional[int], limit: Optional[int] = None) -> int:
+    """
+    Taille de lecture d'un corps de `length` octets (None: inconnue): le corps
+    entier s'il est petit, sinon READ_BUFFER_BYTES; jamais plus que `limit`
+    (rafale du plafond de débit)
+    """
+    size = length if length and length <= READ_ONE_SHOT_BYTES else READ_BUFFER_BYTES
+    return min(size, limit) if limit else size
+
+
+def stream_body(response, writer: PageWriter, host: str,
+                bandwidth: Optional[BandwidthLimiter] = None):
+    """
+    Copie le corps de la réponse dans `writer`, la taille de lecture tirée du
+    Content-Length (read_size). Une petite image est lue et écrite en une fois;
+    une grande est lue par readinto() dans un tampon de _read_buffers. Un corps
+    compressé (Content-Encoding) ou une réponse sans flux urllib3 (--http2)
+    passe par iter_content, à la même taille de lecture.
+    """
+    length = response.headers.get('Content-Length', '')
+    size = read_size(int(length) if length.isdigit() else None,
+                     bandwidth.read_size() if bandwidth else None)
+    raw = getattr(response, 'raw', None)
+    encoded = response.headers.get('Content-Encoding', 'identity').lower() != 'identity'
+    if encoded or not isinstance(raw, HTTPResponse):
+        for chunk in response.iter_content(chunk_size=size):
+            writer.write(chunk)
+            if bandwidth:
+                bandwidth.throttle(host, len(chunk))
+        return
+    if size != READ_BUFFER_BYTES:
+        for chunk in iter(lambda: raw.read(size), b''):
+            writer.write(chunk)
+            if bandwidth:
+                bandwidth.throttle(host, len(chunk))
+        return
+    buffer = _read_buffers.acquire()
+    try:
+        with memoryview(buffer) as view:
+            while True:
+                count = raw.readinto(view)
+                if not count:
+                    break
+                with view[:count] as chunk:
+                    writer.write(chunk)
+                if bandwidth:
+                    bandwidth.throttle(host, count)
+    finally:
+        _read_buffers.release(buffer)
+
+
+def download_image(task: DownloadTask, session: requests.Session,
+                   context: DownloadContext, reserved: bool = False) -> bool:
+    """
+    Télécharge une image de manière optimisée. `reserved`: la place du limiteur
+    pour cet hôte a déjà été prise (HostQueues), elle sert au premier essai.
+    """
+    context.stats.task_started()
+    began = time.monotonic()
+    host = urlparse(task.url).netloc
+    limiter = context.limiter
+    reserved = reserved and limiter is not None
+    try:
+        existing = check_existing(task, context)
+        if existing and not context.revalidate:
+            report_skip(task, context)
+            return True
+
+        for attempt in range(VERIFY_RETRIES + 1):
+            writer = new_writer(task, context)
+            if limiter and not reserved:
+                limiter.acquire(host)
+            reserved = False
+            status = latency = None
+            timing = RequestTiming()
+            context.stats.request_started()
+            try:
+                _connect_timing.elapsed = None
+                started = time.monotonic()
+                response = session.get(task.url,
+                                       headers=request_headers(task, context, writer, existing),
+                                       timeout=REQUEST_TIMEOUT, stream=True)
+                if response.status_code == 304:
+                    status, latency = 304, time.monotonic() - started
+                    response.close()
+                    timing.connect, timing.ttfb = _connect_timing.elapsed, latency
+                    context.stats.add_timing(host, timing)
+                    report_unchanged(task, context)
+                    return True
+                if response.status_code == 416:
+                    # Le .part ne correspond plus à la ressource: on repart de zéro
+                    response.close()
+                    writer.discard()
+                    response = session.get(task.url, timeout=REQUEST_TIMEOUT, stream=True)
+                status, latency = response.status_code, time.monotonic() - started
+                response.raise_for_status()
+
+                with writer.open(response.status_code, response.headers):
+                    stream_body(response, writer, host, context.bandwidth)
+                if context.verifier:
+                    context.verifier.check(writer)
+                writer.commit(context.store)
+                timing.connect, timing.ttfb = _connect_timing.elapsed, latency
+                timing.transfer = time.monotonic() - started - latency
+                timing.disk, timing.size = writer.disk_time, writer.bytes_written
+                context.stats.add_timing(host, timing)
+            except InvalidImageError:
+                context.stats.add_rejected()
+                if attempt == VERIFY_RETRIES:
+                    raise
+            else:
+                break
+            finally:
+                context.stats.request_finished()
+                if limiter:
+                    limiter.release(host, status, latency)
+            # Page de challenge ou corps corrompu: nouvel essai après un temps d'attente
+            context.stats.add_retry()
+            time.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+        report_success(task, context, writer)
+        return True
+
+    except Exception as e:
+        report_failure(task, context, e, time.monotonic() - began)
+        return False
+    finally:
+        if reserved:
+            # Page sautée (ou erreur) avant toute requête: la place n'a pas servi
+            limiter.cancel(host)
+
+
+# --------------------------------------------------------------------------- #
+# Moteur asyncio
+# --------------------------------------------------------------------------- #
+
+class CachedResolver(aiohttp.abc.AbstractResolver if AIOHTTP_AVAILABLE else object):
+    """Resolver aiohttp adossé au DnsCache du préchauffage"""
+
+    def __init__(self, cache: DnsCache):
+        self.cache = cache
+
+    async def resolve(self, host: str, port: int = 0,
+                      family: socket.AddressFamily = socket.AF_INET) -> List[Dict]:
+        infos = await asyncio.to_thread(self.cache.lookup, host)
+        return [{'hostname': host, 'host': sockaddr[0], 'port': port, 'family': info_family,
+                 'proto': proto, 'flags': socket.AI_NUMERICHOST | socket.AI_NUMERICSERV}
+                for info_family, _, proto, _, sockaddr in infos
+                if family in (socket.AF_UNSPEC, info_family)]
+
+    async def close(self):
+        pass
+
+
+def create_async_session(connections: int,
+                         dns_cache: Optional[DnsCache] = None) -> 'aiohttp.ClientSession':
+    """
+    Crée une session aiohttp partagée par toutes les coroutines.
+
+    `connections` borne le nombre de connexions par hôte: les requêtes en vol
+    au-delà attendent qu'une connexion keep-alive se libère.
+    """
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=connections, ttl_dns_cache=300,
+                                     resolver=CachedResolver(dns_cache) if dns_cache else None)
+    timeout = aiohttp.ClientTimeout(sock_connect=REQUEST_TIMEOUT, sock_read=REQUEST_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                 headers={'User-Agent': USER_AGENT},
+                                 trace_configs=[connect_trace_config()])
+
+
+def connect_trace_config() -> 'aiohttp.TraceConfig':
+    """Mesure l'ouverture des connexions; la durée est rangée dans le RequestTiming
+    passé en `trace_request_ctx` à session.get"""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_start(session, trace_context, params):
+        trace_context.connect_started = time.monotonic()
+
+    async def on_end(session, trace_context, params):
+        timing = trace_context.trace_request_ctx
+        if isinstance(timing, RequestTiming):
+            timing.connect = time.monotonic() - trace_context.connect_started
+
+    trace_config.on_connection_create_start.append(on_start)
+    trace_config.on_connection_create_end.append(on_end)
+    return trace_config
+
+
+async def download_image_async(task: DownloadTask, session: 'aiohttp.ClientSession',
+                               context: DownloadContext) -> bool:
+    """
+    Équivalent asyncio de download_image, avec la même politique de relance
+    que le Retry urllib3 du moteur threads: erreurs réseau et délais dépassés,
+    RETRY_STATUSES, et RETRY_AFTER_STATUSES accompagnés d'un Retry-After (qui
+    allonge alors l'attente), dans la limite de RETRY_TOTAL. Les accès disque
+    (stat, .part, renommage, registre SQLite) passent par asyncio.to_thread:
+    la boucle ne s'y bloque jamais.
+    """
+    context.stats.task_started()
+    began = time.monotonic()
+    try:
+        existing = await asyncio.to_thread(check_existing, task, context)
+        if existing and not context.revalidate:
+            await asyncio.to_thread(report_skip, task, context)
+            return True
+
+        host = urlparse(task.url).netloc
+        writer = new_writer(task, context)
+        limiter = context.limiter
+        transient = rejected = 0
+        for attempt in range(RETRY_TOTAL + VERIFY_RETRIES + 1):
+            if limiter:
+                await limiter.acquire_async(host)
+            status = latency = None
+            delay = RETRY_BACKOFF * (2 ** attempt)
+            timing = RequestTiming()
+            context.stats.request_started()
+            try:
+                started = time.monotonic()
+                headers = await asyncio.to_thread(request_headers, task, context, writer, existing)
+                async with session.get(task.url, headers=headers,
+                                       trace_request_ctx=timing) as response:
+                    status, latency = response.status, time.monotonic() - started
+                    timing.ttfb = latency
+                    if status == 304:
+                        context.stats.add_timing(host, timing)
+                        await asyncio.to_thread(report_unchanged, task, context)
+                        return True
+                    retry_after = (parse_retry_after(response.headers.get('Retry-After'))
+                                   if status in RETRY_AFTER_STATUSES else None)
+                    retry = (transient < RETRY_TOTAL
+                             and (status == 416 or status in RETRY_STATUSES
+                                  or retry_after is not None))
+                    if retry:
+                        transient += 1
+                        delay = max(delay, retry_after or 0.0)
+                        if status == 416:
+                            # Le .part ne correspond plus à la ressource: on repart de zéro
+                            await asyncio.to_thread(writer.discard)
+                    else:
+                        response.raise_for_status()
+                        await asyncio.to_thread(writer.open, status, response.headers)
+                        try:
+                            await receive_body(response, writer, host, context.bandwidth)
+                        finally:
+                            await asyncio.to_thread(writer.close)
+                if not retry:
+                    if context.verifier:
+                        await context.verifier.check_async(writer)
+                    await asyncio.to_thread(writer.commit, context.store)
+                    timing.transfer = time.monotonic() - started - latency
+                    timing.disk, timing.size = writer.disk_time, writer.bytes_written
+                    context.stats.add_timing(host, timing)
+            except InvalidImageError:
+                context.stats.add_rejected()
+                rejected += 1
+                if rejected > VERIFY_RETRIES:
+                    raise
+                writer = new_writer(task, context)
+                retry = True
+            except (aiohttp.ClientResponseError, *AIOHTTP_INVALID_URL_ERRORS):
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # Connexion refusée ou coupée, délai dépassé: le .part reçu est
+                # conservé, l'essai suivant le complète par Range
+                if transient >= RETRY_TOTAL:
+                    raise
+                transient += 1
+                retry = True
+            finally:
+                context.stats.request_finished()
+                if limiter:
+                    limiter.release(host, status, latency)
+            if not retry:
+                break
+            context.stats.add_retry()
+            await asyncio.sleep(delay)
+
+        await asyncio.to_thread(report_success, task, context, writer)
+        return True
+
+    except Exception as e:
+        await asyncio.to_thread(report_failure, task, context, e, time.monotonic() - began)
+        return False
+
+
+async def receive_body(response: 'aiohttp.ClientResponse', writer: PageWriter, host: str,
+                       bandwidth: Optional[BandwidthLimiter] = None):
+    """
+    Reçoit le corps par blocs de 64 Ko et le confie au writer par lots de
+    READ_BUFFER_BYTES, écrits dans un thread: un appel système pour quelques
+    blocs, et aucun sur la boucle.
+    """
+    pending = bytearray()
+    async for chunk in response.content.iter_chunked(65536):
+        pending += chunk
+        if len(pending) >= READ_BUFFER_BYTES:
+            block, pending = pending, bytearray()
+            await asyncio.to_thread(writer.write, block)
+        if bandwidth:
+            await bandwidth.throttle_async(host, len(chunk))
+    if pending:
+        await asyncio.to_thread(writer.write, pending)
+
+
+class JobScheduler:
+    """
+    Distribue les tâches d'un ou plusieurs projets (mode lot) aux moteurs.
+
+    Chaque projet fournit son générateur de tâches et son DownloadContext
+    (registre, CBR, chapitres); les projets sont servis à tour de rôle, une
+    tâche chacun, si bien qu'un projet de 5 000 pages ne fait pas attendre un
+    projet de 50. Un projet dont la fenêtre de chapitres (--chapter-window)
+    est pleine est sauté jusqu'à ce qu'un de ses chapitres se termine; les
+    autres continuent d'alimenter les workers.
+
+    Itérable depuis le moteur threads (`for`) comme depuis le moteur asyncio
+    (`async for` sur iter_async).
+    """
+
+    def __init__(self, streams: Iterable[Tuple[Iterable[DownloadTask], DownloadContext]]):
+        self.streams: deque = deque()
+        self.wakeup = threading.Event()
+        self.async_wakeup: Optional[asyncio.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        for tasks, context in streams:
+            # [itérateur, contexte, tâche refusée par la fenêtre en attente]
+            self.streams.append([iter(tasks), context, None])
+            if context.tracker:
+                context.tracker.add_listener(self._on_chapter_done)
+
+    def _on_chapter_done(self, chapter_name: str, progress: ChapterProgress):
+        self.wakeup.set()
+        if self.async_wakeup:
+            # Le moteur asyncio termine ses pages dans des threads (asyncio.to_thread)
+            self.loop.call_soon_threadsafe(self.async_wakeup.set)
+
+    def _poll(self) -> Optional[Tuple[DownloadTask, DownloadContext]]:
+        """Prochaine tâche admise en tourniquet; None si tous les projets attendent"""
+        for _ in range(len(self.streams)):
+            stream = self.streams[0]
+            self.streams.rotate(-1)
+            tasks, context, task = stream
+            if task is None:
+                task = next(tasks, None)
+                if task is None:
+                    if context.tracker:
+                        context.tracker.finish()
+                    self.streams.remove(stream)
+                    continue
+            if context.tracker and not context.tracker.admit(task):
+                stream[2] = task
+                continue
+            stream[2] = None
+            return task, context
+        return None
+
+    def __iter__(self) -> Iterator[Tuple[DownloadTask, DownloadContext]]:
+        while self.streams:
+            self.wakeup.clear()
+            job = self._poll()
+            if job:
+                yield job
+            elif self.streams:
+                self.wakeup.wait(SCHEDULER_IDLE_WAIT)
+
+    async def iter_async(self):
+        self.loop = asyncio.get_running_loop()
+        self.async_wakeup = asyncio.Event()
+        while self.streams:
+            self.async_wakeup.clear()
+            job = self._poll()
+            if job:
+                yield job
+            elif self.streams:
+                try:
+                    await asyncio.wait_for(self.async_wakeup.wait(), SCHEDULER_IDLE_WAIT)
+                except asyncio.TimeoutError:
+                    pass
+
+
+async def run_async_downloads(jobs: JobScheduler, max_in_flight: int, connections: int,
+                              warmer: Optional[ConnectionWarmer] = None):
+    """
+    Fait tourner `max_in_flight` coroutines alimentées par une file bornée:
+    le producteur ne tire une nouvelle tâche du planificateur que lorsqu'une
+    place se libère.
+    """
+    task_queue: asyncio.Queue = asyncio.Queue(maxsize=max_in_flight * PENDING_PER_WORKER)
+
+    async def producer():
+        async for task, context in jobs.iter_async():
+            await task_queue.put((task, context))
+            context.stats.task_queued()
+        for _ in range(max_in_flight):
+            await task_queue.put(None)
+
+    async def worker(session):
+        while True:
+            job = await task_queue.get()
+            if job is None:
+                return
+            task, context = job
+            await download_image_async(task, session, context)
+
+    async with create_async_session(connections, warmer.dns if warmer else None) as session:
+        if warmer:
+            await warmer.warm_async(session, connections)
+        await asyncio.gather(producer(), *(worker(session) for _ in range(max_in_flight)))
+
+
+class HostQueues:
+    """
+    Files d'attente par hôte (origine schéma://hôte:port) du moteur threads.
+    Un worker reprend l'hôte de sa tâche précédente tant que sa file n'est pas
+    vide, sinon il passe à la file la plus chargée: il retrouve ainsi les
+    connexions qu'il vient de rendre au pool de cet hôte. Le nombre total de
+    tâches en attente est borné, le producteur attend qu'une place se libère.
+
+    `reserve(origin, élément)` prend la place de l'élément en tête de file
+    (AdaptiveHostLimiter.try_acquire) avant qu'il ne sorte: un hôte à sa limite
+    est sauté et ses tâches attendent dans la file, pas dans un worker. Un
+    worker qui rend une place appelle wake() pour réveiller les autres.
+    """
+
+    def __init__(self, capacity: int, reserve: Optional[Callable[[str, object], bool]] = None):
+        self.capacity = capacity
+        self.reserve = reserve
+        self.condition = threading.Condition()
+        self.queues: Dict[str, deque] = {}
+        self.pending = 0
+        self.closed = False
+
+    def put(self, origin: str, item):
+        with self.condition:
+            while self.pending >= self.capacity and not self.closed:
+                self.condition.wait()
+            if self.closed:
+                return
+            self.queues.setdefault(origin, deque()).append(item)
+            self.pending += 1
+            self.condition.notify_all()
+
+    def get(self, preferred: Optional[str] = None) -> Optional[Tuple[str, object]]:
+        """(origine, élément) suivant, None une fois les files fermées et vides"""
+        with self.condition:
+            while True:
+                origins = sorted(self.queues, key=lambda key: len(self.queues[key]), reverse=True)
+                if preferred in self.queues:
+                    origins.remove(preferred)
+                    origins.insert(0, preferred)
+                for origin in origins:
+                    queue = self.queues[origin]
+                    if self.reserve and not self.reserve(origin, queue[0]):
+                        continue
+                    item = queue.popleft()
+                    if not queue:
+                        del self.queues[origin]
+                    self.pending -= 1
+                    self.condition.notify_all()
+                    return origin, item
+                if self.closed and not self.queues:
+                    return None
+                self.condition.wait()
+
+    def wake(self):
+        """Une place s'est libérée chez un hôte: les workers en attente réessaient"""
+        with self.condition:
+            self.condition.notify_all()
+
+    def close(self, discard: bool = False):
+        """Plus aucun ajout; `discard` abandonne aussi les tâches en attente"""
+        with self.condition:
+            self.closed = True
+            if discard:
+                self.queues.clear()
+                self.pending = 0
+            self.condition.notify_all()
+
+
+def run_thread_downloads(jobs: JobScheduler, max_workers: int,
+                         on_retry: Optional[Callable[[], None]] = None,
+                         shared_session: Optional[Http2Session] = None,
+                         warmer: Optional[ConnectionWarmer] = None):
+    """
+    Pool de threads alimenté au fil de l'eau par des files par hôte (HostQueues):
+    chaque hôte a sa propre session, dont le pool garde jusqu'à `max_workers`
+    connexions ouvertes, et un worker reste sur le même hôte tant qu'il y a du
+    travail. Les connexions ne sont donc ni partagées entre CDN ni évincées par
+    eux. Les sessions sont partagées par tous les projets du run. Avec
+    `shared_session` (--http2), tous les hôtes passent par ce client unique,
+    que l'appelant referme.
+    """
+    def reserve(origin: str, item: Tuple[DownloadTask, DownloadContext]) -> bool:
+        limiter = item[1].limiter
+        return limiter is None or limiter.try_acquire(origin.partition('://')[2])
+
+    queues = HostQueues(max_workers * PENDING_PER_WORKER, reserve)
+    sessions: Dict[str, requests.Session] = {}
+    sessions_lock = threading.Lock()
+
+    def session_for(origin: str):
+        if shared_session:
+            return shared_session
+        with sessions_lock:
+            session = sessions.get(origin)
+            if session is None:
+                session = sessions[origin] = create_session(on_retry, pool_size=max_workers)
+            return session
+
+    if warmer and shared_session:
+        warmer.warm_http2(shared_session)
+    elif warmer:
+        warmer.warm_sessions({origin: session_for(origin) for origin in warmer.origins},
+                             max_workers)
+
+    def worker():
+        origin = None
+        while True:
+            item = queues.get(origin)
+            if item is None:
+                return
+            origin, (task, context) = item
+            download_image(task, session_for(origin), context, reserved=True)
+            if context.limiter:
+                queues.wake()
+
+    threads = [threading.Thread(target=worker, name=f'download-{i}', daemon=True)
+               for i in range(max_workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for task, context in jobs:
+            parsed = urlparse(task.url)
+            context.stats.task_queued()
+            queues.put(f"{parsed.scheme}://{parsed.netloc}", (task, context))
+        queues.close()
+        for thread in threads:
+            thread.join()
+    except BaseException:
+        # Interruption, ou générateur de tâches en erreur (coordinateur du cluster
+        # injoignable...): seules les tâches en cours se terminent, les files sont
+        # abandonnées et les workers s'arrêtent avant que l'erreur ne remonte
+        queues.close(discard=True)
+        for thread in threads:
+            thread.join()
+        raise
+    finally:
+        for session in sessions.values():
+            session.close()
+
+
+def run_deferred_retries(retries: DeferredRetries, run_engine: Callable[[JobScheduler, int], None],
+                         workers: int) -> List[DeferredRetry]:
+    """
+    Rejoue les échecs transitoires par tours successifs, à concurrence réduite:
+    un hôte qui vient de répondre 429 ou 503 n'est pas de nouveau sollicité à
+    plein régime. Le délai avant chaque tour double (DEFERRED_RETRY_DELAY) et
+    s'allonge jusqu'au plus grand Retry-After reçu, plafonné à
+    DEFERRED_RETRY_MAX_DELAY. Au dernier tour, un nouvel échec est définitif.
+    Retourne les entrées rejouées.
+    """
+    replayed: List[DeferredRetry] = []
+    for round_index in range(DEFERRED_RETRY_ROUNDS):
+        entries = retries.take()
+        if not entries:
+            break
+        delay = max([DEFERRED_RETRY_DELAY * 2 ** round_index]
+                    + [entry.retry_after for entry in entries if entry.retry_after])
+        delay = min(delay, DEFERRED_RETRY_MAX_DELAY)
+        stats = entries[0].context.stats
+        stats.add_event(f"🔁 Relance différée {round_index + 1}/{DEFERRED_RETRY_ROUNDS}: "
+                        f"{len(entries)} page(s) dans {delay:.0f} s, {workers} en parallèle")
+        time.sleep(delay)
+
+        last_round = round_index == DEFERRED_RETRY_ROUNDS - 1
+        # Les chapitres sont déjà terminés: plus de suivi, et pas de nouveau report au dernier tour
+        streams: Dict[int, Tuple[List[DownloadTask], DownloadContext]] = {}
+        for entry in entries:
+            context = entry.context
+            stats.withdraw_failure(context.project, entry.task.chapter_name,
+                                   entry.task.page_number)
+            stats.add_retry()
+            if id(context) not in streams:
+                streams[id(context)] = ([], replace(context, tracker=None,
+                                                    retries=None if last_round else retries))
+            streams[id(context)][0].append(entry.task)
+        run_engine(JobScheduler(streams.values()), workers)
+        replayed.extend(entries)
+    return replayed
+
+
+# --------------------------------------------------------------------------- #
+# Suivi du run (affichage, métriques)
+# --------------------------------------------------------------------------- #
+
+class _LineRelay:
+    """
+    Remplace sys.stdout pendant l'affichage: les print() des autres threads
+    (CBR créés, avertissements...) deviennent des messages du tampon, affichés
+    au-dessus du bloc d'état au lieu de le déchirer.
+    """
+
+    def __init__(self, stats: DownloadStats, real_stdout):
+        self.stats = stats
+        self.real_stdout = real_stdout
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        pending = getattr(self.local, 'pending', '') + text
+        *lines, self.local.pending = pending.split('\n')
+        for line in lines:
+            if line.strip():
+                self.stats.add_event(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def encoding(self):
+        return getattr(self.real_stdout, 'encoding', 'utf-8')
+
+
+class ProgressRenderer:
+    """
+    Redessine un bloc d'état à fréquence fixe (PROGRESS_FPS): totaux, débit
+    lissé (EWMA), ETA et avancement des chapitres en cours. Les workers ne font
+    qu'incrémenter les compteurs de DownloadStats; tout le formatage a lieu
+    ici, dans un seul thread. Hors terminal (sortie redirigée vers un
+    fichier), une ligne d'état est écrite toutes les PROGRESS_LOG_INTERVAL s.
+    """
+
+    def __init__(self, stats: DownloadStats,
+                 trackers: Optional[Dict[str, ChapterTracker]] = None, fps: int = PROGRESS_FPS):
+        self.stats = stats
+        self.trackers = trackers or {}
+        self.interval = 1.0 / max(1, fps)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.out = sys.stdout
+        self.tty = hasattr(self.out, 'isatty') and self.out.isatty()
+        self.drawn_lines = 0
+        self.events_seen = 0
+        self.started = 0.0
+        self.last_sample: Optional[Tuple[float, int, int]] = None
+        self.image_rate: Optional[float] = None
+        self.byte_rate: Optional[float] = None
+        self.last_log = 0.0
+
+    def start(self):
+        if self.tty and os.name == 'nt':
+            os.system('')  # active les séquences ANSI de la console Windows
+        self.started = time.monotonic()
+        sys.stdout = _LineRelay(self.stats, self.out)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+        sys.stdout = self.out
+        self._render(final=True)
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self._render()
+            except Exception:
+                # L'affichage ne doit jamais interrompre un téléchargement
+                pass
+
+    def _sample(self, now: float, completed: int, total_bytes: int):
+        """Met à jour les débits lissés (EWMA) à partir du dernier échantillon"""
+        if self.last_sample:
+            then, previous_completed, previous_bytes = self.last_sample
+            elapsed = now - then
+            if elapsed > 0:
+                image_rate = (completed - previous_completed) / elapsed
+                byte_rate = (total_bytes - previous_bytes) / elapsed
+                alpha = min(1.0, elapsed / 5.0)  # constante de temps ≈ 5 s
+                self.image_rate = (image_rate if self.image_rate is None
+                                   else self.image_rate + alpha * (image_rate - self.image_rate))
+                self.byte_rate = (byte_rate if self.byte_rate is None
+                                  else self.byte_rate + alpha * (byte_rate - self.byte_rate))
+        self.last_sample = (now, completed, total_bytes)
+
+    def _status_lines(self, now: float) -> List[str]:
+        current = self.stats.get_stats()
+        total = current['total']
+        completed = current['downloaded'] + current['failed'] + current['skipped']
+        self._sample(now, completed, current['bytes'])
+
+        progress = (completed / total) * 100 if total > 0 else 100.0
+        rate = self.image_rate or 0.0
+        byte_rate = (self.byte_rate or 0.0) / (1024 * 1024)
+        if rate > 0 and completed < total:
+            remaining = int((total - completed) / rate)
+            eta = f"{remaining // 3600:d}:{remaining % 3600 // 60:02d}:{remaining % 60:02d}"
+        else:
+            eta = '--:--:--'
+        throttled = (f" · ⏳ {current['throttled_seconds']:.0f} s bridées"
+                     if current['throttled_seconds'] else '')
+        lines = [
+            f"[{progress:5.1f}%] {completed}/{total} | ✅ {current['downloaded']} "
+            f"⏭️  {current['skipped']} ❌ {current['failed']} | "
+            f"{rate:.1f} images/s · {byte_rate:.2f} Mo/s{throttled} | ETA {eta}",
+        ]
+        if self.trackers:
+            chapters = [(f"[{project}] {name}" if project else name, done, admitted, sealed)
+                        for project, tracker in self.trackers.items()
+                        for name, done, admitted, sealed in tracker.snapshot()]
+            for name, done, admitted, sealed in chapters[:PROGRESS_CHAPTER_LINES]:
+                count = f"{done}/{admitted}" if sealed else f"{done}/{admitted}+"
+                lines.append(f"   📖 {name[:50]:<50} {count}")
+            if len(chapters) > PROGRESS_CHAPTER_LINES:
+                lines.append(f"   … et {len(chapters) - PROGRESS_CHAPTER_LINES} autre(s) chapitre(s)")
+        return lines
+
+    def _render(self, final: bool = False):
+        now = time.monotonic()
+        events, events_total = self.stats.drain_events()
+        dropped = events_total - self.events_seen - len(events)
+        self.events_seen = events_total
+        if dropped > 0:
+            events.insert(0, f"… {dropped} message(s) omis")
+
+        lines = self._status_lines(now)
+        output = []
+        if self.tty and self.drawn_lines:
+            # Remonte au début du bloc précédent et l'efface
+            output.append(f"\x1b[{self.drawn_lines}F\x1b[J")
+        output.extend(f"{event}\n" for event in events)
+        if self.tty or final:
+            output.extend(f"{line}\n" for line in lines)
+            self.drawn_lines = 0 if final else len(lines)
+        elif now - self.last_log >= PROGRESS_LOG_INTERVAL:
+            output.append(f"{lines[0]}\n")
+            self.last_log = now
+        self.out.write(''.join(output))
+        self.out.flush()
+
+
+class MetricsExporter:
+    """
+    Expose l'état d'un run long: compteurs de DownloadStats, octets reçus,
+    requêtes en vol, file d'attente, relances, erreurs par hôte (et limites
+    AIMD avec --adaptive). Deux surfaces, cumulables:
+      - un endpoint HTTP local `/metrics` au format texte Prometheus;
+      - un fichier JSON réécrit toutes les METRICS_FILE_INTERVAL secondes
+        (remplacement atomique, lisible à tout moment).
+    """
+
+    def __init__(self, stats: DownloadStats, limiter: Optional[AdaptiveHostLimiter] = None,
+                 port: Optional[int] = None, file_path: Optional[Path] = None):
+        self.stats = stats
+        self.limiter = limiter
+        self.port = port
+        self.file_path = file_path
+        self.started = time.time()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.stop_event = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def snapshot(self) -> Dict:
+        current = self.stats.get_stats()
+        current['uptime'] = round(time.time() - self.started, 3)
+        current['timings'] = self.stats.timing_summary()
+        if self.limiter:
+            current['hosts'] = {
+                host: {'limit': int(state.limit), 'in_flight': state.in_flight,
+                       'throttled': state.throttled, 'server_errors': state.server_errors,
+                       'network_errors': state.network_errors}
+                for host, state in self.limiter.summary()
+            }
+        return current
+
+    def render_prometheus(self) -> str:
+        current = self.snapshot()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP manga_{name} {help_text}")
+            lines.append(f"# TYPE manga_{name} {kind}")
+            for labels, value, *suffix in samples:
+                series = f"manga_{name}{suffix[0] if suffix else ''}"
+                label_text = ','.join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                lines.append(f"{series}{{{label_text}}} {value}" if label_text
+                             else f"{series} {value}")
 
+        metric('images_planned', 'gauge', "Images du run", [({}, current['total'])])
+        # Chaque image a une seule issue (téléchargée, en échec ou sautée); reprises,
+        # dédupliquées et inchangées en sont des sous-ensembles, comptés à part pour
+        # que sum(manga_images_total) reste le nombre d'images traitées
+        metric('images_total', 'counter', "Images traitées, par issue",
+               [({'result': key}, current[key]) for key in ('downloaded', 'failed', 'skipped')])
+        metric('images_resumed_total', 'counter', "Images complétées à partir d'un .part",
+               [({}, current['resumed'])])
+        metric('images_deduplicated_total', 'counter',
+               "Images liées depuis le magasin de contenu (--dedupe)",
+               [({}, current['deduplicated'])])
+        metric('images_unchanged_total', 'counter',
+               "Images confirmées inchangées par le serveur (--revalidate)",
+               [({}, current['unchanged'])])
+        metric('bytes_downloaded_total', 'counter', "Octets d'images reçus",
+               [({}, current['bytes'])])
+        metric('requests_in_flight', 'gauge', "Requêtes HTTP en cours",
+               [({}, current['in_flight'])])
+        metric('queue_depth', 'gauge', "Tâches soumises pas encore démarrées",
+               [({}, current['queued'])])
+        metric('retries_total', 'counter', "Nouvelles tentatives HTTP",
+               [({}, current['retries'])])
+        metric('pages_rejected_total', 'counter', "Corps refusés par la vérification d'image",
+               [({}, current['rejected'])])
+        metric('host_errors_total', 'counter', "Pages en échec par hôte",
+               [({'host': host}, count) for host, count in sorted(current['host_errors'].items())])
+        metric('throttle_seconds_total', 'counter',
+               "Attente cumulée des lecteurs bridés par le plafond de débit, par hôte",
+               [({'host': host}, f"{seconds:.3f}")
+                for host, seconds in sorted(current['host_throttle'].items())])
+        if 'hosts' in current:
+            metric('host_limit', 'gauge', "Concurrence AIMD par hôte",
+                   [({'host': host}, state['limit']) for host, state in current['hosts'].items()])
+        def summary(labels: Dict[str, str], values: Dict, precision: int = 6):
+            # Quantiles puis _sum et _count, comme un summary Prometheus complet
+            samples = [({**labels, 'quantile': q}, f"{values[f'p{q[2:]}']:.{precision}f}")
+                       for q in ('0.50', '0.95', '0.99')]
+            return samples + [(labels, f"{values['sum']:.{precision}f}", '_sum'),
+                              (labels, values['count'], '_count')]
 
-# --------------------------------------------------------------------------- #
-# Sélection du fichier JSON
-# --------------------------------------------------------------------------- #
+        timings = current['timings']['global']
+        metric('request_seconds', 'summary', "Durée des requêtes réussies, par phase",
+               [sample for phase, _ in HISTOGRAM_PHASES if phase != 'size'
+                for sample in summary({'phase': phase}, timings[phase])])
+        metric('connection_reuse_ratio', 'gauge',
+               "Part des requêtes réussies servies par une connexion déjà ouverte, par hôte",
+               [({'host': host}, f"{reuse[2]:.4f}")
+                for host, reuse in ((host, connection_reuse(histograms))
+                                    for host, histograms in current['timings']['hosts'].items())
+                if reuse])
+        setup = current['timings']['setup']
+        metric('setup_seconds', 'summary', "Préchauffage: résolutions DNS et connexions préouvertes",
+               [sample for phase, _ in SETUP_PHASES if setup[phase]['count']
+                for sample in summary({'phase': phase}, setup[phase])])
+        metric('image_bytes', 'summary', "Taille des images reçues",
+               summary({}, timings['size'], precision=0))
+        metric('uptime_seconds', 'gauge', "Durée du run", [({}, current['uptime'])])
+        return '\n'.join(lines) + '\n'
 
-def describe_json(path: Path) -> Optional[Dict]:
-    """Lit un JSON candidat et en extrait un résumé, ou None s'il est inexploitable"""
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except Exception:
-        return None
+    def write_file(self):
+        temp_path = self.file_path.with_name(self.file_path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.file_path)
 
-    if not isinstance(data, dict):
-        return None
-    chapters = data.get('chapters')
-    if not isinstance(chapters, dict) or not chapters:
-        return None
+    def _file_loop(self):
+        while not self.stop_event.wait(METRICS_FILE_INTERVAL):
+            try:
+                self.write_file()
+            except OSError:
+                pass
 
-    total_images = sum(
-        len(c.get('images', []))
-        for c in chapters.values()
-        if isinstance(c, dict)
-    )
-    return {
-        'path': path,
-        'project_name': data.get('projectName', path.stem),
-        'chapter_count': len(chapters),
-        'image_count': total_images,
-    }
+    def start(self):
+        if self.port is not None:
+            exporter = self
 
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] != '/metrics':
+                        self.send_error(404)
+                        return
+                    body = exporter.render_prometheus().encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
 
-def find_json_candidates(directory: Path) -> List[Dict]:
-    """Retourne les fichiers du répertoire exploitables par ce script"""
-    seen = set()
-    candidates = []
-    for pattern in JSON_GLOBS:
-        for path in sorted(directory.glob(pattern)):
-            if path in seen or not path.is_file():
-                continue
-            seen.add(path)
-            info = describe_json(path)
-            if info:
-                candidates.append(info)
-    return candidates
+                def log_message(self, *args):
+                    pass
 
+            self.server = ThreadingHTTPServer((METRICS_HOST, self.port), Handler)
+            self.server.daemon_threads = True
+            self.threads.append(threading.Thread(target=self.server.serve_forever, daemon=True))
+        if self.file_path:
+            self.file_path.parent.mkdir(parents=True, exist_ok=True)
+            self.threads.append(threading.Thread(target=self._file_loop, daemon=True))
+        for thread in self.threads:
+            thread.start()
 
-def select_json_file(directory: Path) -> Optional[Dict]:
-    """Affiche les JSON disponibles et demande à l'utilisateur de choisir"""
-    print(f"🔍 Recherche des fichiers JSON dans: {directory}\n")
-    candidates = find_json_candidates(directory)
+    def stop(self):
+        self.stop_event.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self.threads:
+            thread.join(timeout=5)
+        if self.file_path:
+            # Dernière écriture: le fichier reflète l'état final du run
+            self.write_file()
 
-    if not candidates:
-        print("❌ Aucun fichier JSON exploitable trouvé dans ce répertoire.")
-        print("   Le fichier doit contenir un objet 'chapters' non vide.")
-        return None
 
-    print(f"📚 {len(candidates)} fichier(s) exploitable(s) trouvé(s):\n")
-    width = len(str(len(candidates)))
-    for i, info in enumerate(candidates, 1):
-        already = (DEFAULT_OUTPUT_DIR / info['project_name']).is_dir()
-        marker = ' 📂' if already else ''
-        print(f"  [{i:>{width}}] {info['path'].name}{marker}")
-        print(f"       {'└─'} projet: {info['project_name']}  |  "
-              f"{info['chapter_count']} chapitres  |  {info['image_count']} images")
-    print(f"\n  [{'0':>{width}}] Annuler\n")
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
 
-    while True:
-        try:
-            answer = input(f"👉 Votre choix [1-{len(candidates)}]: ").strip()
-        except (EOFError, KeyboardInterrupt):
-            print("\n⏹️  Annulé.")
-            return None
 
-        if answer in ('0', 'q', 'Q'):
-            print("⏹️  Annulé.")
-            return None
-        if answer.isdigit() and 1 <= int(answer) <= len(candidates):
-            return candidates[int(answer) - 1]
-        print(f"⚠️  Entrée invalide. Saisissez un nombre entre 1 et {len(candidates)}.")
+def iter_chapter_images(chapter_data) -> Iterator[Tuple[int, str]]:
+    """(numéro de page, URL) des images exploitables d'un chapitre"""
+    if not isinstance(chapter_data, dict):
+        return
+    for i, image_url in enumerate(chapter_data.get('images', []), 1):
+        if isinstance(image_url, str) and image_url.strip():
+            yield i, image_url
 
 
-# --------------------------------------------------------------------------- #
-# Téléchargement
-# --------------------------------------------------------------------------- #
+class TaskTable:
+    """
+    Pages d'un projet en colonnes compactes, remplies une fois à la lecture du
+    JSON, qui peut ensuite être libéré: numéros de page, préfixes d'URL et
+    extensions (index dans des tables internées) dans des `array`, fins d'URL
+    concaténées dans un seul bloc d'octets. Une quarantaine d'octets par page,
+    contre plusieurs centaines pour le dict JSON puis une tâche par page
+    (mesure: manga_hyperspeed_bench.py --task-memory). Les DownloadTask sont
+    créées à la volée, chapitre par chapitre, par tasks().
+    """
 
-def download_image(task: DownloadTask, session: requests.Session,
-                   stats: DownloadStats, progress_queue: queue.Queue) -> bool:
-    """Télécharge une image de manière optimisée"""
-    try:
-        # Un fichier déjà présent et non vide est considéré comme acquis
-        if task.filepath.exists() and task.filepath.stat().st_size > 0:
-            stats.add_skip()
-            progress_queue.put(f"⏭️  Déjà présent: {task.filepath.name}")
-            return True
+    def __init__(self, chapters: dict, main_folder: Path):
+        self.chapters: List[ChapterRef] = []
+        self.excluded: set = set()  # index des chapitres écartés (CBR déjà complet...)
+        self.starts = array('I', [0])  # lignes du chapitre i: starts[i] à starts[i + 1]
+        self.pages = array('I')
+        self.prefixes: List[str] = []
+        self.prefix_ids = array('I')
+        self.extensions: List[str] = []
+        self.extension_ids = array('B')
+        self.suffixes = bytearray()
+        self.offsets = array('I', [0])
+        prefix_index: Dict[str, int] = {}
+        extension_index: Dict[str, int] = {}
 
-        response = session.get(task.url, timeout=30, stream=True)
-        response.raise_for_status()
+        for chapter_name, chapter_data in sorted(chapters.items(),
+                                                 key=lambda x: extract_chapter_number(x[0])):
+            for i, image_url in iter_chapter_images(chapter_data):
+                cut = image_url.rfind('/') + 1
+                prefix = image_url[:cut]
+                extension = guess_extension(image_url, i)
+                if prefix not in prefix_index:
+                    prefix_index[prefix] = len(self.prefixes)
+                    self.prefixes.append(sys.intern(prefix))
+                if extension not in extension_index:
+                    extension_index[extension] = len(self.extensions)
+                    self.extensions.append(sys.intern(extension))
+                self.pages.append(i)
+                self.prefix_ids.append(prefix_index[prefix])
+                self.extension_ids.append(extension_index[extension])
+                self.suffixes += image_url[cut:].encode('utf-8')
+                self.offsets.append(len(self.suffixes))
+            if len(self.pages) > self.starts[-1]:
+                self.chapters.append(ChapterRef(len(self.chapters), chapter_name,
+                                                main_folder / sanitize_filename(chapter_name)))
+                self.starts.append(len(self.pages))
 
-        task.filepath.parent.mkdir(parents=True, exist_ok=True)
+    def __len__(self) -> int:
+        return len(self.pages)
 
-        # Écriture dans un fichier temporaire: une interruption ne laisse pas
-        # un fichier partiel qui serait ensuite considéré comme complet.
-        temp_path = task.filepath.with_suffix(task.filepath.suffix + '.part')
-        bytes_written = 0
-        with open(temp_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    bytes_written += len(chunk)
+    def active_chapters(self) -> List[ChapterRef]:
+        return [chapter for chapter in self.chapters if chapter.index not in self.excluded]
 
-        if bytes_written == 0:
-            temp_path.unlink(missing_ok=True)
-            raise ValueError("réponse vide (0 octet)")
+    def exclude(self, chapter: ChapterRef):
+        self.excluded.add(chapter.index)
 
-        os.replace(temp_path, task.filepath)
-        stats.add_success()
-        progress_queue.put(f"✅ {task.chapter_name} - Page {task.page_number:03d}")
-        return True
+    def chapter_pages(self, chapter: ChapterRef) -> List[int]:
+        return self.pages[self.starts[chapter.index]:self.starts[chapter.index + 1]].tolist()
 
-    except Exception as e:
-        stats.add_failure(task.chapter_name, task.page_number, task.url, str(e))
-        progress_queue.put(
-            f"❌ Erreur {task.chapter_name} - Page {task.page_number:03d}: {str(e)[:50]}...")
-        return False
+    def task(self, chapter: ChapterRef, row: int) -> DownloadTask:
+        suffix = self.suffixes[self.offsets[row]:self.offsets[row + 1]].decode('utf-8')
+        return DownloadTask(chapter, self.pages[row], self.prefixes[self.prefix_ids[row]],
+                            suffix, self.extensions[self.extension_ids[row]])
 
+    def chapter_tasks(self, chapter: ChapterRef) -> Iterator[DownloadTask]:
+        for row in range(self.starts[chapter.index], self.starts[chapter.index + 1]):
+            yield self.task(chapter, row)
 
-def progress_monitor(progress_queue: queue.Queue, stats: DownloadStats, total_tasks: int):
-    """Monitore et affiche le progrès en temps réel"""
-    while True:
-        try:
-            message = progress_queue.get(timeout=1)
-        except queue.Empty:
-            current = stats.get_stats()
-            if current['downloaded'] + current['failed'] + current['skipped'] >= total_tasks:
-                break
-            continue
-        except KeyboardInterrupt:
-            break
+    def tasks(self) -> Iterator[DownloadTask]:
+        """Tâches des chapitres non écartés, dans l'ordre des chapitres"""
+        for chapter in self.active_chapters():
+            yield from self.chapter_tasks(chapter)
 
-        current = stats.get_stats()
-        completed = current['downloaded'] + current['failed'] + current['skipped']
-        progress = (completed / total_tasks) * 100 if total_tasks > 0 else 0
-        print(f"[{progress:5.1f}%] {message}")
 
-        if completed >= total_tasks:
-            break
+def iter_download_tasks(chapters: dict, main_folder: Path) -> Iterator[DownloadTask]:
+    """Produit les tâches de téléchargement une à une, chapitre par chapitre"""
+    return TaskTable(chapters, main_folder).tasks()
 
 
 def prepare_download_tasks(chapters: dict, main_folder: Path) -> List[DownloadTask]:
     """Prépare toutes les tâches de téléchargement"""
-    tasks = []
-    sorted_chapters = sorted(chapters.items(), key=lambda x: extract_chapter_number(x[0]))
+    return list(iter_download_tasks(chapters, main_folder))
 
-    for chapter_name, chapter_data in sorted_chapters:
-        if not isinstance(chapter_data, dict):
-            continue
-        chapter_folder = main_folder / sanitize_filename(chapter_name)
 
-        for i, image_url in enumerate(chapter_data.get('images', []), 1):
-            if not isinstance(image_url, str) or not image_url.strip():
-                continue
-            extension = guess_extension(image_url, i)
-            tasks.append(DownloadTask(
-                url=image_url,
-                filepath=chapter_folder / f"page_{i:03d}.{extension}",
-                page_number=i,
-                chapter_name=chapter_name,
-            ))
+# --------------------------------------------------------------------------- #
+# Étapes CPU (--cpu-workers)
+# --------------------------------------------------------------------------- #
 
-    return tasks
+def _run_captured(function: Callable, *args):
+    """Exécuté dans un processus du pool: renvoie (résultat, texte affiché)"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = function(*args)
+    return result, output.getvalue()
+
+
+class CpuPool:
+    """
+    Pool de processus pour les étapes CPU (compression deflate des CBR...),
+    à côté des threads d'I/O: elles ne disputent plus le GIL aux téléchargements.
+
+    Les fonctions soumises doivent être de niveau module et leurs arguments
+    sérialisables (chemins, listes): les threads appelants gardent l'état non
+    transmissible (registre SQLite, listeners) et ne confient au pool que le
+    calcul. Ce que la fonction affiche est capturé puis réaffiché dans le
+    processus principal, où ProgressRenderer le reçoit comme n'importe quel
+    message. Processus créés par « spawn »: pas de fork d'un processus qui a
+    déjà des threads, et même comportement sous Windows.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Future de (résultat, texte affiché)"""
+        return self.executor.submit(_run_captured, function, *args)
+
+    @staticmethod
+    def collect(future: Future):
+        result, output = future.result()
+        if output:
+            sys.stdout.write(output)
+        return result
+
+    def run(self, function: Callable, *args):
+        """Exécute `function(*args)` dans le pool et attend son résultat"""
+        return self.collect(self.submit(function, *args))
+
+    async def run_async(self, function: Callable, *args):
+        """Comme run(), sans bloquer la boucle asyncio"""
+        result, output = await asyncio.wrap_future(self.submit(function, *args))
+        if output:
+            sys.stdout.write(output)
+        return result
+
+    def shutdown(self, cancel: bool = False):
+        self.executor.shutdown(wait=True, cancel_futures=cancel)
 
 
 # --------------------------------------------------------------------------- #
@@ -348,6 +3291,13 @@ def list_images(folder_path: Path) -> List[Path]:
     )
 
 
+def chapter_cbr_path(chapter_name: str, cbr_folder: Path) -> Path:
+    """Nom du CBR d'un chapitre: Chapter_021.5 - Chapitre_21.5.cbr"""
+    number = extract_chapter_number(chapter_name)
+    label = sanitize_filename(chapter_name.split(' - ')[0])
+    return cbr_folder / f"Chapter_{format_chapter_number(number)} - {label}.cbr"
+
+
 def cbr_is_valid(cbr_path: Path, expected_count: Optional[int] = None) -> bool:
     """Vérifie qu'un CBR existant est une archive lisible et non vide"""
     try:
@@ -362,10 +3312,15 @@ def cbr_is_valid(cbr_path: Path, expected_count: Optional[int] = None) -> bool:
     return True
 
 
-def create_cbr_from_folder(folder_path: Path, output_path: Path) -> bool:
-    """Crée un fichier CBR (archive ZIP) à partir d'un dossier d'images"""
+def create_cbr_from_folder(folder_path: Path, output_path: Path,
+                           image_files: Optional[List[Path]] = None) -> bool:
+    """
+    Crée un fichier CBR (archive ZIP) à partir d'un dossier d'images.
+    `image_files` évite de relister le dossier quand la liste est déjà connue.
+    """
     try:
-        image_files = list_images(folder_path)
+        if image_files is None:
+            image_files = list_images(folder_path)
         if not image_files:
             print(f"⚠️  Aucune image dans {folder_path.name}, CBR non créé")
             return False
@@ -387,89 +3342,566 @@ def create_cbr_from_folder(folder_path: Path, output_path: Path) -> bool:
         return False
 
 
-def build_all_cbr(tasks: List[DownloadTask], cbr_folder: Path,
-                  force_rebuild: bool = False) -> Tuple[int, int]:
-    """Construit les CBR de tous les chapitres. Retourne (créés, ignorés)"""
+class ChapterArchive:
+    """CBR d'un chapitre en cours d'écriture directe (--stream-to-cbr)"""
+
+    def __init__(self, cbr_path: Path, page_numbers: List[int]):
+        self.cbr_path = cbr_path
+        self.temp_path = cbr_path.with_suffix('.cbr.tmp')
+        self.page_numbers = page_numbers
+        self.position = 0  # index dans page_numbers de la prochaine page à écrire
+        self.pending: Dict[int, Tuple[str, object]] = {}
+        self.failed: set = set()
+        # Pages en échec permanent: page -> entrée du journal des échecs
+        self.missing: Dict[int, Dict] = {}
+        self.written = 0
+        self.finished = False
+        self.lock = threading.Lock()
+        self.zipf: Optional[zipfile.ZipFile] = None
+
+
+class ArchiveRouter:
+    """
+    Écrit les pages téléchargées directement dans le CBR de leur chapitre
+    (--stream-to-cbr), dans l'ordre des pages, sans passer par des fichiers
+    image: chaque octet ne traverse le disque qu'une fois.
+
+    Une page arrivée avant ses prédécesseurs attend en mémoire; au-delà de
+    STREAM_BUFFER_BYTES elle est déversée dans CBR/.spill/ et relue à son
+    tour. Un chapitre dont une page a connu un échec transitoire n'est pas
+    publié (son .cbr.tmp est supprimé): il sera repris en entier au run
+    suivant. Si tous ses échecs sont permanents, il est publié sans ces pages,
+    comme en mode dossier; leur liste est rangée dans le commentaire de
+    l'archive (read_missing_pages), pour que les runs suivants tiennent le CBR
+    pour complet et reportent ces pages dans le journal des échecs.
+    """
+
+    def __init__(self, table: TaskTable, cbr_folder: Path):
+        self.cbr_folder = cbr_folder
+        self.spill_folder = cbr_folder / '.spill'
+        self.lock = threading.Lock()
+        self.buffered_bytes = 0
+        self.created = 0
+        self.incomplete = 0
+        self.archives: Dict[str, ChapterArchive] = {
+            chapter.name: ChapterArchive(chapter_cbr_path(chapter.name, cbr_folder),
+                                         table.chapter_pages(chapter))
+            for chapter in table.active_chapters()
+        }
+
+    def add_page(self, task: DownloadTask, data: bytes):
+        archive = self.archives[task.chapter_name]
+        with archive.lock:
+            if archive.finished:
+                # Archive déjà publiée ou abandonnée: la page n'a plus où aller
+                return
+            entry: object = data
+            with self.lock:
+                spill = self.buffered_bytes + len(data) > STREAM_BUFFER_BYTES
+                if not spill:
+                    self.buffered_bytes += len(data)
+            if spill:
+                self.spill_folder.mkdir(exist_ok=True)
+                entry = self.spill_folder / uuid.uuid4().hex
+                entry.write_bytes(data)
+            archive.pending[task.page_number] = (task.filepath.name, entry)
+            self._drain(archive)
+
+    def page_failed(self, task: DownloadTask, error: str, kind: str):
+        archive = self.archives.get(task.chapter_name)
+        if archive is None:
+            return
+        with archive.lock:
+            archive.failed.add(task.page_number)
+            if kind == FAILURE_PERMANENT:
+                archive.missing[task.page_number] = {
+                    'chapitre': task.chapter_name, 'page': task.page_number,
+                    'url': task.url, 'erreur': error, 'type': FAILURE_PERMANENT}
+            self._drain(archive)
+
+    def _drain(self, archive: ChapterArchive):
+        """Écrit toutes les pages consécutives disponibles; archive.lock tenu"""
+        if archive.finished:
+            return
+        while archive.position < len(archive.page_numbers):
+            page = archive.page_numbers[archive.position]
+            if page in archive.failed:
+                archive.position += 1
+                continue
+            if page not in archive.pending:
+                return
+            name, entry = archive.pending.pop(page)
+            if archive.zipf is None:
+                archive.zipf = zipfile.ZipFile(archive.temp_path, 'w', zipfile.ZIP_DEFLATED,
+                                               compresslevel=1)
+            if isinstance(entry, Path):
+                archive.zipf.write(entry, name)
+                entry.unlink(missing_ok=True)
+            else:
+                archive.zipf.writestr(name, entry)
+                with self.lock:
+                    self.buffered_bytes -= len(entry)
+            archive.written += 1
+            archive.position += 1
+        self._finish(archive)
+
+    def _finish(self, archive: ChapterArchive):
+        archive.finished = True
+        transient = len(archive.failed) - len(archive.missing)
+        if archive.zipf is not None:
+            if archive.missing and not transient:
+                archive.zipf.comment = json.dumps(
+                    {MISSING_PAGES_KEY: [archive.missing[page] for page in sorted(archive.missing)]},
+                    ensure_ascii=False).encode('utf-8')[:0xFFFF]
+            archive.zipf.close()
+            archive.zipf = None
+        if transient or not archive.written:
+            archive.temp_path.unlink(missing_ok=True)
+            with self.lock:
+                self.incomplete += 1
+            print(f"⚠️  {archive.cbr_path.name} non créé: "
+                  f"{len(archive.failed)} page(s) en échec, chapitre à reprendre")
+            return
+        os.replace(archive.temp_path, archive.cbr_path)
+        with self.lock:
+            self.created += 1
+        size_mb = archive.cbr_path.stat().st_size / (1024 * 1024)
+        missing = (f", {len(archive.missing)} page(s) introuvable(s) sur le serveur"
+                   if archive.missing else '')
+        print(f"📦 CBR créé: {archive.cbr_path.name} ({archive.written} pages{missing}, "
+              f"{size_mb:.1f} Mo)")
+
+    def close(self):
+        """Fin de run (ou interruption): abandonne les archives restées incomplètes"""
+        for archive in self.archives.values():
+            with archive.lock:
+                if archive.zipf is not None:
+                    archive.zipf.close()
+                    archive.zipf = None
+                archive.temp_path.unlink(missing_ok=True)
+                for _, entry in archive.pending.values():
+                    if isinstance(entry, Path):
+                        entry.unlink(missing_ok=True)
+                archive.pending.clear()
+        shutil.rmtree(self.spill_folder, ignore_errors=True)
+
+
+def read_missing_pages(cbr_path: Path) -> List[Dict]:
+    """
+    Pages en échec permanent d'un CBR publié par ArchiveRouter sans elles
+    (entrées du journal des échecs), liste vide pour un CBR complet.
+    """
+    try:
+        with zipfile.ZipFile(cbr_path) as zipf:
+            comment = zipf.comment
+        missing = json.loads(comment.decode('utf-8'))[MISSING_PAGES_KEY] if comment else []
+    except (OSError, zipfile.BadZipFile, ValueError, KeyError, TypeError):
+        return []
+    return missing if isinstance(missing, list) else []
+
+
+def filter_archived_chapters(table: TaskTable, cbr_folder: Path,
+                             force_rebuild: bool = False) -> Tuple[int, int, List[Dict]]:
+    """
+    --stream-to-cbr: écarte de la table les chapitres dont le CBR est déjà
+    complet, aux pages introuvables près. Retourne (chapitres écartés, pages
+    écartées, entrées du journal des échecs pour ces pages introuvables).
+    """
+    skipped_chapters = skipped_pages = 0
+    carried: List[Dict] = []
+    for chapter in table.active_chapters():
+        pages = table.chapter_pages(chapter)
+        cbr_path = chapter_cbr_path(chapter.name, cbr_folder)
+        if force_rebuild or not cbr_path.exists():
+            continue
+        missing = read_missing_pages(cbr_path)
+        if missing:
+            # Une page dont l'URL a changé dans le JSON depuis n'est plus introuvable
+            urls = {task.page_number: task.url for task in table.chapter_tasks(chapter)}
+            missing = [entry for entry in missing if isinstance(entry, dict)
+                       and urls.get(entry.get('page')) == entry.get('url')]
+        if cbr_is_valid(cbr_path, expected_count=len(pages) - len(missing)):
+            print(f"📦 CBR déjà complet: {cbr_path.name}"
+                  + (f" ({len(missing)} page(s) introuvable(s))" if missing else ''))
+            table.exclude(chapter)
+            skipped_chapters += 1
+            skipped_pages += len(pages)
+            carried.extend(missing)
+    return skipped_chapters, skipped_pages, carried
+
+
+def build_chapter_cbr(chapter_folder: Path, chapter_name: str, cbr_folder: Path,
+                      force_rebuild: bool = False,
+                      images: Optional[List[Path]] = None) -> Optional[str]:
+    """
+    Construit le CBR d'un chapitre s'il manque ou est incomplet.
+    Retourne 'created', 'skipped' (déjà complet) ou None (rien à empaqueter, erreur).
+    """
+    if not images:
+        images = list_images(chapter_folder)
+    if not images:
+        return None
+
+    cbr_path = chapter_cbr_path(chapter_name, cbr_folder)
+
+    if cbr_path.exists() and not force_rebuild:
+        if cbr_is_valid(cbr_path, expected_count=len(images)):
+            print(f"📦 CBR déjà complet: {cbr_path.name}")
+            return 'skipped'
+        print(f"♻️  CBR vide/incomplet, régénération: {cbr_path.name}")
+
+    if cbr_path.exists():
+        cbr_path.unlink()
+    return 'created' if create_cbr_from_folder(chapter_folder, cbr_path, images) else None
+
+
+def build_all_cbr(tasks: Iterable[DownloadTask], cbr_folder: Path,
+                  force_rebuild: bool = False,
+                  ledger: Optional[DownloadLedger] = None,
+                  exclude: Optional[set] = None,
+                  cpu_pool: Optional[CpuPool] = None) -> Tuple[int, int]:
+    """
+    Construit les CBR de tous les chapitres. Retourne (créés, ignorés).
+    Avec un registre, la liste des images en est tirée; un chapitre qu'il ne
+    connaît pas est listé sur le disque comme avant. Les dossiers de `exclude`
+    (déjà traités par CbrPacker) sont ignorés. Avec un pool CPU, les chapitres
+    sont empaquetés en parallèle.
+    """
     chapters_folders: Dict[Path, str] = {}
     for task in tasks:
-        chapters_folders.setdefault(task.filepath.parent, task.chapter_name)
+        if not exclude or task.folder not in exclude:
+            chapters_folders.setdefault(task.folder, task.chapter_name)
+    known_images = ledger.images_by_folder() if ledger and chapters_folders else {}
 
     created = skipped = 0
-    for chapter_folder, chapter_name in sorted(chapters_folders.items()):
-        images = list_images(chapter_folder)
-        if not images:
-            continue
+    jobs = [(chapter_folder, chapter_name, cbr_folder, force_rebuild,
+             known_images.get(chapter_folder))
+            for chapter_folder, chapter_name in sorted(chapters_folders.items())]
+    if cpu_pool:
+        futures = [cpu_pool.submit(build_chapter_cbr, *job) for job in jobs]
+        results = (cpu_pool.collect(future) for future in futures)
+    else:
+        results = (build_chapter_cbr(*job) for job in jobs)
+    for result in results:
+        created += result == 'created'
+        skipped += result == 'skipped'
 
-        number = extract_chapter_number(chapter_name)
-        label = sanitize_filename(chapter_name.split(' - ')[0])
-        cbr_path = cbr_folder / f"Chapter_{format_chapter_number(number)} - {label}.cbr"
+    return created, skipped
 
-        if cbr_path.exists() and not force_rebuild:
-            if cbr_is_valid(cbr_path, expected_count=len(images)):
-                print(f"📦 CBR déjà complet: {cbr_path.name}")
-                skipped += 1
-                continue
-            print(f"♻️  CBR vide/incomplet, régénération: {cbr_path.name}")
 
-        if cbr_path.exists():
-            cbr_path.unlink()
-        if create_cbr_from_folder(chapter_folder, cbr_path):
-            created += 1
+class CbrPacker:
+    """
+    Empaquette chaque chapitre dès que ChapterTracker le signale terminé, dans
+    un pool dédié, pendant que les téléchargements continuent: la durée totale
+    tend vers max(téléchargement, empaquetage) au lieu de leur somme.
 
-    return created, skipped
+    Le pool est fourni par l'appelant: en mode lot, tous les projets se
+    partagent les mêmes --pack-workers. Avec un CpuPool, ces threads ne font
+    que préparer la liste des images et la compression part dans un processus.
+    """
+
+    def __init__(self, cbr_folder: Path, executor: ThreadPoolExecutor,
+                 force_rebuild: bool = False, ledger: Optional[DownloadLedger] = None,
+                 cpu_pool: Optional[CpuPool] = None):
+        self.cbr_folder = cbr_folder
+        self.force_rebuild = force_rebuild
+        self.ledger = ledger
+        self.cpu_pool = cpu_pool
+        self.executor = executor
+        self.lock = threading.Lock()
+        self.futures = []
+        self.packed_folders: set = set()
+
+    def on_chapter_done(self, chapter_name: str, progress: ChapterProgress):
+        with self.lock:
+            self.packed_folders.add(progress.folder)
+            future = self.executor.submit(self._pack, chapter_name, progress.folder)
+            future.folder = progress.folder
+            self.futures.append(future)
+
+    def reopen(self, folders: Iterable[Path]):
+        """Chapitres complétés après leur empaquetage: laissés à la passe finale"""
+        with self.lock:
+            self.packed_folders.difference_update(folders)
+
+    def _pack(self, chapter_name: str, folder: Path) -> Optional[str]:
+        images = self.ledger.chapter_images(folder) if self.ledger else None
+        if self.cpu_pool:
+            return self.cpu_pool.run(build_chapter_cbr, folder, chapter_name, self.cbr_folder,
+                                     self.force_rebuild, images)
+        return build_chapter_cbr(folder, chapter_name, self.cbr_folder, self.force_rebuild,
+                                 images)
+
+    def wait(self) -> Tuple[int, int]:
+        """Attend la fin des empaquetages en cours. Retourne (créés, ignorés)"""
+        with self.lock:
+            futures = list(self.futures)
+        wait_futures(futures)
+        results = [future.result() for future in futures
+                   if not future.cancelled() and future.folder in self.packed_folders]
+        return results.count('created'), results.count('skipped')
+
+    def cancel(self):
+        with self.lock:
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+        wait_futures(futures)
 
 
 # --------------------------------------------------------------------------- #
 # Programme principal
 # --------------------------------------------------------------------------- #
 
+def format_measure(phase: str, value: float) -> str:
+    if phase == 'size':
+        return f"{value / 1024:.0f} Ko"
+    return f"{value * 1000:.0f} ms" if value < 10 else f"{value:.1f} s"
+
+
+def connection_reuse(histograms: Dict) -> Optional[Tuple[int, int, float]]:
+    """
+    (requêtes, connexions ouvertes, taux de réutilisation) d'un résumé de
+    timings: chaque requête réussie a un 1er octet, seules celles qui ont dû
+    ouvrir une connexion ont une phase « connect ». Les connexions préouvertes
+    (préchauffage) comptent donc comme réutilisées.
+    """
+    requests_count = histograms['ttfb']['count']
+    if not requests_count:
+        return None
+    opened = min(histograms['connect']['count'], requests_count)
+    return requests_count, opened, 1 - opened / requests_count
+
+
+def print_timing_report(timings: Dict):
+    """
+    Percentiles p50/p95/p99 par phase et réutilisation des connexions, puis
+    1er octet, transfert et réutilisation par hôte
+    """
+    setup = [(phase, label) for phase, label in SETUP_PHASES
+             if timings['setup'][phase]['count']]
+    if setup:
+        print("🔌 Préchauffage (p50 / p95 / max):")
+        for phase, label in setup:
+            summary = timings['setup'][phase]
+            values = ' / '.join(format_measure(phase, summary[q]) for q in ('p50', 'p95', 'max'))
+            print(f"   {label:<22}: {values} (n={summary['count']})")
+    phases = [(phase, label) for phase, label in HISTOGRAM_PHASES
+              if timings['global'][phase]['count']]
+    if not phases:
+        return
+    print("⏱️  Par requête (p50 / p95 / p99):")
+    for phase, label in phases:
+        summary = timings['global'][phase]
+        values = ' / '.join(format_measure(phase, summary[q]) for q in ('p50', 'p95', 'p99'))
+        print(f"   {label:<22}: {values} (n={summary['count']})")
+    reuse = connection_reuse(timings['global'])
+    if reuse:
+        requests_count, opened, ratio = reuse
+        print(f"   {'Connexions réutilisées':<22}: {ratio:.0%} "
+              f"({opened} ouverte(s) pour {requests_count} requêtes)")
+    if len(timings['hosts']) > 1:
+        for host, histograms in timings['hosts'].items():
+            parts = [f"{label.lower()} " + '/'.join(format_measure(phase, histograms[phase][q])
+                                                    for q in ('p50', 'p95', 'p99'))
+                     for phase, label in HISTOGRAM_PHASES
+                     if phase in ('ttfb', 'transfer') and histograms[phase]['count']]
+            reuse = connection_reuse(histograms)
+            if reuse:
+                parts.append(f"réutilisation {reuse[2]:.0%}")
+            if parts:
+                print(f"   {host}: {' | '.join(parts)}")
+
+
+def failure_log_entries(failures: Iterable[Tuple[str, int, str, str, Optional[str]]],
+                        stats: DownloadStats, project: str = '') -> List[Dict]:
+    """
+    Entrées du journal des échecs. Pour situer chaque échec, on y joint la durée
+    passée sur la page (échecs de ce run) et les percentiles du 1er octet de son
+    hôte: un échec en 30 s sur un hôte à p99 = 200 ms est un timeout isolé, pas
+    un CDN lent.
+    """
+    timings = stats.timing_summary()['hosts']
+    entries = []
+    for chapter, page, url, error, kind in failures:
+        entry = {'chapitre': chapter, 'page': page, 'url': url, 'erreur': error,
+                 'type': kind or classify_failure_message(error)}
+        elapsed = stats.failure_durations.get((project, chapter, page))
+        if elapsed is not None:
+            entry['duree_s'] = round(elapsed, 3)
+        host = urlparse(url).netloc
+        ttfb = timings.get(host, {}).get('ttfb')
+        if ttfb and ttfb['count']:
+            entry['hote'] = {'nom': host, '1er_octet_ms': {
+                q: round(ttfb[q] * 1000, 1) for q in ('p50', 'p95', 'p99')}}
+        entries.append(entry)
+    return entries
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Télécharge un manga depuis un JSON d'extraction et génère les CBR.",
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
-    parser.add_argument('json_file', nargs='?', default=None,
-                        help="Fichier JSON à traiter (sélection interactive si omis)")
+    parser.add_argument('json_files', nargs='*', default=[],
+                        help="Fichier(s) JSON à traiter (sélection interactive si omis); "
+                             "plusieurs fichiers sont traités dans un même run (mode lot)")
     parser.add_argument('-j', '--json', dest='json_flag', default=None,
                         help="Équivalent de l'argument positionnel")
+    parser.add_argument('--all', action='store_true',
+                        help="Traite tous les JSON exploitables du répertoire (-d) en un seul "
+                             "run: -w devient un budget global partagé par tous les projets")
     parser.add_argument('-w', '--workers', type=int, default=10,
-                        help="Téléchargements simultanés (défaut: 10)")
+                        help="Téléchargements simultanés (défaut: 10 ; "
+                             "en moteur async, requêtes en vol: 100-300 est raisonnable)")
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help="Moteur de téléchargement: pool de threads requests (défaut) "
+                             "ou asyncio/aiohttp")
+    parser.add_argument('--connections', type=int, default=8,
+                        help="Moteur async: connexions keep-alive par hôte; avec --http2: "
+                             "connexions au total (défaut: 8)")
+    parser.add_argument('--no-prewarm', action='store_true',
+                        help="Pas de préchauffage (résolution DNS de tous les hôtes et "
+                             "connexions keep-alive ouvertes avant le premier téléchargement)")
+    parser.add_argument('--http2', action='store_true',
+                        help="Moteur threads: un client HTTP/2 (httpx) partagé par tous les "
+                             "workers, requêtes multiplexées sur quelques connexions")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Ajuste la concurrence par hôte (AIMD) selon latence, 429 et 5xx; "
+                             "-w devient le plafond")
+    parser.add_argument('--max-rate', type=parse_rate, default=None,
+                        help="Plafond de débit global en octets/s (ex. 500K, 5M), appliqué "
+                             "pendant la lecture des corps")
+    parser.add_argument('--host-rate', type=parse_rate, default=None,
+                        help="Plafond de débit par hôte en octets/s (ex. 1M)")
     parser.add_argument('-o', '--output', default=None,
-                        help=f"Dossier de sortie (défaut: {DEFAULT_OUTPUT_DIR}/<projectName>)")
+                        help=f"Dossier de sortie (défaut: {DEFAULT_OUTPUT_DIR}/<projectName>); "
+                             "en mode lot, dossier parent des projets")
     parser.add_argument('-d', '--directory', default=str(DEFAULT_DATA_DIR),
                         help=f"Répertoire où chercher les JSON (défaut: {DEFAULT_DATA_DIR})")
+    parser.add_argument('--chapter-window', type=int, default=0,
+                        help="Nombre maximal de chapitres en cours simultanément: les workers "
+                             "terminent les premiers chapitres avant d'entamer les suivants "
+                             "(défaut: 0, sans limite)")
+    parser.add_argument('--no-ledger', action='store_true',
+                        help=f"Désactive le registre SQLite ({LEDGER_FILENAME}) et revient "
+                             "à un stat() par page")
+    parser.add_argument('--verify-files', action='store_true',
+                        help="Ignore les pages marquées terminées dans le registre et "
+                             "revérifie leur présence sur le disque")
+    parser.add_argument('--revalidate', action='store_true',
+                        help="Redemande les pages déjà présentes avec If-None-Match / "
+                             "If-Modified-Since: inchangées -> 304 sans corps, modifiées -> "
+                             "remplacées")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="Stocke chaque contenu une seule fois (magasin adressé par SHA-256) "
+                             "et peuple les chapitres par liens durs")
+    parser.add_argument('--store', default=None,
+                        help=f"Magasin de --dedupe (défaut: {STORE_DIRNAME}/ à côté du dossier "
+                             "du projet, partagé entre séries)")
+    parser.add_argument('--stream-to-cbr', action='store_true',
+                        help="Écrit les pages directement dans le CBR de leur chapitre, "
+                             "sans dossier d'images intermédiaire")
+    parser.add_argument('--pack-workers', type=int, default=2,
+                        help="Threads d'empaquetage CBR travaillant pendant le téléchargement, "
+                             "dès qu'un chapitre est complet (défaut: 2, 0 = en fin de run)")
+    parser.add_argument('--cpu-workers', type=int, default=0,
+                        help="Processus dédiés aux étapes CPU (compression des CBR), à côté "
+                             "des threads de téléchargement (défaut: 0, tout dans ce processus)")
+    parser.add_argument('--verify-images', action='store_true',
+                        help="Contrôle chaque page avant de la valider (signature, fin de "
+                             "fichier, lecture par Pillow si installé) et retélécharge les "
+                             "pages déjà présentes qui ne sont pas des images")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help=f"Expose les métriques au format Prometheus sur "
+                             f"http://{METRICS_HOST}:PORT/metrics pendant le téléchargement")
+    parser.add_argument('--metrics-file', default=None,
+                        help=f"Réécrit les métriques dans ce fichier JSON toutes les "
+                             f"{METRICS_FILE_INTERVAL:g} s")
+    parser.add_argument('--retry-failures', action='store_true',
+                        help=f"Rejoue uniquement les pages du journal {FAILURE_LOG_FILENAME} "
+                             "(échecs transitoires), sans parcourir le reste du projet")
+    parser.add_argument('--no-deferred-retry', action='store_true',
+                        help="Désactive les relances différées des échecs transitoires "
+                             "en fin de run")
     parser.add_argument('--no-cbr', action='store_true',
                         help="Télécharge sans générer les CBR")
     parser.add_argument('--rebuild-cbr', action='store_true',
                         help="Régénère tous les CBR même s'ils semblent complets")
     parser.add_argument('--cbr-only', action='store_true',
                         help="Ne télécharge rien, reconstruit les CBR depuis les images locales")
-    return parser.parse_args()
+    args = parser.parse_args()
+    # Les validateurs (ETag, Last-Modified) ne sont conservés que dans le registre:
+    # sans lui, --revalidate retéléchargerait chaque page en entier
+    if args.revalidate and args.no_ledger:
+        parser.error("--revalidate a besoin du registre: incompatible avec --no-ledger")
+    if args.revalidate and args.stream_to_cbr and not args.cbr_only:
+        parser.error("--revalidate est incompatible avec --stream-to-cbr (aucun registre "
+                     "dans ce mode)")
+    return args
 
 
-def main() -> int:
-    args = parse_args()
-    directory = Path(args.directory).resolve()
+@dataclass
+class ProjectRun:
+    """Un JSON d'extraction traité par le run (plusieurs en mode lot)"""
+    name: str
+    json_path: Path
+    table: TaskTable
+    main_folder: Path
+    cbr_folder: Path
+    total: int
+    ledger: Optional[DownloadLedger] = None
+    archives: Optional[ArchiveRouter] = None
+    archived_chapters: int = 0
+    tracker: Optional[ChapterTracker] = None
+    packer: Optional[CbrPacker] = None
+    context: Optional[DownloadContext] = None
+    cbr_created: int = 0
+    cbr_skipped: int = 0
+    # --retry-failures: pages (chapitre, page) à rejouer, et entrées du journal
+    # laissées de côté (échecs permanents), reportées telles quelles sans registre
+    retry_keys: Optional[set] = None
+    carried_failures: List[Dict] = field(default_factory=list)
+
+    def tasks(self) -> Iterator[DownloadTask]:
+        tasks = self.table.tasks()
+        if self.retry_keys is None:
+            return tasks
+        return (task for task in tasks if (task.chapter_name, task.page_number) in self.retry_keys)
+
+
+def resolve_json_paths(args: argparse.Namespace, directory: Path) -> Optional[List[Path]]:
+    """JSON à traiter: arguments, --all, ou sélection interactive"""
+    if args.all:
+        candidates = find_json_candidates(directory)
+        if not candidates:
+            print(f"❌ Aucun fichier JSON exploitable trouvé dans: {directory}")
+            return None
+        return [info['path'] for info in candidates]
+
+    chosen = ([args.json_flag] if args.json_flag else []) + args.json_files
+    if not chosen:
+        selected = select_json_files(directory)
+        return [info['path'] for info in selected] if selected else None
 
-    # 1. Résolution du fichier JSON -----------------------------------------
-    chosen = args.json_flag or args.json_file
-    if chosen:
-        json_path = Path(chosen)
+    paths = []
+    for name in chosen:
+        json_path = Path(name)
         if not json_path.is_absolute():
             json_path = directory / json_path
         if not json_path.exists():
             print(f"❌ Fichier introuvable: {json_path}")
-            return 1
-        info = describe_json(json_path)
-        if not info:
+            return None
+        if not describe_json(json_path):
             print(f"❌ Fichier illisible ou sans objet 'chapters': {json_path}")
-            return 1
-    else:
-        info = select_json_file(directory)
-        if not info:
-            return 1
-        json_path = info['path']
+            return None
+        if json_path not in paths:
+            paths.append(json_path)
+    return paths
 
+
+def open_project(json_path: Path, args: argparse.Namespace, batch: bool) -> Optional[ProjectRun]:
+    """Lit un JSON et prépare ses dossiers; en mode lot, -o est le dossier parent"""
     with open(json_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
@@ -480,11 +3912,10 @@ def main() -> int:
         main_folder = Path(args.output)
         if not main_folder.is_absolute():
             main_folder = Path.cwd() / main_folder
+        if batch:
+            main_folder = main_folder / project_name
     else:
         main_folder = DEFAULT_OUTPUT_DIR / project_name
-    main_folder.mkdir(parents=True, exist_ok=True)
-    cbr_folder = main_folder / 'CBR'
-    cbr_folder.mkdir(exist_ok=True)
 
     print(f"\n{'=' * 62}")
     print(f"📄 Source       : {json_path.name}")
@@ -492,84 +3923,376 @@ def main() -> int:
     print(f"📊 Chapitres    : {len(chapters)}")
     print(f"{'=' * 62}\n")
 
-    tasks = prepare_download_tasks(chapters, main_folder)
-    if not tasks:
+    # Le JSON n'est plus référencé au-delà de cette fonction: seule la table reste
+    table = TaskTable(chapters, main_folder)
+    if not len(table):
         print("❌ Aucune image à traiter dans ce fichier!")
+        return None
+
+    main_folder.mkdir(parents=True, exist_ok=True)
+    cbr_folder = main_folder / 'CBR'
+    cbr_folder.mkdir(exist_ok=True)
+    return ProjectRun(name=project_name, json_path=json_path, table=table,
+                      main_folder=main_folder, cbr_folder=cbr_folder, total=len(table))
+
+
+def load_failure_log(project: ProjectRun) -> bool:
+    """
+    --retry-failures: lit le journal des échecs du projet et restreint le run à
+    ses pages transitoires. Faux si le journal est absent ou illisible.
+    """
+    log_path = project.main_folder / FAILURE_LOG_FILENAME
+    try:
+        with open(log_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        keys = {(entry['chapitre'], int(entry['page'])) for entry in entries
+                if (entry.get('type') or classify_failure_message(entry.get('erreur', '')))
+                != FAILURE_PERMANENT}
+    except FileNotFoundError:
+        print(f"ℹ️  {project.name}: aucun journal d'échecs ({log_path.name})")
+        return False
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"⚠️  {project.name}: journal d'échecs illisible ({e})")
+        return False
+    project.retry_keys = keys
+    project.carried_failures = [entry for entry in entries
+                                if (entry['chapitre'], int(entry['page'])) not in keys]
+    project.total = sum(1 for _ in project.tasks())
+    print(f"🔁 {project.name}: {project.total} page(s) à rejouer"
+          + (f", {len(project.carried_failures)} échec(s) permanent(s) laissé(s) de côté"
+             if project.carried_failures else ''))
+    return True
+
+
+def write_failure_log(project: ProjectRun, stats: DownloadStats) -> int:
+    """
+    Les échecs sont journalisés pour permettre un re-run ciblé. Avec le
+    registre, le journal en est une vue: il reprend aussi les échecs des
+    runs précédents qui n'ont pas encore été rattrapés. Retourne leur nombre.
+    """
+    ledger = project.ledger
+    failures = ledger.failures() if ledger else stats.project_failures.get(project.name, [])
+    log_path = project.main_folder / FAILURE_LOG_FILENAME
+    if ledger:
+        ledger.close()
+    entries = failure_log_entries(failures, stats, project.name)
+    if not ledger:
+        entries.extend(project.carried_failures)
+    if entries:
+        with open(log_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+    elif (ledger or project.retry_keys is not None) and log_path.exists():
+        log_path.unlink()
+    return len(entries)
+
+
+def main() -> int:
+    args = parse_args()
+    directory = Path(args.directory).resolve()
+
+    # 1. Résolution des fichiers JSON ---------------------------------------
+    json_paths = resolve_json_paths(args, directory)
+    if not json_paths:
+        return 1
+    batch = len(json_paths) > 1
+
+    stream_to_cbr = args.stream_to_cbr and not args.cbr_only
+    if stream_to_cbr and args.no_cbr:
+        print("❌ --stream-to-cbr et --no-cbr sont incompatibles.")
+        return 1
+    if args.retry_failures and (stream_to_cbr or args.cbr_only):
+        print("❌ --retry-failures est incompatible avec --stream-to-cbr et --cbr-only.")
+        return 1
+    if not args.cbr_only:
+        if args.engine == 'async' and not AIOHTTP_AVAILABLE:
+            print("❌ Module 'aiohttp' requis pour --engine async. Installation: pip install aiohttp")
+            return 1
+        if args.http2 and args.engine == 'async':
+            print("❌ --http2 s'utilise avec le moteur threads (aiohttp ne parle pas HTTP/2).")
+            return 1
+        if args.http2 and not HTTP2_AVAILABLE:
+            print("❌ Modules 'httpx' et 'h2' requis pour --http2. "
+                  "Installation: pip install 'httpx[http2]'")
+            return 1
+
+    projects: List[ProjectRun] = []
+    for json_path in json_paths:
+        project = open_project(json_path, args, batch)
+        if project is None:
+            if not batch:
+                return 1
+            continue
+        if any(p.main_folder == project.main_folder for p in projects):
+            print(f"⚠️  {json_path.name} ignoré: le projet '{project.name}' est déjà "
+                  f"dans ce lot ({project.main_folder})\n")
+            continue
+        if args.retry_failures and not load_failure_log(project):
+            continue
+        projects.append(project)
+    if not projects:
+        print("❌ Aucun projet à traiter.")
         return 1
+    if batch:
+        print(f"📚 Mode lot: {len(projects)} projets, "
+              f"{sum(p.total for p in projects)} images au total\n")
 
     download_time = 0.0
     stats = DownloadStats()
-    stats.total_images = len(tasks)
+    stats.total_images = sum(p.total for p in projects)
+
+    # Démarré avant d'ouvrir registres, pool CPU et clients HTTP: un port déjà
+    # pris fait échouer le run avant qu'il y ait quoi que ce soit à refermer
+    metrics = None
+    if not args.cbr_only and (args.metrics_port is not None or args.metrics_file):
+        metrics = MetricsExporter(stats, None, args.metrics_port,
+                                  Path(args.metrics_file).resolve() if args.metrics_file
+                                  else None)
+        try:
+            metrics.start()
+        except OSError as e:
+            print(f"❌ Impossible d'ouvrir le port de métriques {args.metrics_port}: {e}")
+            return 1
+        if metrics.server:
+            print(f"📡 Métriques: http://{METRICS_HOST}:{args.metrics_port}/metrics")
+        if metrics.file_path:
+            print(f"📡 Métriques: {metrics.file_path}")
+        print()
+    for project in projects:
+        if stream_to_cbr:
+            project.archived_chapters, archived_pages, missing = \
+                filter_archived_chapters(project.table, project.cbr_folder, args.rebuild_cbr)
+            # Sans registre en --stream-to-cbr: le journal les reprend tels quels
+            project.carried_failures.extend(missing)
+            stats.add_skip(archived_pages, project.name)
+            project.archives = ArchiveRouter(project.table, project.cbr_folder)
+        # En --stream-to-cbr, aucune page n'existe en fichier: un registre les y
+        # croirait acquises et un run ordinaire sauterait un chapitre non publié
+        if not args.no_ledger and not stream_to_cbr:
+            project.ledger = DownloadLedger(project.main_folder / LEDGER_FILENAME,
+                                            project.main_folder,
+                                            trust_done=not args.verify_files)
+
+    cpu_pool = None
+    packing = not args.no_cbr and not stream_to_cbr
+    if args.cpu_workers > 0 and (packing or args.verify_images):
+        # Créé avant tout autre thread du run
+        cpu_pool = CpuPool(args.cpu_workers)
+        steps = ' et '.join(step for step, wanted in (("l'empaquetage", packing),
+                                                       ('la vérification', args.verify_images))
+                            if wanted)
+        print(f"🧮 Pool CPU: {cpu_pool.workers} processus pour {steps}\n")
 
     # 2. Téléchargement -----------------------------------------------------
+    pack_executor = None
     if args.cbr_only:
         print("⏭️  Mode --cbr-only: téléchargement ignoré.\n")
     else:
         max_workers = max(1, args.workers)
-        print(f"🚀 {len(tasks)} images à traiter — {max_workers} téléchargements simultanés\n")
+        http2_session = None
+        if args.http2:
+            http2_session = Http2Session(max(1, args.connections), stats.add_retry)
+            print(f"🔀 HTTP/2: un client partagé, {max(1, args.connections)} connexion(s) "
+                  f"au plus\n")
+        print(f"🚀 {stats.total_images} images à traiter — {max_workers} téléchargements "
+              f"simultanés (moteur {args.engine})\n")
 
-        progress_queue: queue.Queue = queue.Queue()
-        monitor_thread = threading.Thread(
-            target=progress_monitor,
-            args=(progress_queue, stats, len(tasks)),
-            daemon=True,
-        )
-        monitor_thread.start()
+        limiter = AdaptiveHostLimiter(max_workers) if args.adaptive else None
+        if limiter:
+            print(f"🎚️  Concurrence adaptative: {limiter.initial} par hôte au départ, "
+                  f"plafond {max_workers}\n")
+        bandwidth = None
+        if args.max_rate or args.host_rate:
+            bandwidth = BandwidthLimiter(stats, args.max_rate, args.host_rate)
+            caps = [f"{format_rate(rate)}{label}" for rate, label in
+                    ((args.max_rate, ' au total'), (args.host_rate, ' par hôte')) if rate]
+            print(f"⏳ Débit plafonné: {', '.join(caps)}\n")
+
+        store = None
+        if args.dedupe and stream_to_cbr:
+            print("⚠️  --dedupe ignoré avec --stream-to-cbr (aucun fichier image écrit)\n")
+        elif args.dedupe:
+            store = ContentStore(Path(args.store).resolve() if args.store
+                                 else projects[0].main_folder.parent / STORE_DIRNAME)
+            print(f"🔗 Déduplication: magasin {store.root}\n")
+        verifier = None
+        if args.verify_images:
+            verifier = ImageVerifier(cpu_pool=cpu_pool)
+            if PIL_AVAILABLE:
+                print("🧪 Vérification des images: signature, fin de fichier et lecture Pillow\n")
+            else:
+                print("🧪 Vérification des images: signature et fin de fichier "
+                      "(lecture complète: pip install pillow)\n")
+        if args.chapter_window:
+            print(f"📚 Fenêtre de {args.chapter_window} chapitre(s) en cours simultanément"
+                  f"{' par projet' if batch else ''}\n")
+        if not args.no_cbr and not stream_to_cbr and args.pack_workers > 0:
+            pack_executor = ThreadPoolExecutor(
+                max_workers=max(args.pack_workers, cpu_pool.workers if cpu_pool else 0),
+                thread_name_prefix='cbr')
+
+        # --stream-to-cbr: un chapitre terminé est déjà scellé dans son CBR, une page
+        # rattrapée après coup n'aurait plus où aller
+        retries = DeferredRetries() if not stream_to_cbr and not args.no_deferred_retry else None
+
+        warmer = None
+        if not args.no_prewarm:
+            warmer = ConnectionWarmer(collect_origins(p.tasks() for p in projects), stats)
+            started = time.monotonic()
+            unresolved = warmer.resolve()
+            print(f"🔌 Préchauffage: {len(warmer.origins)} hôte(s) résolu(s) en "
+                  f"{(time.monotonic() - started) * 1000:.0f} ms"
+                  + (f", introuvable(s): {', '.join(unresolved)}" if unresolved else '') + "\n")
+            _TimedConnectionMixin.dns_cache = warmer.dns
 
-        sessions = {i: create_session() for i in range(max_workers)}
+        def run_engine(jobs: JobScheduler, workers: int):
+            if args.engine == 'async':
+                asyncio.run(run_async_downloads(jobs, workers, max(1, args.connections), warmer))
+            else:
+                run_thread_downloads(jobs, workers, stats.add_retry, http2_session, warmer)
+
+        for project in projects:
+            label = project.name if batch else ''
+            project.tracker = ChapterTracker(args.chapter_window)
+            prefix = f"[{label}] " if label else ''
+            project.tracker.add_listener(lambda name, progress, prefix=prefix: stats.add_event(
+                f"📗 {prefix}Chapitre terminé: {name}" if not progress.failed
+                else f"📕 {prefix}Chapitre terminé avec {progress.failed} échec(s): {name}"))
+            if pack_executor:
+                project.packer = CbrPacker(project.cbr_folder, pack_executor,
+                                           args.rebuild_cbr, project.ledger, cpu_pool)
+                project.tracker.add_listener(project.packer.on_chapter_done)
+            project.context = DownloadContext(stats, limiter, project.ledger, args.revalidate,
+                                              store, project.archives, project.tracker,
+                                              project=project.name, verifier=verifier,
+                                              bandwidth=bandwidth, retries=retries)
+
+        if metrics:
+            metrics.limiter = limiter
+
+        jobs = JobScheduler((p.tasks(), p.context) for p in projects)
+        renderer = ProgressRenderer(stats, {(p.name if batch else ''): p.tracker
+                                            for p in projects})
+        renderer.start()
         start_time = time.time()
         try:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
-                    executor.submit(download_image, task, sessions[i % max_workers],
-                                    stats, progress_queue)
-                    for i, task in enumerate(tasks)
-                ]
-                for _ in as_completed(futures):
-                    pass
+            run_engine(jobs, max_workers)
+            if retries:
+                replayed = run_deferred_retries(
+                    retries, run_engine, max(1, int(max_workers * DEFERRED_RETRY_CONCURRENCY)))
+                # Chapitres déjà empaquetés avec un trou: la passe finale les reprend
+                for project in projects:
+                    if project.packer:
+                        project.packer.reopen(entry.task.folder for entry in replayed
+                                              if entry.context.project == project.name)
         except KeyboardInterrupt:
             print("\n⏹️  Interruption — les images déjà téléchargées sont conservées.")
+            for project in projects:
+                if project.packer:
+                    project.packer.cancel()
         finally:
             download_time = time.time() - start_time
-            for session in sessions.values():
-                session.close()
-            monitor_thread.join(timeout=3)
+            renderer.stop()
+            if metrics:
+                metrics.stop()
+            for project in projects:
+                if project.ledger:
+                    project.ledger.flush()
+                if project.archives:
+                    project.archives.close()
+
+        if http2_session:
+            http2_session.close()
+            print("\n🔀 Requêtes par protocole: " + ', '.join(
+                f"{version}: {count}" for version, count in sorted(http2_session.protocols.items())))
+        if limiter:
+            print("\n🎚️  Concurrence finale par hôte:")
+            for host, state in limiter.summary():
+                print(f"   {host}: limite {int(state.limit)} (pic {int(state.peak_limit)}) | "
+                      f"429: {state.throttled} | 5xx: {state.server_errors} | "
+                      f"réseau: {state.network_errors}")
 
     # 3. Génération des CBR -------------------------------------------------
-    cbr_created = cbr_skipped = 0
-    if not args.no_cbr:
+    if not args.no_cbr and not stream_to_cbr:
         print(f"\n📦 Génération des fichiers CBR...\n")
-        cbr_created, cbr_skipped = build_all_cbr(tasks, cbr_folder, args.rebuild_cbr)
+    for project in projects:
+        if project.archives:
+            project.cbr_created = project.archives.created
+            project.cbr_skipped = project.archived_chapters
+        elif not args.no_cbr:
+            exclude = None
+            if project.packer:
+                project.cbr_created, project.cbr_skipped = project.packer.wait()
+                exclude = project.packer.packed_folders
+            created, skipped = build_all_cbr(
+                project.tasks(), project.cbr_folder, args.rebuild_cbr, project.ledger,
+                exclude, cpu_pool)
+            project.cbr_created += created
+            project.cbr_skipped += skipped
+    if pack_executor:
+        pack_executor.shutdown(wait=True)
+    if cpu_pool:
+        cpu_pool.shutdown()
+    cbr_created = sum(p.cbr_created for p in projects)
+    cbr_skipped = sum(p.cbr_skipped for p in projects)
 
     # 4. Rapport final ------------------------------------------------------
     final = stats.get_stats()
     print(f"\n{'=' * 62}")
     print("📈 RÉSUMÉ FINAL")
     print(f"{'=' * 62}")
+    if batch:
+        print("📚 Par projet:")
+        for project in projects:
+            counts = stats.project_stats(project.name)
+            line = (f"   {project.name}: ✅ {counts['downloaded']} ⏭️  {counts['skipped']} "
+                    f"❌ {counts['failed']}")
+            if not args.no_cbr:
+                line += f" | 📦 {project.cbr_created} CBR"
+            print(line)
+        print()
     if not args.cbr_only:
         print(f"📊 Total des images      : {final['total']}")
         print(f"✅ Téléchargées          : {final['downloaded']}")
         print(f"⏭️  Déjà présentes        : {final['skipped']}")
         print(f"❌ Échecs                : {final['failed']}")
+        if final['deduplicated']:
+            print(f"🔗 Dédupliquées          : {final['deduplicated']} "
+                  f"({final['deduplicated_bytes'] / (1024 * 1024):.1f} Mo épargnés)")
+        if final['unchanged']:
+            print(f"🔁 Inchangées (304)       : {final['unchanged']}")
+        if final['resumed']:
+            print(f"♻️  Reprises (Range)      : {final['resumed']}")
+        if final['rejected']:
+            print(f"🧪 Corps rejetés         : {final['rejected']} (non-images ou tronqués)")
         print(f"⏱️  Durée                 : {download_time:.1f} s")
         if download_time > 0 and final['downloaded'] > 0:
             print(f"🚀 Vitesse moyenne       : {final['downloaded'] / download_time:.1f} images/s")
+        if final['throttled_seconds']:
+            print(f"⏳ Attente (débit)       : {final['throttled_seconds']:.1f} s cumulées "
+                  f"sur l'ensemble des lecteurs")
+            if len(final['host_throttle']) > 1:
+                for host, seconds in sorted(final['host_throttle'].items()):
+                    print(f"   {host}: {seconds:.1f} s")
+        print_timing_report(stats.timing_summary())
     if not args.no_cbr:
         print(f"📦 CBR créés             : {cbr_created}")
         print(f"📦 CBR déjà complets     : {cbr_skipped}")
-    print(f"📁 Destination           : {main_folder}")
+    if batch:
+        print(f"📁 Destinations          : {len(projects)} dossiers sous "
+              f"{os.path.commonpath([p.main_folder for p in projects])}")
+    else:
+        print(f"📁 Destination           : {projects[0].main_folder}")
 
-    # Les échecs sont journalisés pour permettre un re-run ciblé.
-    if stats.failures:
-        log_path = main_folder / 'echecs_telechargement.json'
-        with open(log_path, 'w', encoding='utf-8') as f:
-            json.dump(
-                [{'chapitre': c, 'page': p, 'url': u, 'erreur': e}
-                 for c, p, u, e in stats.failures],
-                f, ensure_ascii=False, indent=2,
-            )
-        print(f"\n⚠️  {len(stats.failures)} échec(s) journalisé(s): {log_path.name}")
-        print("   Relancez le script: seules les images manquantes seront retentées.")
+    any_failed = False
+    for project in projects:
+        failed = write_failure_log(project, stats)
+        if failed:
+            any_failed = True
+            where = f" ({project.name})" if batch else ''
+            print(f"\n⚠️  {failed} échec(s) journalisé(s){where}: {FAILURE_LOG_FILENAME}")
+    if any_failed:
+        print("   Relancez le script: seules les images manquantes seront retentées "
+              "(--retry-failures: uniquement celles du journal).")
 
     return 0
 
@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+Manga Hyperspeed Bench — banc d'essai hors ligne de manga_hyperspeed.py.
+
+Démarre un serveur HTTP local qui sert des pages synthétiques (webp/jpg) avec
+latence, bande passante, taux d'erreur et distribution de tailles réglables,
+génère un JSON d'extraction (`projectName` / `chapters`) pointant dessus, puis
+lance manga_hyperspeed.py pour chaque combinaison moteur × workers et mesure
+images/s, Mo/s, temps CPU et pic de mémoire (RSS). Aucun accès réseau requis.
+
+Usage:
+    python manga_hyperspeed_bench.py                              # matrice par défaut
+    python manga_hyperspeed_bench.py -w 8,32,128 -e threads,async
+    python manga_hyperspeed_bench.py --latency-ms 120 --bandwidth-kbps 2000
+    python manga_hyperspeed_bench.py --error-rate 0.05 --extra=--adaptive
+    python manga_hyperspeed_bench.py --results bench.json         # résultats en JSON
+    python manga_hyperspeed_bench.py --serve --port 8765          # serveur seul (essais manuels)
+    python manga_hyperspeed_bench.py --task-memory --chapters 500 --pages 60  # mémoire par page
+    python manga_hyperspeed_bench.py --read-cpu 100,1000,5000     # CPU par image selon la taille
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    import resource
+except ImportError:  # Windows: ni wait4 ni getrusage, CPU et RSS non mesurés
+    resource = None
+
+DOWNLOADER = Path(__file__).resolve().with_name('manga_hyperspeed.py')
+
+# Réserve d'octets pseudo-aléatoires dans laquelle les corps d'images sont découpés
+# (incompressibles, comme de vraies images, sans coût de génération par requête)
+PAYLOAD_POOL_BYTES = 8 * 1024 * 1024
+MIN_IMAGE_BYTES = 1024
+MAX_IMAGE_BYTES = 6 * 1024 * 1024
+WRITE_CHUNK = 16 * 1024
+# Dernières lignes de sortie du téléchargeur affichées quand il échoue
+OUTPUT_TAIL_LINES = 20
+
+# Vraies images 8x8 (gris uni), complétées jusqu'à la taille voulue par des blocs que
+# les décodeurs ignorent: segments COM du JPEG, bloc inconnu d'un WebP étendu (VP8X).
+# Elles passent --verify-images, Pillow compris.
+JPEG_BASE = bytes.fromhex(
+    'ffd8ffe000104a46494600010100000100010000ffdb004300100b0c0e0c0a100e0d0e1211101318281a1816'
+    '16183123251d283a333d3c3933383740485c4e404457453738506d51575f626768673e4d71797064785c6567'
+    '63ffc0000b080008000801011100ffc4001f0000010501010101010100000000000000000102030405060708'
+    '090a0bffc400b5100002010303020403050504040000017d01020300041105122131410613516107227114'
+    '328191a1082342b1c11552d1f02433627282090a161718191a25262728292a3435363738393a434445464748'
+    '494a535455565758595a636465666768696a737475767778797a838485868788898a92939495969798999aa2'
+    'a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9'
+    'eaf1f2f3f4f5f6f7f8f9faffda0008010100003f002bffd9')
+JPEG_APP0_END = 20  # SOI + segment APP0 (JFIF): les commentaires viennent après
+JPEG_COMMENT_MAX = 65533
+WEBP_VP8L_CHUNK = bytes.fromhex('5650384c110000002f07c001000750c00216b0ff8188e87f0000')
+WEBP_VP8X_CHUNK = b'VP8X' + (10).to_bytes(4, 'little') + bytes(4) + (7).to_bytes(3, 'little') * 2
+
+
+# --------------------------------------------------------------------------- #
+# Serveur synthétique
+# --------------------------------------------------------------------------- #
+
+@dataclass
+class ServerProfile:
+    latency_ms: float = 30.0
+    jitter_ms: float = 10.0
+    bandwidth_kbps: float = 0.0  # par connexion, 0 = illimité
+    error_rate: float = 0.0
+    size_kb: float = 300.0
+    size_sigma: float = 0.4
+    seed: int = 0
+
+
+class ServerCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def add(self, **deltas):
+        with self.lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {'requests': self.requests, 'errors': self.errors,
+                    'not_modified': self.not_modified, 'bytes_sent': self.bytes_sent}
+
+
+class SyntheticImageServer:
+    """
+    Serveur HTTP/1.1 keep-alive servant /img/<chapitre>/<page>.<ext>.
+
+    La taille de chaque page suit une loi log-normale (médiane `size_kb`,
+    dispersion `size_sigma`) tirée d'une graine dérivée du chemin: une même URL
+    a toujours le même contenu (ETag stable, 304 sur If-None-Match). Les erreurs
+    (503) sont tirées à chaque requête, une relance peut donc réussir.
+    """
+
+    def __init__(self, profile: ServerProfile, host: str = '127.0.0.1', port: int = 0):
+        self.profile = profile
+        self.counters = ServerCounters()
+        self.random = random.Random(profile.seed)
+        self.random_lock = threading.Lock()
+        self.pool = random.Random(profile.seed).randbytes(PAYLOAD_POOL_BYTES)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024  # le moteur async ouvre des centaines de connexions
+
+        self.httpd = Server((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _chance(self) -> float:
+        with self.random_lock:
+            return self.random.random()
+
+    def page_size(self, path: str) -> int:
+        rng = random.Random(zlib.crc32(path.encode()) ^ self.profile.seed)
+        size = rng.lognormvariate(0, self.profile.size_sigma) * self.profile.size_kb * 1024
+        return int(min(MAX_IMAGE_BYTES, max(MIN_IMAGE_BYTES, size)))
+
+    def page_body(self, path: str) -> bytes:
+        payload_size = self.page_size(path)
+        offset = zlib.crc32(path.encode()) % (PAYLOAD_POOL_BYTES - payload_size)
+        payload = self.pool[offset:offset + payload_size]
+        if path.endswith('.webp'):
+            return padded_webp(payload)
+        return padded_jpeg(payload)
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        profile = self.profile
+        path = urlparse(request.path).path
+        if not path.startswith('/img/'):
+            request.send_error(404)
+            return
+        delay = profile.latency_ms + profile.jitter_ms * (2 * self._chance() - 1)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if profile.error_rate and self._chance() < profile.error_rate:
+            self.counters.add(requests=1, errors=1)
+            request.send_response(503)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+
+        body = self.page_body(path)
+        etag = f'"{hashlib.md5(body[:4096]).hexdigest()}-{len(body)}"'
+        if request.headers.get('If-None-Match') == etag:
+            self.counters.add(requests=1, not_modified=1)
+            request.send_response(304)
+            request.send_header('ETag', etag)
+            request.end_headers()
+            return
+
+        request.send_response(200)
+        request.send_header('Content-Type', 'image/webp' if path.endswith('.webp') else 'image/jpeg')
+        request.send_header('Content-Length', str(len(body)))
+        request.send_header('ETag', etag)
+        request.end_headers()
+        try:
+            if profile.bandwidth_kbps > 0:
+                pause = WRITE_CHUNK / (profile.bandwidth_kbps * 1024)
+                for start in range(0, len(body), WRITE_CHUNK):
+                    request.wfile.write(body[start:start + WRITE_CHUNK])
+                    time.sleep(pause)
+            else:
+                request.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        self.counters.add(requests=1, bytes_sent=len(body))
+
+
+def padded_jpeg(payload: bytes) -> bytes:
+    """JPEG décodable dont `payload` remplit des segments de commentaire (COM)"""
+    comments = b''.join(
+        b'\xff\xfe' + (len(part) + 2).to_bytes(2, 'big') + part
+        for part in (payload[start:start + JPEG_COMMENT_MAX]
+                     for start in range(0, len(payload), JPEG_COMMENT_MAX)))
+    return JPEG_BASE[:JPEG_APP0_END] + comments + JPEG_BASE[JPEG_APP0_END:]
+
+
+def padded_webp(payload: bytes) -> bytes:
+    """WebP étendu décodable dont `payload` remplit un bloc inconnu, ignoré par libwebp"""
+    padding = b'\x00' if len(payload) % 2 else b''
+    body = (b'WEBP' + WEBP_VP8X_CHUNK + WEBP_VP8L_CHUNK
+            + b'XPAD' + len(payload).to_bytes(4, 'little') + payload + padding)
+    return b'RIFF' + len(body).to_bytes(4, 'little') + body
+
+
+def write_project_json(path: Path, base_url: str, chapters: int, pages: int,
+                       image_format: str) -> int:
+    """Écrit un JSON d'extraction pointant vers le serveur; renvoie le nombre d'images"""
+    data = {'projectName': 'hyperspeed_bench', 'chapters': {}}
+    for chapter in range(1, chapters + 1):
+        images = []
+        for page in range(1, pages + 1):
+            extension = image_format if image_format != 'mix' else ('webp', 'jpg')[page % 2]
+            images.append(f"{base_url}/img/{chapter}/{page}.{extension}")
+        data['chapters'][f"Chapitre {chapter}"] = {
+            'url': f"{base_url}/chapter/{chapter}",
+            'images': images,
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return chapters * pages
+
+
+# --------------------------------------------------------------------------- #
+# Exécution de la matrice
+# --------------------------------------------------------------------------- #
+
+@dataclass
+class BenchResult:
+    engine: str
+    workers: int
+    run: int
+    seconds: float
+    images: int
+    failed: int
+    megabytes: float
+    images_per_s: float
+    mb_per_s: float
+    cpu_seconds: Optional[float]
+    peak_rss_mb: Optional[float]
+    exit_code: int
+
+
+def run_downloader(command: List[str]):
+    """
+    Lance le téléchargeur; renvoie (code, durée, temps CPU, pic RSS en Mo).
+    Ses sorties vont dans un fichier temporaire (un tube non lu bloquerait un
+    enfant bavard) dont les dernières lignes sont affichées s'il échoue: le
+    téléchargeur signale ses erreurs d'options sur la sortie standard, une
+    exception sur la sortie d'erreur.
+    """
+    with tempfile.TemporaryFile() as output:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, stdout=output, stderr=subprocess.STDOUT)
+        if resource is not None and hasattr(os, 'wait4'):
+            # wait4 donne la consommation de CE processus, pas le cumul des enfants
+            _, status, usage = os.wait4(process.pid, 0)
+            seconds = time.perf_counter() - started
+            process.returncode = os.waitstatus_to_exitcode(status)
+            rss_kb = usage.ru_maxrss / 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+            cpu, rss = usage.ru_utime + usage.ru_stime, rss_kb / 1024
+        else:
+            process.wait()
+            seconds = time.perf_counter() - started
+            cpu = rss = None
+        if process.returncode != 0:
+            output.seek(0)
+            lines = output.read().decode('utf-8', errors='replace').splitlines()
+            print(f"⚠️  Le téléchargeur a échoué (code {process.returncode}):")
+            for line in lines[-OUTPUT_TAIL_LINES:]:
+                print(f"   {line}")
+    return process.returncode, seconds, cpu, rss
+
+
+def count_failures(output_dir: Path) -> int:
+    log_path = output_dir / 'echecs_telechargement.json'
+    if not log_path.exists():
+        return 0
+    with open(log_path, 'r', encoding='utf-8') as f:
+        return len(json.load(f))
+
+
+def run_matrix(args: argparse.Namespace, server: SyntheticImageServer, json_path: Path,
+               total_images: int, workdir: Path) -> List[BenchResult]:
+    results = []
+    extra = shlex.split(args.extra) if args.extra else []
+    for engine in args.engines:
+        for workers in args.workers:
+            for run in range(1, args.repeat + 1):
+                output_dir = workdir / f"out_{engine}_{workers}_{run}"
+                command = [sys.executable, str(DOWNLOADER), str(json_path),
+                           '-o', str(output_dir), '-w', str(workers), '--engine', engine]
+                if not args.with_cbr:
+                    command.append('--no-cbr')
+                command.extend(extra)
+
+                before = server.counters.snapshot()
+                code, seconds, cpu, rss = run_downloader(command)
+                after = server.counters.snapshot()
+                megabytes = (after['bytes_sent'] - before['bytes_sent']) / (1024 * 1024)
+                result = BenchResult(
+                    engine=engine, workers=workers, run=run, seconds=round(seconds, 3),
+                    images=total_images, failed=count_failures(output_dir),
+                    megabytes=round(megabytes, 2),
+                    images_per_s=round(total_images / seconds, 1),
+                    mb_per_s=round(megabytes / seconds, 2),
+                    cpu_seconds=round(cpu, 2) if cpu is not None else None,
+                    peak_rss_mb=round(rss, 1) if rss is not None else None,
+                    exit_code=code,
+                )
+                results.append(result)
+                print_result(result)
+                if not args.keep:
+                    shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+
+def print_header():
+    print(f"{'moteur':<8} {'-w':>5} {'essai':>5} {'durée':>8} {'images/s':>9} {'Mo/s':>8} "
+          f"{'CPU s':>7} {'CPU %':>6} {'RSS Mo':>7} {'échecs':>6}")
+    print('-' * 80)
+
+
+def print_result(result: BenchResult):
+    cpu = f"{result.cpu_seconds:.2f}" if result.cpu_seconds is not None else 'n/d'
+    cpu_share = (f"{100 * result.cpu_seconds / result.seconds:.0f}"
+                 if result.cpu_seconds is not None else 'n/d')
+    rss = f"{result.peak_rss_mb:.1f}" if result.peak_rss_mb is not None else 'n/d'
+    status = '' if result.exit_code == 0 else f"  ⚠️ code {result.exit_code}"
+    print(f"{result.engine:<8} {result.workers:>5} {result.run:>5} {result.seconds:>7.2f}s "
+          f"{result.images_per_s:>9.1f} {result.mb_per_s:>8.2f} {cpu:>7} {cpu_share:>6} "
+          f"{rss:>7} {result.failed:>6}{status}")
+
+
+# --------------------------------------------------------------------------- #
+# Mémoire par page en file (--task-memory)
+# --------------------------------------------------------------------------- #
+
+@dataclass
+class LegacyTask:
+    """Tâche telle qu'elle était avant TaskTable (référence de comparaison)"""
+    url: str
+    filepath: Path
+    page_number: int
+    chapter_name: str
+
+
+def synthetic_chapters_json(chapters: int, pages: int) -> str:
+    """JSON d'extraction aux URL réalistes: long préfixe commun par série et chapitre"""
+    data = {'projectName': 'memoire', 'chapters': {}}
+    for chapter in range(1, chapters + 1):
+        prefix = f"https://api.phenix-scans.co/uploads/mangas/the-regressed-mercenary/chapitre-{chapter}/"
+        data['chapters'][f"Chapitre {chapter}"] = {
+            'url': f"https://phenix-scans.co/manga/the-regressed-mercenary/chapitre/{chapter}",
+            'images': [f"{prefix}{page:02d}-{hashlib.md5(f'{chapter}/{page}'.encode()).hexdigest()[:12]}.webp"
+                       for page in range(1, pages + 1)],
+        }
+    return json.dumps(data)
+
+
+def traced_bytes(build):
+    """(objet construit, octets alloués et encore vivants après build())"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def run_task_memory(chapters: int, pages: int) -> Dict[str, float]:
+    """
+    Octets par page de chaque représentation, mesurés avec tracemalloc:
+    le dict JSON seul, l'ancienne forme (JSON conservé par le run + une
+    dataclass par page en file), la TaskTable (JSON libéré) et les
+    DownloadTask compactes qu'elle produit.
+    """
+    sys.path.insert(0, str(DOWNLOADER.parent))
+    from manga_hyperspeed import TaskTable, extract_chapter_number, guess_extension, sanitize_filename
+
+    text = synthetic_chapters_json(chapters, pages)
+    total = chapters * pages
+    folder = Path('/bibliotheque/the-regressed-mercenary')
+
+    def legacy():
+        data = json.loads(text)['chapters']
+        tasks = []
+        for name, chapter in sorted(data.items(), key=lambda x: extract_chapter_number(x[0])):
+            for i, url in enumerate(chapter['images'], 1):
+                tasks.append(LegacyTask(url=url, page_number=i, chapter_name=name,
+                                        filepath=folder / sanitize_filename(name) /
+                                        f"page_{i:03d}.{guess_extension(url, i)}"))
+        return data, tasks
+
+    # Premier passage hors mesure: caches de re et de pathlib déjà remplis
+    legacy()
+    TaskTable(json.loads(text)['chapters'], folder)
+    json_data, json_bytes = traced_bytes(lambda: json.loads(text)['chapters'])
+    _, legacy_bytes = traced_bytes(legacy)
+    table, table_bytes = traced_bytes(lambda: TaskTable(json.loads(text)['chapters'], folder))
+    del json_data
+    _, task_bytes = traced_bytes(lambda: list(table.tasks()))
+    return {
+        'json': json_bytes / total,
+        'legacy': legacy_bytes / total,
+        'table': table_bytes / total,
+        'tasks': task_bytes / total,
+    }
+
+
+def print_task_memory(chapters: int, pages: int, measures: Dict[str, float]):
+    print(f"🧠 Mémoire par page ({chapters} chapitres × {pages} pages = {chapters * pages} pages)")
+    for key, label in (('json', "JSON chargé (dict)"),
+                       ('legacy', "Avant: JSON gardé + dataclass/page"),
+                       ('table', "TaskTable (JSON libéré)"),
+                       ('tasks', "DownloadTask compacte (en file)")):
+        print(f"   {label:<36}: {measures[key]:>7.0f} o/page")
+    print(f"📉 Projet en mémoire: ×{measures['legacy'] / measures['table']:.0f} "
+          f"| page en file: ×{measures['legacy'] / measures['tasks']:.1f}")
+
+
+# --------------------------------------------------------------------------- #
+# CPU par image du chemin de lecture (--read-cpu)
+# --------------------------------------------------------------------------- #
+
+def run_read_cpu(sizes_kb: List[int], images: int, workdir: Path) -> List[Dict]:
+    """
+    Temps CPU du thread client par image, pour chaque taille de page: ancienne
+    boucle iter_content(8192) contre stream_body (lecture unique ou readinto
+    dans des tampons réutilisés). Même session, même PageWriter, serveur local
+    sans latence; thread_time() exclut le CPU des threads du serveur.
+    """
+    sys.path.insert(0, str(DOWNLOADER.parent))
+    from manga_hyperspeed import ChapterRef, DownloadTask, PageWriter, create_session, stream_body
+
+    def legacy(response, writer, host):
+        for chunk in response.iter_content(chunk_size=8192):
+            writer.write(chunk)
+
+    rows = []
+    session = create_session()
+    chapter = ChapterRef(0, 'lecture', workdir)
+    for size_kb in sizes_kb:
+        server = SyntheticImageServer(ServerProfile(latency_ms=0, jitter_ms=0, size_kb=size_kb,
+                                                    size_sigma=0))
+        server.start()
+        row = {'size_kb': size_kb}
+        try:
+            # Deux passes: la première réchauffe connexions et caches, seule la seconde compte
+            for _ in range(2):
+                for name, read in (('iter_content', legacy), ('stream_body', stream_body)):
+                    cpu = wall = 0.0
+                    for page in range(1, images + 1):
+                        task = DownloadTask.from_url(chapter, page, f"{server.base_url}/img/1/{page}.webp",
+                                                     'webp')
+                        writer = PageWriter(task)
+                        started_cpu, started = time.thread_time(), time.perf_counter()
+                        response = session.get(task.url, stream=True)
+                        with writer.open(response.status_code, response.headers):
+                            read(response, writer, '')
+                        response.close()
+                        writer.commit()
+                        cpu += time.thread_time() - started_cpu
+                        wall += time.perf_counter() - started
+                        task.filepath.unlink()
+                    row[name] = {'cpu_ms': round(1000 * cpu / images, 3),
+                                 'wall_ms': round(1000 * wall / images, 3)}
+        finally:
+            server.stop()
+        rows.append(row)
+    session.close()
+    return rows
+
+
+def print_read_cpu(rows: List[Dict], images: int):
+    print(f"🧮 CPU par image, {images} images par taille (thread client)")
+    print(f"{'taille':>9} {'iter_content ms':>16} {'stream_body ms':>15} {'gain':>6}")
+    print('-' * 50)
+    for row in rows:
+        before, after = row['iter_content']['cpu_ms'], row['stream_body']['cpu_ms']
+        gain = f"×{before / after:.1f}" if after else 'n/d'
+        print(f"{row['size_kb']:>6} Ko {before:>16.2f} {after:>15.2f} {gain:>6}")
+
+
+# --------------------------------------------------------------------------- #
+# Programme principal
+# --------------------------------------------------------------------------- #
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Banc d'essai hors ligne de manga_hyperspeed.py (serveur d'images local).",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('-w', '--workers', type=parse_int_list, default=[4, 16, 64],
+                        help="Valeurs de -w à mesurer, séparées par des virgules (défaut: 4,16,64)")
+    parser.add_argument('-e', '--engines', type=lambda v: [e for e in v.split(',') if e],
+                        default=['threads', 'async'],
+                        help="Moteurs à mesurer (défaut: threads,async)")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="Nombre d'essais par combinaison (défaut: 1)")
+    parser.add_argument('--chapters', type=int, default=20, help="Chapitres générés (défaut: 20)")
+    parser.add_argument('--pages', type=int, default=30, help="Pages par chapitre (défaut: 30)")
+    parser.add_argument('--format', dest='image_format', choices=['webp', 'jpg', 'mix'],
+                        default='webp', help="Format des pages (défaut: webp)")
+    parser.add_argument('--size-kb', type=float, default=300.0,
+                        help="Taille médiane d'une page en Ko (défaut: 300)")
+    parser.add_argument('--size-sigma', type=float, default=0.4,
+                        help="Dispersion log-normale des tailles (défaut: 0.4, 0 = fixe)")
+    parser.add_argument('--latency-ms', type=float, default=30.0,
+                        help="Latence avant les en-têtes, en ms (défaut: 30)")
+    parser.add_argument('--jitter-ms', type=float, default=10.0,
+                        help="Variation uniforme de la latence, en ms (défaut: 10)")
+    parser.add_argument('--bandwidth-kbps', type=float, default=0.0,
+                        help="Débit par connexion en Ko/s (défaut: 0, illimité)")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Part des requêtes répondues en 503 (défaut: 0)")
+    parser.add_argument('--seed', type=int, default=0, help="Graine des tirages (défaut: 0)")
+    parser.add_argument('--extra', default='',
+                        help="Options supplémentaires passées telles quelles à manga_hyperspeed.py")
+    parser.add_argument('--with-cbr', action='store_true',
+                        help="Inclut la génération des CBR dans la mesure (défaut: --no-cbr)")
+    parser.add_argument('--keep', action='store_true',
+                        help="Conserve les dossiers téléchargés (dans le dossier temporaire)")
+    parser.add_argument('--results', default=None,
+                        help="Écrit les résultats dans ce fichier JSON (comparaison entre versions)")
+    parser.add_argument('--serve', action='store_true',
+                        help="Démarre seulement le serveur et écrit le JSON, jusqu'à Ctrl+C")
+    parser.add_argument('--port', type=int, default=0,
+                        help="Port du serveur (défaut: choisi par le système)")
+    parser.add_argument('--task-memory', action='store_true',
+                        help="Mesure seulement la mémoire par page des représentations de "
+                             "tâches (avant / TaskTable), sans serveur ni téléchargement")
+    parser.add_argument('--read-cpu', type=parse_int_list, default=None, metavar='TAILLES_KO',
+                        help="Mesure seulement le CPU par image du chemin de lecture pour ces "
+                             "tailles de page en Ko (ex: 100,1000,5000), ancienne boucle "
+                             "iter_content(8192) contre stream_body")
+    parser.add_argument('--read-images', type=int, default=30,
+                        help="Images mesurées par taille avec --read-cpu (défaut: 30)")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.task_memory:
+        measures = run_task_memory(args.chapters, args.pages)
+        print_task_memory(args.chapters, args.pages, measures)
+        if args.results:
+            with open(args.results, 'w', encoding='utf-8') as f:
+                json.dump({'project': {'chapters': args.chapters, 'pages': args.pages},
+                           'bytes_per_page': measures}, f, ensure_ascii=False, indent=2)
+            print(f"💾 Résultats: {args.results}")
+        return 0
+    if args.read_cpu:
+        with tempfile.TemporaryDirectory(prefix='hyperspeed_bench_') as temp_dir:
+            rows = run_read_cpu(args.read_cpu, args.read_images, Path(temp_dir))
+        print_read_cpu(rows, args.read_images)
+        if args.results:
+            with open(args.results, 'w', encoding='utf-8') as f:
+                json.dump({'images': args.read_images, 'sizes': rows}, f, ensure_ascii=False, indent=2)
+            print(f"💾 Résultats: {args.results}")
+        return 0
+    profile = ServerProfile(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        bandwidth_kbps=args.bandwidth_kbps, error_rate=args.error_rate,
+        size_kb=args.size_kb, size_sigma=args.size_sigma, seed=args.seed,
+    )
+    if 'async' in args.engines and not args.serve:
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            print("⚠️  Module 'aiohttp' absent: moteur async ignoré. Installation: pip install aiohttp")
+            args.engines = [e for e in args.engines if e != 'async']
+    if not args.engines or not args.workers:
+        print("❌ Aucun moteur ou aucune valeur de -w à mesurer")
+        return 1
+
+    server = SyntheticImageServer(profile, port=args.port)
+    server.start()
+    with tempfile.TemporaryDirectory(prefix='hyperspeed_bench_') as temp_dir:
+        workdir = Path(temp_dir)
+        json_path = workdir / 'hyperspeed_bench.json'
+        total_images = write_project_json(json_path, server.base_url, args.chapters,
+                                          args.pages, args.image_format)
+
+        print(f"{'=' * 80}")
+        print(f"🧪 Serveur synthétique : {server.base_url}")
+        print(f"📊 Projet              : {args.chapters} chapitres × {args.pages} pages "
+              f"= {total_images} images ({args.image_format}, médiane {args.size_kb:g} Ko)")
+        print(f"🐢 Profil              : latence {args.latency_ms:g}±{args.jitter_ms:g} ms | "
+              f"débit {'illimité' if not args.bandwidth_kbps else f'{args.bandwidth_kbps:g} Ko/s'} | "
+              f"erreurs {args.error_rate:.0%}")
+        print(f"{'=' * 80}\n")
+
+        if args.serve:
+            print(f"📄 JSON : {json_path}")
+            print("   Ctrl+C pour arrêter.")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                print()
+            server.stop()
+            return 0
+
+        print_header()
+        try:
+            results = run_matrix(args, server, json_path, total_images, workdir)
+        except KeyboardInterrupt:
+            print("\n⏹️  Banc interrompu")
+            server.stop()
+            return 130
+        served = server.counters.snapshot()
+        server.stop()
+
+    print(f"\n📡 Serveur: {served['requests']} requêtes, {served['errors']} erreurs injectées, "
+          f"{served['bytes_sent'] / (1024 * 1024):.1f} Mo servis")
+    best = max(results, key=lambda r: r.images_per_s)
+    print(f"🏆 Meilleur débit: {best.engine} -w {best.workers} — {best.images_per_s:.1f} images/s, "
+          f"{best.mb_per_s:.2f} Mo/s")
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump({'profile': asdict(profile),
+                       'project': {'chapters': args.chapters, 'pages': args.pages,
+                                   'format': args.image_format, 'extra': args.extra},
+                       'results': [asdict(r) for r in results]},
+                      f, ensure_ascii=False, indent=2)
+        print(f"💾 Résultats: {args.results}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,632 @@
+#!/usr/bin/env python3
+"""
+Manga Hyperspeed Cluster — téléchargement réparti sur plusieurs machines.
+
+Un coordinateur découpe un projet en chapitres (les tâches de
+prepare_download_tasks) et les distribue par baux HTTP à des workers qui
+tournent sur d'autres hôtes. Chaque worker télécharge ses chapitres avec le
+moteur de manga_hyperspeed.py, construit les CBR localement et signale la
+fin de chaque chapitre. Un bail non renouvelé (worker planté, réseau coupé)
+expire et le chapitre est redistribué.
+
+Usage:
+    # Machine A: coordinateur
+    python manga_hyperspeed_cluster.py coordinator mon_manga.json --host 0.0.0.0 --port 8770
+    # Machines B, C...: workers
+    python manga_hyperspeed_cluster.py worker http://machine-a:8770 -o /data/manga -w 32
+    # Une seule machine: coordinateur local + 3 processus workers
+    python manga_hyperspeed_cluster.py local mon_manga.json --processes 3 -w 16
+
+Protocole (JSON sur HTTP, en-tête X-Hyperspeed-Token si --token):
+    GET  /project   -> nom du projet, chapitres, pages
+    POST /lease     -> un chapitre à télécharger, {"wait": s} ou {"done": true}
+    POST /renew     -> prolonge un bail (410 s'il a expiré)
+    POST /complete  -> fin d'un chapitre, avec ses pages en échec
+    GET  /status    -> avancement
+"""
+
+import argparse
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from manga_hyperspeed import (
+    DEFAULT_DATA_DIR,
+    DEFAULT_OUTPUT_DIR,
+    USER_AGENT,
+    CbrPacker,
+    ChapterProgress,
+    ChapterRef,
+    ChapterTracker,
+    DownloadContext,
+    DownloadStats,
+    DownloadTask,
+    JobScheduler,
+    ProgressRenderer,
+    classify_failure_message,
+    describe_json,
+    prepare_download_tasks,
+    print_timing_report,
+    run_thread_downloads,
+)
+
+DEFAULT_PORT = 8770
+TOKEN_HEADER = 'X-Hyperspeed-Token'
+
+# Durée d'un bail: le worker le renouvelle toutes les LEASE_SECONDS / 3 secondes
+LEASE_SECONDS = 120
+# Attente suggérée à un worker quand tous les chapitres restants sont sous bail
+WAIT_SECONDS = 2.0
+# Après la fin du projet, le coordinateur répond encore {"done": true} ce temps-là
+DONE_GRACE_SECONDS = 10.0
+HTTP_TIMEOUT = 30
+
+
+# --------------------------------------------------------------------------- #
+# Coordinateur
+# --------------------------------------------------------------------------- #
+
+@dataclass
+class ChapterShard:
+    index: int
+    name: str
+    pages: List[list]  # [numéro de page, URL, chemin relatif au dossier du projet]
+    status: str = 'pending'  # pending | leased | done
+    lease: Optional[str] = None
+    worker: Optional[str] = None
+    deadline: float = 0.0
+    attempts: int = 0
+    downloaded: int = 0
+    skipped: int = 0
+    failed: List[list] = field(default_factory=list)
+
+
+class Coordinator:
+    """
+    Distribue les chapitres d'un projet par baux. Tout l'état est en mémoire
+    et protégé par un seul verrou: le coordinateur ne fait qu'échanger de
+    petits JSON, le débit d'images passe directement des sites aux workers.
+    """
+
+    def __init__(self, json_path: Path, lease_seconds: int = LEASE_SECONDS):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.project_name = data.get('projectName') or json_path.stem
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.shards: List[ChapterShard] = []
+        self.leases: Dict[str, ChapterShard] = {}  # baux actifs
+        self.issued: Dict[str, ChapterShard] = {}  # tous les baux émis, même expirés
+        self.workers: Dict[str, float] = {}
+        self.finished_at: Optional[float] = None
+
+        by_chapter: Dict[str, ChapterShard] = {}
+        for task in prepare_download_tasks(data.get('chapters', {}), Path()):
+            shard = by_chapter.get(task.chapter_name)
+            if shard is None:
+                shard = ChapterShard(index=len(self.shards), name=task.chapter_name, pages=[])
+                by_chapter[task.chapter_name] = shard
+                self.shards.append(shard)
+            shard.pages.append([task.page_number, task.url, task.filepath.as_posix()])
+        self.total_pages = sum(len(shard.pages) for shard in self.shards)
+
+    def project(self) -> Dict:
+        return {'projectName': self.project_name, 'chapters': len(self.shards),
+                'pages': self.total_pages, 'lease_seconds': self.lease_seconds}
+
+    def _reap(self, now: float):
+        """Remet en jeu les chapitres dont le bail a expiré (à appeler sous self.lock)"""
+        for lease, shard in list(self.leases.items()):
+            if shard.deadline < now:
+                print(f"⌛ Bail expiré: {shard.name} ({shard.worker}), chapitre redistribué")
+                del self.leases[lease]
+                shard.status, shard.lease, shard.worker = 'pending', None, None
+
+    def lease(self, worker: str) -> Dict:
+        now = time.monotonic()
+        with self.lock:
+            self.workers[worker] = now
+            self._reap(now)
+            for shard in self.shards:
+                if shard.status == 'pending':
+                    shard.status, shard.worker = 'leased', worker
+                    shard.lease = secrets.token_hex(8)
+                    shard.deadline = now + self.lease_seconds
+                    shard.attempts += 1
+                    self.leases[shard.lease] = self.issued[shard.lease] = shard
+                    return {'lease': shard.lease, 'chapter': shard.name, 'pages': shard.pages,
+                            'ttl': self.lease_seconds}
+            if self.finished_at is not None:
+                return {'done': True}
+            return {'wait': WAIT_SECONDS}
+
+    def renew(self, lease: str) -> bool:
+        with self.lock:
+            shard = self.leases.get(lease)
+            if shard is None:
+                return False
+            shard.deadline = time.monotonic() + self.lease_seconds
+            return True
+
+    def complete(self, lease: str, downloaded: int, skipped: int, failed: List[list]) -> bool:
+        """
+        Enregistre la fin d'un chapitre. Un bail expiré entre-temps est encore
+        accepté si personne n'a terminé le chapitre: le travail est fait.
+        """
+        with self.lock:
+            shard = self.issued.get(lease)
+            if shard is None or shard.status == 'done':
+                return False
+            # Le chapitre a pu être redistribué entre-temps: ce nouveau bail tombe
+            self.leases.pop(lease, None)
+            if shard.lease != lease:
+                self.leases.pop(shard.lease, None)
+            shard.status = 'done'
+            shard.downloaded, shard.skipped, shard.failed = downloaded, skipped, failed
+            done = sum(1 for s in self.shards if s.status == 'done')
+            if done == len(self.shards):
+                self.finished_at = time.monotonic()
+        marker = '📗' if not failed else '📕'
+        print(f"{marker} [{done}/{len(self.shards)}] {shard.name} — {shard.worker}: "
+              f"✅ {downloaded} ⏭️  {skipped} ❌ {len(failed)}")
+        return True
+
+    def status(self) -> Dict:
+        with self.lock:
+            counts = {'pending': 0, 'leased': 0, 'done': 0}
+            for shard in self.shards:
+                counts[shard.status] += 1
+            return {
+                'projectName': self.project_name,
+                'chapters': counts,
+                'pages': self.total_pages,
+                'downloaded': sum(s.downloaded for s in self.shards),
+                'skipped': sum(s.skipped for s in self.shards),
+                'failed': sum(len(s.failed) for s in self.shards),
+                'workers': sorted(self.workers),
+                'leases': [{'chapter': s.name, 'worker': s.worker,
+                            'expires_in': round(s.deadline - time.monotonic(), 1)}
+                           for s in self.leases.values()],
+            }
+
+    def is_finished(self) -> bool:
+        with self.lock:
+            return (self.finished_at is not None
+                    and time.monotonic() - self.finished_at > DONE_GRACE_SECONDS)
+
+    def failures(self) -> List[Dict]:
+        with self.lock:
+            # Un worker d'une version précédente n'envoie pas le type de l'échec
+            return [{'chapitre': shard.name, 'page': page, 'url': url, 'erreur': error,
+                     'type': kind[0] if kind else classify_failure_message(error)}
+                    for shard in self.shards for page, url, error, *kind in shard.failed]
+
+
+def parse_report(body: Dict) -> Optional[Tuple[int, int, List[list]]]:
+    """
+    (téléchargées, sautées, échecs) d'un POST /complete, None s'il est mal
+    formé: des compteurs entiers positifs et des échecs [page, url, erreur, type?].
+    """
+    downloaded, skipped = body.get('downloaded', 0), body.get('skipped', 0)
+    failed = body.get('failed') or []
+    if not all(isinstance(count, int) and not isinstance(count, bool) and count >= 0
+               for count in (downloaded, skipped)):
+        return None
+    if not isinstance(failed, list) or not all(
+            isinstance(entry, list) and 3 <= len(entry) <= 4 for entry in failed):
+        return None
+    return downloaded, skipped, failed
+
+
+def create_server(coordinator: Coordinator, host: str, port: int,
+                  token: Optional[str]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: Optional[Dict] = None):
+            body = json.dumps(payload or {}, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self) -> bool:
+            if token and not secrets.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                self._reply(403, {'error': 'jeton invalide'})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path == '/project':
+                self._reply(200, coordinator.project())
+            elif self.path == '/status':
+                self._reply(200, coordinator.status())
+            else:
+                self._reply(404, {'error': 'inconnu'})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if not isinstance(body, dict):
+                    raise ValueError(body)
+            except ValueError:
+                self._reply(400, {'error': 'JSON invalide'})
+                return
+            if self.path == '/lease':
+                self._reply(200, coordinator.lease(str(body.get('worker') or self.client_address[0])))
+            elif self.path == '/renew':
+                ok = coordinator.renew(str(body.get('lease')))
+                self._reply(200 if ok else 410, {'ttl': coordinator.lease_seconds} if ok else None)
+            elif self.path == '/complete':
+                report = parse_report(body)
+                if report is None:
+                    self._reply(400, {'error': 'rapport de fin invalide'})
+                    return
+                ok = coordinator.complete(str(body.get('lease')), *report)
+                self._reply(200 if ok else 410)
+            else:
+                self._reply(404, {'error': 'inconnu'})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def run_coordinator(coordinator: Coordinator, server: ThreadingHTTPServer,
+                    failures_path: Optional[Path]) -> int:
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        while not coordinator.is_finished():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\n⏹️  Coordinateur interrompu")
+        server.shutdown()
+        return 130
+    server.shutdown()
+    server.server_close()
+
+    status = coordinator.status()
+    print(f"\n{'=' * 62}")
+    print(f"📈 RÉSUMÉ — {status['projectName']}")
+    print(f"{'=' * 62}")
+    print(f"📊 Pages                 : {status['pages']}")
+    print(f"✅ Téléchargées          : {status['downloaded']}")
+    print(f"⏭️  Déjà présentes        : {status['skipped']}")
+    print(f"❌ Échecs                : {status['failed']}")
+    print(f"🖥️  Workers               : {len(status['workers'])} ({', '.join(status['workers'])})")
+    failures = coordinator.failures()
+    if failures and failures_path:
+        with open(failures_path, 'w', encoding='utf-8') as f:
+            json.dump(failures, f, ensure_ascii=False, indent=2)
+        print(f"\n⚠️  {len(failures)} échec(s) journalisé(s): {failures_path}")
+    return 0
+
+
+# --------------------------------------------------------------------------- #
+# Worker
+# --------------------------------------------------------------------------- #
+
+class CoordinatorClient:
+    def __init__(self, url: str, worker: str, token: Optional[str]):
+        self.url = url.rstrip('/')
+        self.worker = worker
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def get(self, path: str) -> Dict:
+        response = self.session.get(self.url + path, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def post(self, path: str, payload: Dict) -> Optional[Dict]:
+        """Réponse JSON, ou None si le coordinateur répond 410 (bail perdu)"""
+        response = self.session.post(self.url + path, json=payload, timeout=HTTP_TIMEOUT)
+        if response.status_code == 410:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+
+class ClusterWorker:
+    """
+    Alimente le moteur de manga_hyperspeed avec les chapitres obtenus par bail.
+
+    Le générateur de tâches ne demande un nouveau bail que lorsque le moteur
+    réclame des tâches: un worker ne détient donc qu'environ un chapitre
+    d'avance. ChapterTracker signale la fin de chaque chapitre, qui est
+    aussitôt rapportée au coordinateur; un thread renouvelle les baux actifs.
+
+    Moteur threads uniquement: le générateur attend parfois le coordinateur
+    (requête de bail, {"wait": s}), ce qui bloquerait la boucle asyncio.
+    """
+
+    def __init__(self, client: CoordinatorClient, main_folder: Path, stats: DownloadStats):
+        self.client = client
+        self.main_folder = main_folder.resolve()
+        self.stats = stats
+        self.tracker = ChapterTracker()
+        self.tracker.add_listener(self.on_chapter_done)
+        self.lock = threading.Lock()
+        self.active: Dict[str, Dict] = {}  # chapitre -> {'lease', 'failures_from', 'pages'}
+        self.stop_event = threading.Event()
+        self.lease_seconds = LEASE_SECONDS
+
+    def _task(self, chapter: str, page: int, url: str, relative: str,
+              refs: Dict[Path, ChapterRef]) -> DownloadTask:
+        filepath = (self.main_folder / PurePosixPath(relative)).resolve()
+        if self.main_folder not in filepath.parents:
+            raise ValueError(f"chemin hors du dossier du projet: {relative}")
+        ref = refs.get(filepath.parent)
+        if ref is None:
+            ref = refs[filepath.parent] = ChapterRef(len(refs), chapter, filepath.parent)
+        task = DownloadTask.from_url(ref, page, url, filepath.suffix[1:])
+        if task.filepath.name != filepath.name:
+            raise ValueError(f"nom de page inattendu: {relative}")
+        return task
+
+    def tasks(self) -> Iterator[DownloadTask]:
+        while not self.stop_event.is_set():
+            answer = self.client.post('/lease', {'worker': self.client.worker})
+            if answer is None or answer.get('done'):
+                return
+            if 'wait' in answer:
+                self.stop_event.wait(float(answer['wait']))
+                continue
+            chapter, pages = answer['chapter'], answer['pages']
+            self.lease_seconds = int(answer.get('ttl', LEASE_SECONDS))
+            refs: Dict[Path, ChapterRef] = {}
+            tasks = [self._task(chapter, page, url, relative, refs)
+                     for page, url, relative in pages]
+            with self.stats.lock:
+                self.stats.total_images += len(tasks)
+                # Les échecs de ce bail viendront après cette marque (pas de relance
+                # différée ici: stats.failures ne fait que s'allonger)
+                failures_from = len(self.stats.failures)
+            with self.lock:
+                self.active[chapter] = {'lease': answer['lease'], 'failures_from': failures_from,
+                                        'pages': {task.page_number: task.url for task in tasks}}
+            yield from tasks
+            # Chapitre entièrement admis: on le scelle pour qu'il soit rapporté dès
+            # sa dernière page, sans attendre le bail suivant
+            self.tracker.finish()
+
+    def on_chapter_done(self, chapter: str, progress: ChapterProgress):
+        with self.lock:
+            lease = self.active.pop(chapter, None)
+        if lease is None:
+            return
+        with self.stats.lock:
+            # Un chapitre rendu puis repris par ce worker a aussi les échecs du bail précédent
+            failed = [[page, url, error, kind] for name, page, url, error, kind
+                      in self.stats.failures[lease['failures_from']:] if name == chapter]
+        pages = len(lease['pages'])
+        try:
+            accepted = self.client.post('/complete', {
+                'lease': lease['lease'],
+                'downloaded': pages - len(failed) - progress.skipped,
+                'skipped': progress.skipped,
+                'failed': failed,
+            })
+        except requests.RequestException as e:
+            self.stats.add_event(f"⚠️  Fin de {chapter} non transmise au coordinateur: {e}")
+            return
+        if accepted is None:
+            self.stats.add_event(f"⚠️  {chapter}: bail expiré, déjà terminé par un autre worker")
+
+    def heartbeat(self):
+        while not self.stop_event.wait(max(1.0, self.lease_seconds / 3)):
+            with self.lock:
+                leases = [(chapter, lease['lease']) for chapter, lease in self.active.items()]
+            for chapter, lease in leases:
+                try:
+                    if self.client.post('/renew', {'lease': lease}) is None:
+                        self.stats.add_event(f"⚠️  Bail perdu pour {chapter} (expiré)")
+                except requests.RequestException:
+                    pass
+
+
+def run_worker(args: argparse.Namespace) -> int:
+    worker_name = args.name or f"{socket.gethostname()}-{os.getpid()}"
+    client = CoordinatorClient(args.coordinator, worker_name, args.token)
+    try:
+        project = client.get('/project')
+    except requests.RequestException as e:
+        print(f"❌ Coordinateur injoignable ({args.coordinator}): {e}")
+        return 1
+
+    output = Path(args.output) if args.output else DEFAULT_OUTPUT_DIR
+    main_folder = (output / project['projectName']).resolve()
+    cbr_folder = main_folder / 'CBR'
+    cbr_folder.mkdir(parents=True, exist_ok=True)
+    print(f"🖥️  Worker {worker_name} — projet {project['projectName']} "
+          f"({project['chapters']} chapitres, {project['pages']} pages)")
+    print(f"📁 Destination  : {main_folder}\n")
+
+    stats = DownloadStats()
+    worker = ClusterWorker(client, main_folder, stats)
+    pack_executor = None
+    packer = None
+    if not args.no_cbr:
+        pack_executor = ThreadPoolExecutor(max_workers=max(1, args.pack_workers),
+                                           thread_name_prefix='cbr')
+        packer = CbrPacker(cbr_folder, pack_executor)
+        worker.tracker.add_listener(packer.on_chapter_done)
+    context = DownloadContext(stats, tracker=worker.tracker)
+    jobs = JobScheduler([(worker.tasks(), context)])
+
+    heartbeat = threading.Thread(target=worker.heartbeat, daemon=True)
+    heartbeat.start()
+    renderer = ProgressRenderer(stats, {'': worker.tracker})
+    renderer.start()
+    start_time = time.time()
+    try:
+        run_thread_downloads(jobs, max(1, args.workers), stats.add_retry)
+    except KeyboardInterrupt:
+        print("\n⏹️  Worker interrompu — les baux en cours expireront côté coordinateur.")
+    except requests.RequestException as e:
+        print(f"\n❌ Coordinateur injoignable: {e}")
+    finally:
+        worker.stop_event.set()
+        renderer.stop()
+    if packer:
+        packer.wait()
+        pack_executor.shutdown(wait=True)
+
+    final = stats.get_stats()
+    duration = time.time() - start_time
+    print(f"\n✅ {final['downloaded']} téléchargées | ⏭️  {final['skipped']} déjà présentes | "
+          f"❌ {final['failed']} échecs | ⏱️  {duration:.1f} s")
+    print_timing_report(stats.timing_summary())
+    return 0
+
+
+# --------------------------------------------------------------------------- #
+# Mode local: coordinateur + N processus workers sur la même machine
+# --------------------------------------------------------------------------- #
+
+def run_local(args: argparse.Namespace, json_path: Path) -> int:
+    coordinator = Coordinator(json_path, args.lease_seconds)
+    token = secrets.token_hex(16)
+    server = create_server(coordinator, '127.0.0.1', args.port, token)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"🧭 Coordinateur local: {url} — {len(coordinator.shards)} chapitres, "
+          f"{coordinator.total_pages} pages, {args.processes} worker(s)\n")
+
+    command = [sys.executable, str(Path(__file__).resolve()), 'worker', url,
+               '--token', token, '-w', str(args.workers),
+               '--pack-workers', str(args.pack_workers)]
+    if args.output:
+        command += ['-o', str(Path(args.output).resolve())]
+    if args.no_cbr:
+        command.append('--no-cbr')
+    processes = [subprocess.Popen(command + ['--name', f"local-{i}"],
+                                  stdout=subprocess.DEVNULL)
+                 for i in range(1, args.processes + 1)]
+    try:
+        code = run_coordinator(coordinator, server, json_path.with_name(
+            f"{json_path.stem}_echecs_cluster.json"))
+    finally:
+        for process in processes:
+            try:
+                process.wait(timeout=DONE_GRACE_SECONDS + LEASE_SECONDS)
+            except subprocess.TimeoutExpired:
+                process.terminate()
+    return code
+
+
+# --------------------------------------------------------------------------- #
+# Programme principal
+# --------------------------------------------------------------------------- #
+
+def add_worker_options(parser: argparse.ArgumentParser):
+    parser.add_argument('-o', '--output', default=None,
+                        help=f"Dossier parent des projets (défaut: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument('-w', '--workers', type=int, default=10,
+                        help="Téléchargements simultanés par worker (défaut: 10)")
+    parser.add_argument('--pack-workers', type=int, default=2,
+                        help="Threads d'empaquetage CBR (défaut: 2)")
+    parser.add_argument('--no-cbr', action='store_true', help="Télécharge sans générer les CBR")
+
+
+def resolve_json(name: str, directory: str) -> Optional[Path]:
+    json_path = Path(name)
+    if not json_path.is_absolute():
+        json_path = Path(directory).resolve() / json_path
+    if not json_path.exists() or not describe_json(json_path):
+        print(f"❌ Fichier introuvable, illisible ou sans objet 'chapters': {json_path}")
+        return None
+    return json_path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Téléchargement réparti: un coordinateur distribue les chapitres par baux "
+                    "HTTP à des workers manga_hyperspeed.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    coordinator = commands.add_parser('coordinator', help="Distribue les chapitres d'un JSON")
+    coordinator.add_argument('json_file', help="Fichier JSON du projet")
+    coordinator.add_argument('-d', '--directory', default=str(DEFAULT_DATA_DIR),
+                             help=f"Répertoire du JSON (défaut: {DEFAULT_DATA_DIR})")
+    coordinator.add_argument('--host', default='127.0.0.1',
+                             help="Adresse d'écoute (0.0.0.0 pour les autres machines)")
+    coordinator.add_argument('--port', type=int, default=DEFAULT_PORT,
+                             help=f"Port d'écoute (défaut: {DEFAULT_PORT})")
+    coordinator.add_argument('--token', default=None,
+                             help="Jeton partagé exigé des workers (recommandé hors localhost)")
+    coordinator.add_argument('--lease-seconds', type=int, default=LEASE_SECONDS,
+                             help=f"Durée d'un bail (défaut: {LEASE_SECONDS} s)")
+
+    worker = commands.add_parser('worker', help="Télécharge les chapitres d'un coordinateur")
+    worker.add_argument('coordinator', help="URL du coordinateur, ex. http://machine-a:8770")
+    worker.add_argument('--token', default=None, help="Jeton du coordinateur")
+    worker.add_argument('--name', default=None, help="Nom du worker (défaut: hôte-pid)")
+    add_worker_options(worker)
+
+    local = commands.add_parser('local', help="Coordinateur et workers sur cette machine")
+    local.add_argument('json_file', help="Fichier JSON du projet")
+    local.add_argument('-d', '--directory', default=str(DEFAULT_DATA_DIR),
+                       help=f"Répertoire du JSON (défaut: {DEFAULT_DATA_DIR})")
+    local.add_argument('--processes', type=int, default=2,
+                       help="Nombre de processus workers (défaut: 2)")
+    local.add_argument('--port', type=int, default=0,
+                       help="Port du coordinateur (défaut: choisi par le système)")
+    local.add_argument('--lease-seconds', type=int, default=LEASE_SECONDS,
+                       help=f"Durée d'un bail (défaut: {LEASE_SECONDS} s)")
+    add_worker_options(local)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.command == 'worker':
+        return run_worker(args)
+
+    json_path = resolve_json(args.json_file, args.directory)
+    if not json_path:
+        return 1
+    if args.command == 'local':
+        return run_local(args, json_path)
+
+    coordinator = Coordinator(json_path, args.lease_seconds)
+    try:
+        server = create_server(coordinator, args.host, args.port, args.token)
+    except OSError as e:
+        print(f"❌ Impossible d'écouter sur {args.host}:{args.port}: {e}")
+        return 1
+    if args.host not in ('127.0.0.1', 'localhost') and not args.token:
+        print("⚠️  Coordinateur exposé sans --token: n'importe qui sur le réseau peut "
+              "prendre des baux.")
+    print(f"🧭 Coordinateur: http://{args.host}:{args.port} — {coordinator.project_name}, "
+          f"{len(coordinator.shards)} chapitres, {coordinator.total_pages} pages")
+    print(f"   Bail: {args.lease_seconds} s. En attente des workers...\n")
+    return run_coordinator(coordinator, server, json_path.with_name(
+        f"{json_path.stem}_echecs_cluster.json"))
+
+
+if __name__ == '__main__':
+    sys.exit(main())